@@ -1,14 +1,148 @@
 import streamlit as st
 import os
+import time
+import hashlib
 import tempfile
+import threading
+
+from utils.cache_utils import ArtifactCache, remember_hash
+from utils.pipeline_utils import ReelPipeline
+from utils.model_utils import warmup
+
+
+UPLOAD_DIR = "output/uploads"
+UPLOAD_CHUNK_BYTES = 8 << 20
+POLL_INTERVAL_S = 1.0
+
+# Job states a new "Generate Reels" click may replace
+RESTARTABLE_STATES = ("failed", "stopped")
+
+PIPELINE_CONFIG = {
+    "top_k_peaks": 5,
+    "peak_window": 15,
+    "min_words": 6,
+    "model_size": "base",
+    "top_k_reels": 5,
+}
+
+# (pipeline stage, progress label, warning when the stage yields nothing)
+JOB_STAGES = [
+    ("peaks", "🔊 Detecting loudness peaks...", "⚠️ No loudness peaks detected."),
+    ("transcript", "🧠 Transcribing video with Whisper...", "⚠️ Transcription failed."),
+    ("candidates", "🔗 Matching loudness with meaningful speech...", "⚠️ No high-value moments detected."),
+    ("ranking", "🤖 Refining highlights with Gemini 2.5 Flash...", "⚠️ Gemini returned no usable segments."),
+    ("reels", "🎬 Generating reels (dynamic 40–100s)...", "⚠️ Reel generation failed."),
+]
+
+
+# -------------------------------------------------
+# Process-wide resources (shared by every session)
+# -------------------------------------------------
+@st.cache_resource
+def _warm_models():
+    # Load Whisper once per server process while the user picks a file;
+    # every later run reuses the resident model
+    return warmup((PIPELINE_CONFIG["model_size"],), background=True)
+
+
+@st.cache_resource
+def _artifact_cache():
+    return ArtifactCache()
+
+
+@st.cache_resource
+def _job_registry():
+    # Upload SHA-256 -> ReelJob, so reruns, widget changes and other
+    # sessions uploading the same video attach to one job
+    return {}, threading.Lock()
+
+
+# -------------------------------------------------
+# Streamed upload (content-addressed on disk)
+# -------------------------------------------------
+def save_upload(uploaded_file):
+    """
+    Copy the upload to UPLOAD_DIR in chunks, hashing as it goes.
+    Returns (path, sha256); an identical upload reuses the stored file.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    ext = os.path.splitext(uploaded_file.name)[1].lower()
+
+    h = hashlib.sha256()
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=ext, delete=False) as tmp:
+        for block in iter(lambda: uploaded_file.read(UPLOAD_CHUNK_BYTES), b""):
+            h.update(block)
+            tmp.write(block)
+    digest = h.hexdigest()
+
+    path = os.path.join(UPLOAD_DIR, digest + ext)
+    if os.path.exists(path):
+        os.remove(tmp.name)
+    else:
+        os.replace(tmp.name, path)
+
+    remember_hash(path, digest)
+    return path, digest
 
-from utils.audio_utils import extract_loudness_peaks
-from utils.transcript_utils import (
-    transcribe_video,
-    get_relevant_segments
-)
-from utils.gemini_utils import rank_segments_with_gemini
-from utils.video_utils import generate_reels
+
+# -------------------------------------------------
+# Background pipeline job
+# -------------------------------------------------
+class ReelJob:
+    """
+    Runs the pipeline for one upload on a daemon thread. The UI only
+    reads `stage`, `state`, `warning`, `error` and `reels`.
+    """
+
+    def __init__(self, video_path, digest, smart_cut=False):
+        self.digest = digest
+        self.stage = 0                  # index into JOB_STAGES
+        self.state = "running"          # running | done | stopped | failed
+        self.warning = None
+        self.error = None
+        self.reels = None
+        self.pipeline = ReelPipeline(
+            video_path,
+            cache=_artifact_cache(),
+            output_dir=os.path.join("output/clips", digest[:12]),
+            smart_cut=smart_cut,
+            **PIPELINE_CONFIG
+        )
+        self.thread = threading.Thread(
+            target=self._run, name=f"reel-job-{digest[:8]}", daemon=True
+        )
+        self.thread.start()
+
+    def _run(self):
+        try:
+            for i, (stage, _, warning) in enumerate(JOB_STAGES):
+                self.stage = i
+                result = getattr(self.pipeline, stage)()
+                if not result:
+                    self.warning = warning
+                    self.state = "stopped"
+                    return
+            self.reels = result
+            self.state = "done"
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = "failed"
+
+
+def get_job(video_path, digest, restart=False, smart_cut=False):
+    jobs, lock = _job_registry()
+    with lock:
+        job = jobs.get(digest)
+        if job is None or (restart and job.state in RESTARTABLE_STATES):
+            job = jobs[digest] = ReelJob(video_path, digest, smart_cut=smart_cut)
+        return job
+
+
+def find_job(digest):
+    jobs, lock = _job_registry()
+    with lock:
+        return jobs.get(digest)
 
 
 # -------------------------------------------------
@@ -19,6 +153,8 @@ st.set_page_config(
     layout="centered"
 )
 
+_warm_models()
+
 st.title("🎬 ByteSize – Automatic Reel Generator")
 st.markdown(
     """
@@ -34,6 +170,43 @@ st.markdown(
     """
 )
 
+
+def show_progress(job):
+    st.progress(job.stage / len(JOB_STAGES), text=JOB_STAGES[job.stage][1])
+    for i, (_, label, _) in enumerate(JOB_STAGES):
+        if i < job.stage:
+            st.write(f"✅ {label.rstrip('.')}")
+        elif i == job.stage:
+            st.write(f"⏳ {label}")
+
+
+def show_reels(reels):
+    st.success("🎉 Reels generated successfully!")
+
+    # -------------------------------------------------
+    # Display results
+    # -------------------------------------------------
+    st.subheader("📂 Generated Reels")
+
+    for i, reel in enumerate(reels, 1):
+        st.markdown(f"## Reel {i}")
+
+        if "error" in reel:
+            st.error(f"❌ This reel failed to render: {reel['error']}")
+            st.markdown("---")
+            continue
+
+        st.markdown("### 🎥 Horizontal (16:9)")
+        st.video(reel["horizontal"])
+
+        st.markdown("### 📱 Vertical (9:16)")
+        st.video(reel["vertical"])
+
+        st.markdown("### 📝 Vertical with Captions")
+        st.video(reel["captioned"])
+        st.markdown("---")
+
+
 # -------------------------------------------------
 # Video upload
 # -------------------------------------------------
@@ -43,96 +216,41 @@ uploaded_file = st.file_uploader(
 )
 
 if uploaded_file:
-    with tempfile.TemporaryDirectory() as tmpdir:
-        video_path = os.path.join(tmpdir, uploaded_file.name)
+    # Store (and hash) each upload once, not on every script rerun
+    saved = st.session_state.get("upload")
+    if saved is None or saved["file_id"] != uploaded_file.file_id:
+        video_path, digest = save_upload(uploaded_file)
+        saved = st.session_state["upload"] = {
+            "file_id": uploaded_file.file_id,
+            "path": video_path,
+            "digest": digest,
+        }
 
-        with open(video_path, "wb") as f:
-            f.write(uploaded_file.read())
+    st.success("✅ Video uploaded successfully!")
 
-        st.success("✅ Video uploaded successfully!")
+    # Uploads are keyed by content, so re-uploading the same video
+    # attaches to its existing job and every cached stage
+    job = find_job(saved["digest"])
 
+    if job is None or job.state in RESTARTABLE_STATES:
+        if job is not None and job.state == "failed":
+            st.error(f"❌ Processing failed: {job.error}")
+        elif job is not None:
+            st.warning(job.warning)
+        smart_cut = st.checkbox(
+            "⚡ Smart cut (experimental)",
+            help="Stream-copy whole GOPs of the horizontal reels and "
+                 "re-encode only their edges. H.264 sources only."
+        )
         if st.button("🚀 Generate Reels"):
-            with st.spinner("Processing video (this may take a few minutes)..."):
-
-                # -------------------------------------------------
-                # Phase 1: Audio loudness
-                # -------------------------------------------------
-                st.write("🔊 Detecting loudness peaks...")
-                peaks = extract_loudness_peaks(video_path, top_k=5)
-
-                if not peaks:
-                    st.warning("⚠️ No loudness peaks detected.")
-                    st.stop()
-
-                # -------------------------------------------------
-                # Phase 2: Transcription
-                # -------------------------------------------------
-                st.write("🧠 Transcribing video with Whisper...")
-                segments = transcribe_video(video_path, model_size="base")
-
-                if not segments:
-                    st.warning("⚠️ Transcription failed.")
-                    st.stop()
-
-                # -------------------------------------------------
-                # Phase 3: Heuristic multimodal fusion
-                # -------------------------------------------------
-                st.write("🔗 Matching loudness with meaningful speech...")
-                candidate_segments = get_relevant_segments(
-                    segments=segments,
-                    peaks=peaks,
-                    window=15,
-                    min_words=6
-                )
-
-                if not candidate_segments:
-                    st.warning("⚠️ No high-value moments detected.")
-                    st.stop()
-
-                # -------------------------------------------------
-                # Phase 4: Gemini semantic refinement
-                # -------------------------------------------------
-                st.write("🤖 Refining highlights with Gemini 2.5 Flash...")
-                refined_segments = rank_segments_with_gemini(
-                    candidate_segments,
-                    top_k=5
-                )
-
-                if not refined_segments:
-                    st.warning("⚠️ Gemini returned no usable segments.")
-                    st.stop()
-
-                # -------------------------------------------------
-                # Phase 5: Reel generation (Dynamic 40–100s)
-                # -------------------------------------------------
-                st.write("🎬 Generating reels (dynamic 40–100s)...")
-                reels = generate_reels(
-                    video_path=video_path,
-                    segments=refined_segments,
-                    transcript_segments=segments,
-                    output_dir="output/clips"
-                )
-
-                if not reels:
-                    st.warning("⚠️ Reel generation failed.")
-                    st.stop()
-
-                st.success("🎉 Reels generated successfully!")
-
-                # -------------------------------------------------
-                # Display results
-                # -------------------------------------------------
-                st.subheader("📂 Generated Reels")
-
-                for i, reel in enumerate(reels, 1):
-                    st.markdown(f"## Reel {i}")
-
-                    st.markdown("### 🎥 Horizontal (16:9)")
-                    st.video(reel["horizontal"])
-
-                    st.markdown("### 📱 Vertical (9:16)")
-                    st.video(reel["vertical"])
-
-                    st.markdown("### 📝 Vertical with Captions")
-                    st.video(reel["captioned"])
-                    st.markdown("---")
\ No newline at end of file
+            job = get_job(
+                saved["path"], saved["digest"], restart=True, smart_cut=smart_cut
+            )
+
+    if job is not None:
+        if job.state == "running":
+            show_progress(job)
+            time.sleep(POLL_INTERVAL_S)
+            st.rerun()
+        elif job.state == "done":
+            show_reels(job.reels)
@@ -0,0 +1,192 @@
+"""
+ASR backend comparison: latency and accuracy on a real recording.
+
+Transcribes the same audio with each requested engine and reports load
+time, decode wall time, real-time factor (decode seconds per media
+second, lower is faster) and word error rate against a reference.
+
+The reference is a plain-text transcript (--reference-text) or, by
+default, the first engine listed, so
+
+    python benchmarks/bench_asr.py --engines whisper:base faster-whisper:base
+
+measures how far the int8 CTranslate2 engine drifts from PyTorch
+Whisper on the same model, and how much faster it is.
+
+Engines are BACKEND:MODEL[:DTYPE], e.g. faster-whisper:small:int8.
+Models must already be in the local caches to stay offline.
+
+Usage:
+    python benchmarks/bench_asr.py [--video input/test_video.mp4]
+        [--seconds 120] [--engines whisper:base faster-whisper:base]
+        [--reference-text ref.txt] [--json PATH]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from utils.audio_utils import load_audio, SAMPLE_RATE               # noqa: E402
+from utils.asr_utils import ASR_BACKENDS                            # noqa: E402
+from utils.model_utils import get_whisper_model, clear_models       # noqa: E402
+from utils.transcript_utils import transcribe_video                 # noqa: E402
+
+
+DEFAULT_VIDEO = os.path.join(REPO_ROOT, "input", "test_video.mp4")
+DEFAULT_ENGINES = ["whisper:base", "faster-whisper:base"]
+
+
+# -------------------------------------------------
+# Word error rate
+# -------------------------------------------------
+def normalize_words(text):
+    # Case, punctuation and spacing differences are not recognition errors
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """
+    Word-level Levenshtein distance divided by the reference length.
+    """
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        row = [i]
+        for j, h in enumerate(hyp, 1):
+            row.append(min(
+                prev[j] + 1,                # deletion
+                row[j - 1] + 1,             # insertion
+                prev[j - 1] + (r != h)      # substitution
+            ))
+        prev = row
+
+    return prev[-1] / len(ref)
+
+
+# -------------------------------------------------
+# Runs
+# -------------------------------------------------
+def parse_engine(spec):
+    parts = spec.split(":")
+    if len(parts) not in (2, 3) or parts[0] not in ASR_BACKENDS:
+        raise argparse.ArgumentTypeError(
+            f"expected BACKEND:MODEL[:DTYPE] with BACKEND in {ASR_BACKENDS}: {spec}"
+        )
+    return {
+        "name": spec,
+        "backend": parts[0],
+        "model_size": parts[1],
+        "dtype": parts[2] if len(parts) == 3 else None,
+    }
+
+
+def run_engine(engine, audio, device):
+    start = time.perf_counter()
+    get_whisper_model(
+        engine["model_size"],
+        device=device,
+        dtype=engine["dtype"],
+        backend=engine["backend"]
+    )
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    segments = transcribe_video(
+        None,
+        model_size=engine["model_size"],
+        audio=audio,
+        device=device,
+        dtype=engine["dtype"],
+        backend=engine["backend"]
+    )
+    decode_s = time.perf_counter() - start
+
+    # One resident model at a time keeps the memory comparison honest
+    clear_models()
+
+    return {
+        "load_s": load_s,
+        "decode_s": decode_s,
+        "rtf": decode_s / (len(audio) / SAMPLE_RATE),
+        "segments": len(segments),
+        "text": " ".join(seg["text"].strip() for seg in segments),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--video", default=DEFAULT_VIDEO)
+    parser.add_argument(
+        "--seconds",
+        type=float,
+        default=120,
+        help="only the first N media seconds (0: everything)"
+    )
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        type=parse_engine,
+        default=[parse_engine(e) for e in DEFAULT_ENGINES],
+        metavar="BACKEND:MODEL[:DTYPE]"
+    )
+    parser.add_argument("--device", default=None, help="cpu or cuda (default: auto)")
+    parser.add_argument(
+        "--reference-text",
+        metavar="PATH",
+        help="ground-truth transcript; default: the first engine's output"
+    )
+    parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    audio = load_audio(args.video, sr=SAMPLE_RATE)
+    if args.seconds:
+        audio = audio[:int(args.seconds * SAMPLE_RATE)]
+    media_s = len(audio) / SAMPLE_RATE
+
+    results = {}
+    for engine in args.engines:
+        print(f"\n🎙️ {engine['name']} on {media_s:.0f}s of audio...")
+        results[engine["name"]] = run_engine(engine, audio, args.device)
+
+    if args.reference_text:
+        with open(args.reference_text, encoding="utf-8") as f:
+            reference, ref_name = f.read(), os.path.basename(args.reference_text)
+    else:
+        ref_name = args.engines[0]["name"]
+        reference = results[ref_name]["text"]
+
+    print(f"\nMedia: {media_s:.1f}s  Reference: {ref_name}")
+    print(f"{'engine':<28}{'load s':>9}{'decode s':>10}{'RTF':>8}{'WER':>8}")
+    for name, r in results.items():
+        r["wer"] = word_error_rate(reference, r["text"])
+        print(
+            f"{name:<28}{r['load_s']:9.2f}{r['decode_s']:10.2f}"
+            f"{r['rtf']:8.3f}{r['wer']:8.1%}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "video": args.video,
+                "media_s": media_s,
+                "reference": ref_name,
+                "engines": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
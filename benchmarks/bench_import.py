@@ -0,0 +1,132 @@
+"""
+Import-time benchmark for the CLI and pipeline modules.
+
+Fails (exit code 1) when importing a module
+
+- pulls in a heavy dependency that should only load on first use
+  (torch, whisper, faster-whisper, librosa, moviepy, google-genai), or
+- costs more than the time budget on top of a bare interpreter start.
+
+Usage:
+    python benchmarks/bench_import.py [--budget-ms 500] [--runs 5]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "main",
+    "utils.pipeline_utils",
+    "utils.audio_utils",
+    "utils.transcript_utils",
+    "utils.gemini_utils",
+    "utils.video_utils",
+    "utils.model_utils",
+    "utils.asr_utils",
+    "utils.vad_utils",
+    "utils.probe_utils",
+    "utils.saliency_utils",
+    "utils.cache_utils",
+    "utils.profiling_utils",
+    "utils.batch_utils",
+]
+
+# Must never be imported just by importing a pipeline module
+HEAVY_MODULES = [
+    "torch",
+    "whisper",
+    "faster_whisper",
+    "ctranslate2",
+    "librosa",
+    "scipy",
+    "moviepy",
+    "google.genai",
+]
+
+DEFAULT_BUDGET_MS = 500
+
+
+def _run(code):
+    """
+    Wall time (seconds) of a fresh interpreter running `code`, plus its
+    stdout.
+    """
+    env = dict(os.environ)
+    # The deferred Gemini client must not need a key at import time
+    env.pop("GOOGLE_API_KEY", None)
+
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return time.perf_counter() - start, out
+
+
+def bench_module(module, runs, baseline_s):
+    code = (
+        "import json, sys\n"
+        f"import {module}\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+
+    times = []
+    heavy = []
+    for _ in range(runs):
+        elapsed, out = _run(code)
+        times.append(elapsed)
+        heavy = json.loads(out.strip().splitlines()[-1])
+
+    return {
+        "module": module,
+        "import_ms": max(0.0, statistics.median(times) - baseline_s) * 1000,
+        "heavy_imports": heavy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline_s = statistics.median(_run("pass")[0] for _ in range(args.runs))
+
+    failed = False
+    print(f"Interpreter start: {baseline_s * 1000:.0f} ms (subtracted)\n")
+
+    for module in MODULES:
+        try:
+            result = bench_module(module, args.runs, baseline_s)
+        except subprocess.CalledProcessError as e:
+            print(f"❌ {module}: import failed\n{e.stderr}")
+            failed = True
+            continue
+
+        problems = []
+        if result["heavy_imports"]:
+            problems.append(f"eager imports: {', '.join(result['heavy_imports'])}")
+        if result["import_ms"] > args.budget_ms:
+            problems.append(f"over {args.budget_ms:.0f} ms budget")
+
+        mark = "❌" if problems else "✅"
+        detail = f"  ({'; '.join(problems)})" if problems else ""
+        print(f"{mark} {module:<26} {result['import_ms']:7.1f} ms{detail}")
+        failed = failed or bool(problems)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+"""
+Offline end-to-end benchmark on synthetic media.
+
+Generates a test video with ffmpeg's lavfi sources (testsrc2 picture,
+low noise floor plus loud tone/noise bursts at known times), then runs
+every pipeline stage on it and reports per-stage wall time and
+throughput in media-seconds per wall-second.
+
+- Gemini is replaced by a local fake client (no network, no API key)
+- Whisper is skipped unless --whisper names a model (e.g. tiny, which
+  must already be in the local Whisper cache to stay offline); the
+  downstream stages always use a synthetic transcript, so results do
+  not depend on what Whisper hears in test tones
+- Loudness and saliency peaks are checked against the known burst times
+- Speech detection is timed too (the synthetic audio holds no speech,
+  so its intervals are not used downstream)
+
+Fails (exit code 1) when peaks miss a burst or a stage's throughput
+drops more than --tolerance below the stored baseline for the same
+scenario. Baselines are per machine: record one with --save-baseline on
+the box that runs the check (e.g. the CI runner) and commit
+benchmarks/baseline.json. Without a baseline, the analysis passes are
+held to the coarse STAGE_BUDGETS floors instead, and --require-baseline
+turns the missing baseline itself into a failure. Stages shorter than
+MIN_CHECK_WALL_S are reported but never gated.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--duration 120] [--resolution 1280x720]
+        [--whisper tiny] [--repeat 3] [--save-baseline | --require-baseline]
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from utils import profiling_utils                                   # noqa: E402
+from utils.audio_utils import load_audio, extract_loudness_peaks    # noqa: E402
+from utils.vad_utils import detect_speech                           # noqa: E402
+from utils.saliency_utils import extract_salient_peaks              # noqa: E402
+from utils.transcript_utils import (                                # noqa: E402
+    transcribe_video,
+    get_relevant_segments,
+    build_transcript_index
+)
+from utils.gemini_utils import rank_segments_with_gemini            # noqa: E402
+from utils.video_utils import generate_reels, REEL_OUTPUTS          # noqa: E402
+
+
+MEDIA_DIR = os.path.join(REPO_ROOT, "output", "bench", "media")
+RUN_DIR = os.path.join(REPO_ROOT, "output", "bench", "run")
+BASELINE_PATH = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+
+# Profiler span -> report name, in pipeline order
+STAGES = [
+    ("load_audio", "audio"),
+    ("detect_speech", "speech"),
+    ("extract_loudness_peaks", "peaks"),
+    ("extract_salient_peaks", "saliency"),
+    ("transcribe_video", "transcript"),
+    ("get_relevant_segments", "candidates"),
+    ("rank_segments_with_gemini", "ranking"),
+    ("generate_reels", "reels"),
+]
+
+BURST_S = 1.5
+SEGMENT_S = 4.0
+DEFAULT_TOLERANCE = 0.25
+# Stages faster than this are reported but too noisy to gate on
+MIN_CHECK_WALL_S = 0.2
+
+# Minimum throughput (media s per wall s) of the per-video analysis
+# passes when the scenario has no baseline: about a tenth of what a
+# laptop core manages, so only a gross regression trips them. Saliency
+# runs one STFT and is allowed to be ~10x slower than the streaming RMS
+# pass.
+STAGE_BUDGETS = {
+    "speech": 200.0,
+    "peaks": 1000.0,
+    "saliency": 100.0,
+}
+
+
+# -------------------------------------------------
+# Synthetic media
+# -------------------------------------------------
+def burst_times(duration, bursts):
+    # Evenly spaced, away from both ends
+    return [round((i + 0.5) * duration / bursts, 3) for i in range(bursts)]
+
+
+def make_media(duration, resolution, fps, bursts, burst_kind):
+    """
+    Render (or reuse) the synthetic input for this scenario.
+    """
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    name = f"synth_{duration}s_{resolution}_{fps}fps_{bursts}x{burst_kind}.mp4"
+    path = os.path.join(MEDIA_DIR, name)
+    if os.path.exists(path):
+        return path
+
+    source = "sin(2*PI*440*t)" if burst_kind == "tone" else "(2*random(1)-1)"
+    gate = "+".join(
+        f"between(t,{t:.3f},{t + BURST_S:.3f})"
+        for t in burst_times(duration, bursts)
+    )
+    audio = f"0.02*(2*random(0)-1)+0.8*{source}*({gate})"
+
+    print(f"🧪 Generating {name}...")
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi",
+        "-i", f"testsrc2=size={resolution}:rate={fps}:duration={duration}",
+        "-f", "lavfi",
+        "-i", f"aevalsrc=exprs='{audio}':s=44100:d={duration}",
+        "-c:v", "libx264",
+        "-preset", "ultrafast",
+        "-g", str(2 * fps),
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac",
+        "-shortest",
+        path + ".part.mp4"
+    ], check=True)
+    os.replace(path + ".part.mp4", path)
+    return path
+
+
+def synthetic_transcript(duration):
+    segments = []
+    t = 0.0
+    i = 0
+    while t < duration:
+        end = min(duration, t + SEGMENT_S)
+        segments.append({
+            "start": t,
+            "end": end,
+            "text": f"Synthetic sentence number {i} with enough words to count."
+        })
+        t = end
+        i += 1
+    return segments
+
+
+# -------------------------------------------------
+# Offline Gemini stand-in
+# -------------------------------------------------
+_LINE = re.compile(r"^\[(\d+\.\d+) - (\d+\.\d+)\] ", re.MULTILINE)
+_TOP_K = re.compile(r"(?:TOP|up to) (\d+)")
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeModels:
+    """
+    Picks the first top-k transcript lines of the prompt, with scores
+    falling by position, in the JSON format the real model returns.
+    """
+
+    def generate_content(self, model, contents):
+        top_k = int(_TOP_K.search(contents).group(1))
+        picks = [
+            {
+                "start": float(start),
+                "end": float(end),
+                "score": 100.0 - i,
+                "reason": "benchmark stub"
+            }
+            for i, (start, end) in enumerate(_LINE.findall(contents)[:top_k])
+        ]
+        return _FakeResponse(json.dumps(picks))
+
+
+class _FakeAsyncModels:
+    def __init__(self, models):
+        self._models = models
+
+    async def generate_content(self, model, contents):
+        return self._models.generate_content(model, contents)
+
+
+class _FakeAio:
+    def __init__(self, models):
+        self.models = _FakeAsyncModels(models)
+
+
+class FakeGeminiClient:
+    def __init__(self):
+        self.models = _FakeModels()
+        self.aio = _FakeAio(self.models)
+
+
+# -------------------------------------------------
+# One pipeline run
+# -------------------------------------------------
+def run_once(video_path, duration, args):
+    """
+    Run every stage once; returns
+    ({stage: wall_s}, end_to_end_s, {"loudness": peaks, "saliency": peaks}).
+    """
+    shutil.rmtree(RUN_DIR, ignore_errors=True)
+    profiling_utils.enable()
+    client = FakeGeminiClient()
+
+    start = time.perf_counter()
+
+    audio = load_audio(video_path)
+    detect_speech(audio)
+    peaks = extract_loudness_peaks(
+        video_path,
+        top_k=args.bursts,
+        min_gap=5,
+        audio=audio
+    )
+    salient = extract_salient_peaks(
+        video_path,
+        top_k=args.bursts,
+        min_gap=5,
+        audio=audio
+    )
+
+    if args.whisper:
+        transcribe_video(
+            video_path,
+            model_size=args.whisper,
+            audio=audio,
+            workers=args.transcribe_workers
+        )
+    transcript = build_transcript_index(synthetic_transcript(duration))
+
+    candidates = get_relevant_segments(
+        segments=transcript,
+        peaks=peaks,
+        window=15,
+        min_words=6
+    )
+    ranked = rank_segments_with_gemini(
+        candidates,
+        top_k=args.reels,
+        mode=args.ranking_mode,
+        requests_per_minute=0,
+        client=client
+    )
+    reels = generate_reels(
+        video_path,
+        ranked,
+        transcript,
+        output_dir=RUN_DIR,
+        outputs=args.outputs,
+        workers=args.render_workers,
+        smart=args.smart_cut
+    )
+
+    end_to_end = time.perf_counter() - start
+    profiling_utils.disable()
+
+    failed = [r for r in reels if "error" in r]
+    if failed:
+        raise RuntimeError(f"{len(failed)} reel(s) failed: {failed[0]['error']}")
+
+    totals = profiling_utils.summary()["stages"]
+    stage_times = {
+        label: totals[span]["wall_s"]
+        for span, label in STAGES
+        if span in totals
+    }
+    return stage_times, end_to_end, {"loudness": peaks, "saliency": salient}
+
+
+def check_peaks(peaks, duration, bursts):
+    """
+    Every burst must have a detected peak inside it (±0.5 s slack).
+    """
+    missed = [
+        t for t in burst_times(duration, bursts)
+        if not any(t - 0.5 <= p <= t + BURST_S + 0.5 for p in peaks)
+    ]
+    return missed
+
+
+# -------------------------------------------------
+# Baseline
+# -------------------------------------------------
+def scenario_key(args):
+    return (
+        f"{args.duration}s-{args.resolution}-{args.fps}fps-{args.bursts}x{args.burst}"
+        f"-whisper:{args.whisper or 'off'}-outputs:{'+'.join(args.outputs)}"
+        f"-smart:{int(args.smart_cut)}"
+    )
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, key, throughput):
+    baseline = load_baseline(path)
+    baseline[key] = {name: round(value, 3) for name, value in throughput.items()}
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+# -------------------------------------------------
+# Entry point
+# -------------------------------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=int, default=120, help="media seconds")
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--burst", choices=("tone", "noise"), default="tone")
+    parser.add_argument("--reels", type=int, default=3)
+    parser.add_argument(
+        "--outputs",
+        nargs="+",
+        choices=REEL_OUTPUTS,
+        default=list(REEL_OUTPUTS)
+    )
+    parser.add_argument("--smart-cut", action="store_true")
+    parser.add_argument("--render-workers", type=int, default=None)
+    parser.add_argument(
+        "--whisper",
+        default=None,
+        metavar="MODEL",
+        help="also time Whisper with this model (e.g. tiny)"
+    )
+    parser.add_argument("--transcribe-workers", type=int, default=1)
+    parser.add_argument(
+        "--ranking-mode",
+        choices=("auto", "single", "windowed"),
+        default="auto"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs; median is reported")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store this run's throughput as the baseline for the scenario"
+    )
+    parser.add_argument(
+        "--require-baseline",
+        action="store_true",
+        help="fail when the scenario has no stored baseline (for CI)"
+    )
+    parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    video_path = make_media(
+        args.duration, args.resolution, args.fps, args.bursts, args.burst
+    )
+
+    runs = []
+    for i in range(args.repeat):
+        print(f"\n⏱️ Run {i + 1}/{args.repeat}")
+        runs.append(run_once(video_path, args.duration, args))
+
+    stage_times = {
+        label: statistics.median(run[0][label] for run in runs)
+        for _, label in STAGES
+        if label in runs[0][0]
+    }
+    stage_times["end_to_end"] = statistics.median(run[1] for run in runs)
+    throughput = {
+        name: args.duration / max(wall, 1e-9)
+        for name, wall in stage_times.items()
+    }
+
+    key = scenario_key(args)
+    baseline = load_baseline(args.baseline).get(key, {})
+
+    print(f"\nScenario: {key}")
+    print(f"{'stage':<14}{'wall s':>10}{'media s/s':>12}{'baseline':>12}{'budget':>10}")
+
+    failed = False
+    over_budget = []
+    for name, wall in stage_times.items():
+        reference = baseline.get(name)
+        # Budgets are absolute, so they only stand in for a baseline
+        budget = None if baseline else STAGE_BUDGETS.get(name)
+        gated = wall >= MIN_CHECK_WALL_S
+        regressed = (
+            gated
+            and reference is not None
+            and throughput[name] < reference * (1 - args.tolerance)
+        )
+        if gated and budget is not None and throughput[name] < budget:
+            over_budget.append(name)
+            regressed = True
+        failed = failed or regressed
+        mark = "❌" if regressed else "  "
+        ref = f"{reference:12.1f}" if reference is not None else f"{'-':>12}"
+        cap = f"{budget:10.0f}" if budget is not None else f"{'-':>10}"
+        print(f"{name:<14}{wall:10.3f}{throughput[name]:12.1f}{ref}{cap} {mark}")
+
+    if over_budget:
+        print(f"\n❌ Below throughput budget: {', '.join(over_budget)}")
+
+    missed = {}
+    for signal, peaks in runs[-1][2].items():
+        missed_bursts = check_peaks(peaks, args.duration, args.bursts)
+        if missed_bursts:
+            missed[signal] = missed_bursts
+            print(f"\n❌ {signal.capitalize()} peaks missed bursts at: {missed_bursts}")
+            failed = True
+    if not missed:
+        print(f"\n✅ All {args.bursts} bursts detected (loudness and saliency)")
+
+    if not baseline:
+        print("ℹ️ No baseline for this scenario (use --save-baseline)")
+        if args.require_baseline and not args.save_baseline:
+            print(f"❌ --require-baseline: nothing stored for it in {args.baseline}")
+            failed = True
+
+    if args.save_baseline:
+        save_baseline(args.baseline, key, throughput)
+        print(f"💾 Baseline saved to {args.baseline}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "scenario": key,
+                "wall_s": stage_times,
+                "throughput": throughput,
+                "baseline": baseline,
+                "missed_bursts": missed,
+                "budgets": STAGE_BUDGETS,
+                "regressed": failed,
+            }, f, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Smart-cut correctness check on real H.264 media.
+
+Encodes short synthetic sources the way different tools do (B-frames
+and extra references, open GOPs, baseline without CABAC, a non-zero
+start time, other audio layouts), cuts each one with smart_cut and
+verifies the joined output:
+
+- decodes without a single decoder error
+- has the expected number of video frames
+- reproduces the stream-copied GOPs bit for bit (decoded frame hashes
+  equal those of the source over the same span)
+- keeps audio aligned with video (no drift from per-piece priming)
+
+Exits non-zero when any scenario fails.
+
+Usage:
+    python benchmarks/check_smart_cut.py [--start 3.3] [--end 17.7] [--keep]
+"""
+import os
+import sys
+import shutil
+import argparse
+import subprocess
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from utils.video_utils import smart_cut             # noqa: E402
+from utils.probe_utils import probe_media           # noqa: E402
+
+
+WORK_DIR = os.path.join(REPO_ROOT, "output", "bench", "smart_cut")
+DURATION_S = 24
+FPS = 25
+MAX_AV_DRIFT_S = 0.05
+
+# name -> (video encoder args, extra output args, audio rate, channels)
+SCENARIOS = {
+    "high-bframes-refs": (
+        ["-profile:v", "high", "-x264-params", "keyint=50:bframes=3:ref=4:b-pyramid=normal"],
+        [], 44100, 1
+    ),
+    "main-open-gop": (
+        ["-profile:v", "main", "-x264-params", "keyint=50:open-gop=1:scenecut=0"],
+        [], 44100, 2
+    ),
+    "baseline-start-offset": (
+        ["-profile:v", "baseline", "-x264-params", "keyint=40"],
+        ["-output_ts_offset", "1.5"], 48000, 2
+    ),
+    "high-other-tools": (
+        ["-profile:v", "high", "-crf", "28",
+         "-x264-params", "keyint=60:8x8dct=0:weightp=0:ref=1:bframes=1"],
+        [], 32000, 1
+    ),
+}
+
+
+def _run(cmd):
+    return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+
+
+def make_source(name, video_args, extra_args, rate, channels):
+    path = os.path.join(WORK_DIR, f"src_{name}.mp4")
+    _run([
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size=320x240:rate={FPS}:duration={DURATION_S}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate={rate}:duration={DURATION_S}",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", *video_args,
+        "-c:a", "aac", "-ac", str(channels),
+        *extra_args,
+        path
+    ])
+    return path
+
+
+def frame_hashes(path, start=None, length=None):
+    seek = ["-ss", f"{start:.6f}", "-t", f"{length:.6f}"] if start is not None else []
+    out = _run([
+        "ffmpeg", "-v", "error", *seek, "-i", path,
+        "-map", "0:v:0", "-f", "framemd5", "-"
+    ]).stdout.decode()
+    return [line.rsplit(",", 1)[1].strip() for line in out.splitlines() if not line.startswith("#")]
+
+
+def stream_end(path, stream):
+    """End time (seconds) of a stream: last packet pts + duration."""
+    out = _run([
+        "ffmpeg", "-v", "error", "-i", path,
+        "-map", f"0:{stream}:0", "-c", "copy", "-f", "framecrc", "-"
+    ]).stdout.decode()
+    tb, end = None, 0.0
+    for line in out.splitlines():
+        if line.startswith("#tb 0:"):
+            num, den = line.split(":", 1)[1].strip().split("/")
+            tb = float(num) / float(den)
+        elif line and not line.startswith("#"):
+            fields = [f.strip() for f in line.split(",")]
+            end = max(end, (int(fields[2]) + int(fields[3])) * tb)
+    return end
+
+
+def check(name, start, end):
+    video_args, extra_args, rate, channels = SCENARIOS[name]
+    source = make_source(name, video_args, extra_args, rate, channels)
+    output = os.path.join(WORK_DIR, f"cut_{name}.mp4")
+    smart_cut(source, start, end, output)
+
+    problems = []
+
+    errors = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", output, "-f", "null", "-"],
+        stderr=subprocess.PIPE
+    ).stderr.decode().strip()
+    if errors:
+        problems.append(f"decoder errors: {errors.splitlines()[0]}")
+
+    # Each re-encoded edge may start on the frame showing at its cut
+    # point, i.e. one frame early
+    expected = round((end - start) * FPS)
+    cut = frame_hashes(output)
+    if not expected <= len(cut) <= expected + 2:
+        problems.append(f"{len(cut)} frames, expected {expected}")
+
+    idr = [t for t in probe_media(source).idr_frames() if start <= t <= end]
+    copied = len(idr) >= 2
+    if copied:
+        # The copied GOPs must appear in the output as one unbroken run
+        reference = frame_hashes(source, idr[0], idr[-1] - idr[0])
+        at = cut.index(reference[0]) if reference[0] in cut else -1
+        if at < 0 or cut[at:at + len(reference)] != reference:
+            problems.append("stream-copied GOPs differ from the source")
+
+    drift = abs(stream_end(output, "a") - stream_end(output, "v"))
+    if drift > MAX_AV_DRIFT_S:
+        problems.append(f"audio ends {drift * 1000:.0f} ms off the video")
+
+    mode = f"{len(idr) - 1} GOP(s) copied" if copied else "re-encoded"
+    return problems, mode
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--start", type=float, default=3.3)
+    parser.add_argument("--end", type=float, default=17.7)
+    parser.add_argument("--keep", action="store_true", help="keep the media in " + WORK_DIR)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.makedirs(WORK_DIR, exist_ok=True)
+
+    failed = False
+    try:
+        for name in SCENARIOS:
+            problems, mode = check(name, args.start, args.end)
+            failed = failed or bool(problems)
+            mark = "❌" if problems else "✅"
+            print(f"{mark} {name:<24} {mode}")
+            for problem in problems:
+                print(f"     {problem}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
-from moviepy import VideoFileClip
+import os
+import argparse
 
-from utils.audio_utils import extract_loudness_peaks
-from utils.transcript_utils import (
-    transcribe_video,
-    get_relevant_segments
+from utils.cache_utils import ArtifactCache, STAGES
+from utils.asr_utils import ASR_BACKENDS
+from utils.pipeline_utils import ReelPipeline
+from utils.video_utils import PLAN_FILE
+from utils.probe_utils import probe_media
+from utils.batch_utils import (
+    BatchRunner,
+    discover_videos,
+    format_report,
+    BATCH_DIR,
+    BATCH_STAGES
 )
-from utils.gemini_utils import rank_segments_with_gemini
-from utils.video_utils import generate_reels
+from utils import profiling_utils
 
 
 # -------------------------------------------------
@@ -18,32 +25,270 @@ OUTPUT_DIR = "output/clips"
 TOP_K_PEAKS = 5
 MIN_WORDS = 6
 PEAK_WINDOW = 15          # seconds
+TRANSCRIBE_WORKERS = 1    # >1 transcribes silence-split chunks in parallel
+
+
+# -------------------------------------------------
+# Command line
+# -------------------------------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="ByteSize reel pipeline")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Recompute every stage and store nothing in output/cache"
+    )
+    parser.add_argument(
+        "--refresh-stage",
+        action="append",
+        default=[],
+        choices=STAGES,
+        help="Recompute this stage even if cached (repeatable)"
+    )
+    parser.add_argument(
+        "--heuristic",
+        action="store_true",
+        help="Skip Gemini and keep the audio/text fusion ranking"
+    )
+    parser.add_argument(
+        "--full-transcript",
+        action="store_true",
+        help="Transcribe the whole video instead of only the regions "
+             "around the loudness peaks"
+    )
+    parser.add_argument(
+        "--no-vad",
+        action="store_true",
+        help="Let silence, music and applause reach peak picking and Whisper"
+    )
+    parser.add_argument(
+        "--rms-peaks",
+        action="store_true",
+        help="Pick highlight peaks on loudness alone instead of the "
+             "loudness + flux + pitch + speech-rate saliency curve"
+    )
+    parser.add_argument(
+        "--asr-backend",
+        default="whisper",
+        choices=ASR_BACKENDS,
+        help="Speech recognition engine; faster-whisper runs int8 CTranslate2 "
+             "on CPU (default whisper)"
+    )
+    parser.add_argument(
+        "--preview",
+        nargs="?",
+        const="preview",
+        choices=("preview", "poster"),
+        help="Render quick low-res proxies (or just poster frames) to review "
+             "the picks; the cut plan is saved for --promote"
+    )
+    parser.add_argument(
+        "--single-decode",
+        action="store_true",
+        help="Cut reels that lie close together on the source from one "
+             "shared decode (one ffmpeg process per group)"
+    )
+    parser.add_argument(
+        "--smart-cut",
+        action="store_true",
+        help="Experimental: stream-copy the whole GOPs of horizontal reels "
+             "and re-encode only their edges (H.264 sources; see "
+             "benchmarks/check_smart_cut.py)"
+    )
+    parser.add_argument(
+        "--promote",
+        metavar="REELS",
+        help="Render reels from the saved plan at final quality, e.g. "
+             "'1,3' or 'all' (skips every analysis stage)"
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="DIR_OR_MANIFEST",
+        help="Process every video in a directory, or listed in a manifest "
+             "(.txt: one path per line, .json: list of paths)"
+    )
+    parser.add_argument(
+        "--batch-output",
+        default=BATCH_DIR,
+        metavar="DIR",
+        help=f"Batch output root; one sub-directory per video (default {BATCH_DIR})"
+    )
+    parser.add_argument(
+        "--concurrency",
+        action="append",
+        default=[],
+        metavar="STAGE=N",
+        help=f"Batch workers for one stage ({', '.join(BATCH_STAGES)}); repeatable"
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Re-run batch videos that an earlier run already completed"
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=profiling_utils.PROFILE_DIR,
+        metavar="DIR",
+        help="Record per-stage timings and write summary.json + a Chrome "
+             f"trace.json to DIR (default {profiling_utils.PROFILE_DIR})"
+    )
+    args = parser.parse_args()
+
+    concurrency = {}
+    for item in args.concurrency:
+        stage, _, value = item.partition("=")
+        if stage not in BATCH_STAGES or not value.isdigit() or int(value) < 1:
+            parser.error(f"--concurrency expects STAGE=N with STAGE in {BATCH_STAGES}")
+        concurrency[stage] = int(value)
+    args.concurrency = concurrency
+
+    if args.promote and args.batch:
+        parser.error("--promote renders one saved plan; it cannot be combined with --batch")
+
+    if args.promote and args.promote != "all":
+        try:
+            args.promote = [int(i) for i in args.promote.split(",")]
+        except ValueError:
+            parser.error("--promote expects 'all' or reel numbers like 1,3")
+
+    return args
+
+
+def pipeline_options(args):
+    """
+    ReelPipeline options shared by the single-video, --promote and
+    --batch paths (output_dir is per mode).
+    """
+    return {
+        "top_k_peaks": TOP_K_PEAKS,
+        "peak_window": PEAK_WINDOW,
+        "min_words": MIN_WORDS,
+        "vad": not args.no_vad,
+        "peak_signal": "rms" if args.rms_peaks else "saliency",
+        "model_size": "base",
+        "transcribe_workers": TRANSCRIBE_WORKERS,
+        "asr_backend": args.asr_backend,
+        "transcript_mode": "full" if args.full_transcript else "selective",
+        "top_k_reels": 5,
+        "ranker": "heuristic" if args.heuristic else "gemini",
+        "smart_cut": args.smart_cut,
+    }
+
+
+def make_cache(args):
+    return ArtifactCache(
+        enabled=not args.no_cache,
+        refresh=args.refresh_stage
+    )
+
+
+# -------------------------------------------------
+# Batch Mode
+# -------------------------------------------------
+def run_batch(args):
+    videos = discover_videos(args.batch)
+    if not videos:
+        print(f"⚠️ No videos found in {args.batch}")
+        return
+
+    print(f"\n================ ByteSize Batch ({len(videos)} videos) ================\n")
+
+    runner = BatchRunner(
+        videos,
+        output_root=args.batch_output,
+        cache=make_cache(args),
+        concurrency=args.concurrency,
+        resume=not args.no_resume,
+        render_mode="batched" if args.single_decode else "fused",
+        render_tier=args.preview or "final",
+        **pipeline_options(args)
+    )
+    records = runner.run()
+
+    print("\n📋 Batch report:")
+    print(format_report(records))
+    print(f"\n   Status : {runner.status_path}\n")
+
+
+# -------------------------------------------------
+# Output listing
+# -------------------------------------------------
+def print_reels(reels):
+    for r in reels:
+        if "error" in r:
+            print(f"   ❌ Reel {r['index']} failed: {r['error']}")
+            print()
+            continue
+        for name in ("horizontal", "vertical", "captioned", "poster"):
+            if name in r:
+                print(f"   {name.capitalize():<11}:", r[name])
+        print()
+
+
+# -------------------------------------------------
+# Promote previewed reels
+# -------------------------------------------------
+def run_promote(args):
+    plan_path = os.path.join(OUTPUT_DIR, PLAN_FILE)
+    if not os.path.exists(plan_path):
+        print(f"⚠️ No saved plan at {plan_path}. Run with --preview first.")
+        return
+
+    # Same options as the preview run: the plan is only promoted if it
+    # was made from this video under the same config
+    pipeline = ReelPipeline(
+        VIDEO_PATH,
+        cache=make_cache(args),
+        output_dir=OUTPUT_DIR,
+        render_mode="batched" if args.single_decode else "fused",
+        **pipeline_options(args)
+    )
+
+    indices = None if args.promote == "all" else args.promote
+    try:
+        reels = pipeline.promote(indices)
+    except ValueError as e:
+        print(f"⚠️ {e}")
+        return
+
+    print("\n✅ Final reels:")
+    print_reels(reels)
 
 
 # -------------------------------------------------
 # Main Pipeline
 # -------------------------------------------------
-def main():
+def run_pipeline(args):
     print("\n================ ByteSize Pipeline ================\n")
 
+    pipeline = ReelPipeline(
+        VIDEO_PATH,
+        cache=make_cache(args),
+        output_dir=OUTPUT_DIR,
+        render_mode="batched" if args.single_decode else "fused",
+        render_tier=args.preview or "final",
+        **pipeline_options(args)
+    )
+
     # -------------------------------------------------
     # 1. Video Sanity Check
     # -------------------------------------------------
-    print("🔍 Loading input video...")
-    video = VideoFileClip(VIDEO_PATH)
+    print("🔍 Probing input video...")
+    media = probe_media(VIDEO_PATH)
+    width, height = media.display_size
     print("✅ Video loaded")
-    print(f"   Duration   : {video.duration:.2f}s")
-    print(f"   Resolution : {video.size}")
-    video.close()
+    print(f"   Duration   : {media.duration:.2f}s")
+    print(f"   Resolution : {width}x{height}")
+    if media.fps:
+        print(f"   Frame rate : {media.fps:.2f} fps")
+    print(f"   Codecs     : {media.video_codec} / {media.audio_codec or 'no audio'}")
 
     # -------------------------------------------------
     # 2. Audio Loudness Peaks
     # -------------------------------------------------
     print("\n🔊 Extracting loudness peaks...")
-    peaks = extract_loudness_peaks(
-        VIDEO_PATH,
-        top_k=TOP_K_PEAKS
-    )
+    peaks = pipeline.peaks()
 
     if not peaks:
         print("⚠️ No audio peaks detected. Exiting.")
@@ -57,10 +302,7 @@ def main():
     # 3. Transcription (Whisper)
     # -------------------------------------------------
     print("\n🧠 Transcribing video with OpenAI Whisper...")
-    segments = transcribe_video(
-        VIDEO_PATH,
-        model_size="base"
-    )
+    segments = pipeline.transcript()
 
     if not segments:
         print("⚠️ Transcription failed or empty. Exiting.")
@@ -72,12 +314,7 @@ def main():
     # 4. Heuristic Multimodal Fusion
     # -------------------------------------------------
     print("\n🔗 Selecting candidate highlight segments...")
-    candidate_segments = get_relevant_segments(
-        segments=segments,
-        peaks=peaks,
-        window=PEAK_WINDOW,
-        min_words=MIN_WORDS
-    )
+    candidate_segments = pipeline.candidates()
 
     if not candidate_segments:
         print("⚠️ No high-value segments found. Exiting.")
@@ -88,11 +325,11 @@ def main():
     # -------------------------------------------------
     # 5. Semantic Refinement (Gemini 2.5 Flash)
     # -------------------------------------------------
-    print("\n🤖 Refining highlights with Gemini 2.5 Flash...")
-    refined_segments = rank_segments_with_gemini(
-        candidate_segments,
-        top_k=5
-    )
+    if args.heuristic:
+        print("\n📏 Ranking highlights heuristically (Gemini disabled)...")
+    else:
+        print("\n🤖 Refining highlights with Gemini 2.5 Flash...")
+    refined_segments = pipeline.ranking()
 
     if not refined_segments:
         print("⚠️ Gemini returned no usable segments. Exiting.")
@@ -112,27 +349,44 @@ def main():
     # -------------------------------------------------
     print("\n🎬 Generating reels (Dynamic 40–100s)...")
 
-    reels = generate_reels(
-        video_path=VIDEO_PATH,
-        segments=refined_segments,
-        transcript_segments=segments,   # FULL Whisper transcript
-        output_dir=OUTPUT_DIR
-    )
+    reels = pipeline.reels()
 
     if not reels:
         print("⚠️ Reel generation failed.")
         return
 
     print("\n✅ Reels generated successfully:")
-    for r in reels:
-        print("   Horizontal :", r["horizontal"])
-        print("   Vertical   :", r["vertical"])
-        print("   Captioned  :", r["captioned"])
-        print()
+    print_reels(reels)
+
+    if args.preview:
+        print("👀 Review the previews, then render the keepers with e.g.")
+        print("   python main.py --promote 1,3\n")
 
     print("=============== Pipeline Complete ===============\n")
 
 
+def main():
+    args = parse_args()
+
+    if args.profile:
+        profiling_utils.enable()
+
+    try:
+        if args.promote:
+            run_promote(args)
+        elif args.batch:
+            run_batch(args)
+        else:
+            run_pipeline(args)
+    finally:
+        if args.profile:
+            summary_path, trace_path = profiling_utils.write_report(args.profile)
+            print("\n⏱️ Stage profile:")
+            print(profiling_utils.format_summary())
+            print(f"\n   Summary : {summary_path}")
+            print(f"   Trace   : {trace_path} (open in chrome://tracing or Perfetto)\n")
+
+
 # -------------------------------------------------
 # Entry Point
 # -------------------------------------------------
@@ -0,0 +1,133 @@
+# -------------------------------------------------
+# ASR backends
+# -------------------------------------------------
+# Every backend loads into an object with Whisper's
+# `transcribe(audio, **options) -> {"segments": [...]}` interface, so
+# transcript_utils, the model registry and the process pool never care
+# which engine is behind it.
+#
+#   "whisper"         – openai-whisper on PyTorch (float32 / float16)
+#   "faster-whisper"  – CTranslate2 Whisper, int8-quantized on CPU
+ASR_BACKENDS = ("whisper", "faster-whisper")
+
+DTYPES = {
+    "whisper": ("float32", "float16"),
+    "faster-whisper": ("int8", "int8_float32", "int8_float16", "float16", "float32"),
+}
+
+# Weight sizes (MB) of the int8 CTranslate2 conversions, for the
+# registry's memory budget; CTranslate2 does not report its own
+_CT2_INT8_MB = {
+    "tiny": 40,
+    "base": 75,
+    "small": 250,
+    "medium": 770,
+    "large-v2": 1550,
+    "large-v3": 1550,
+}
+
+
+def resolve_device(backend, device=None):
+    if device is not None:
+        return str(device)
+
+    if backend == "faster-whisper":
+        import ctranslate2
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def resolve_dtype(backend, device, dtype=None):
+    if backend not in ASR_BACKENDS:
+        raise ValueError(f"Unknown ASR backend: {backend}")
+
+    if dtype is None:
+        if backend == "faster-whisper":
+            dtype = "float16" if device.startswith("cuda") else "int8"
+        else:
+            dtype = "float32"
+
+    if dtype not in DTYPES[backend]:
+        raise ValueError(f"Unsupported {backend} dtype: {dtype}")
+    return dtype
+
+
+# -------------------------------------------------
+# faster-whisper adapter
+# -------------------------------------------------
+class FasterWhisperModel:
+    """
+    CTranslate2 Whisper behind openai-whisper's transcribe() interface.
+
+    Decoding matches openai-whisper's defaults (greedy, conditioned on
+    previous text, no VAD) so the two backends are comparable.
+    """
+
+    def __init__(self, model_size, device="cpu", compute_type="int8", cpu_threads=0):
+        # Deferred: CTranslate2 is only needed for this backend
+        from faster_whisper import WhisperModel
+
+        self.model_size = model_size
+        self.model = WhisperModel(
+            model_size,
+            device=device,
+            compute_type=compute_type,
+            cpu_threads=cpu_threads
+        )
+
+    def transcribe(self, audio, word_timestamps=False, fp16=None, **_):
+        # fp16 is a PyTorch-backend option; the compute type covers it
+        segments, info = self.model.transcribe(
+            audio,
+            beam_size=1,
+            word_timestamps=word_timestamps,
+            condition_on_previous_text=True,
+            vad_filter=False
+        )
+
+        result = {"language": info.language, "segments": []}
+        for seg in segments:
+            entry = {"start": seg.start, "end": seg.end, "text": seg.text}
+            if word_timestamps:
+                entry["words"] = [
+                    {"start": w.start, "end": w.end, "word": w.word}
+                    for w in seg.words or []
+                ]
+            result["segments"].append(entry)
+        return result
+
+
+# -------------------------------------------------
+# Loading
+# -------------------------------------------------
+def load_asr_model(backend, model_size, device, dtype, threads=0):
+    """
+    Load one model; returns (model, approximate weight bytes).
+
+    threads caps CPU threads for faster-whisper (0: CTranslate2's
+    default); the PyTorch backend is capped with torch.set_num_threads.
+    """
+    if backend == "faster-whisper":
+        model = FasterWhisperModel(
+            model_size,
+            device=device,
+            compute_type=dtype,
+            cpu_threads=threads
+        )
+        mb = _CT2_INT8_MB.get(model_size, 500)
+        if not dtype.startswith("int8"):
+            mb *= 2 if dtype == "float16" else 4
+        return model, mb * 1024 * 1024
+
+    # Deferred: torch + whisper take seconds to import
+    import whisper
+
+    model = whisper.load_model(model_size, device=device)
+    if dtype == "float16":
+        model = model.half()
+
+    tensors = list(model.parameters()) + list(model.buffers())
+    return model, sum(t.numel() * t.element_size() for t in tensors)
+
@@ -1,8 +1,23 @@
 import subprocess
-import librosa
+import tempfile
 import numpy as np
 import os
 
+from utils.profiling_utils import profiled, record_subprocess, run_subprocess
+
+
+# -------------------------------------------------
+# Shared PCM settings
+# -------------------------------------------------
+SAMPLE_RATE = 16000                 # Whisper's native rate
+PIPE_CHUNK_BYTES = 1 << 20          # 1 MiB reads from the ffmpeg pipe
+MMAP_THRESHOLD_S = 30 * 60          # spill to a memory-mapped file past 30 min
+
+# librosa.feature.rms defaults
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+STREAM_BLOCK_SAMPLES = 1 << 18      # ~16 s of 16 kHz audio per block
+
 
 def extract_audio(video_path, audio_path="output/audio/audio.wav"):
     os.makedirs(os.path.dirname(audio_path), exist_ok=True)
@@ -18,25 +33,510 @@ def extract_audio(video_path, audio_path="output/audio/audio.wav"):
         audio_path
     ]
 
-    subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    run_subprocess(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     return audio_path
 
 
-def extract_loudness_peaks(video_path, top_k=5, min_gap=5):
-    audio_path = extract_audio(video_path)
-    y, sr = librosa.load(audio_path, sr=None)
+# -------------------------------------------------
+# Shared audio loading (one decode for every stage)
+# -------------------------------------------------
+def _iter_pcm_bytes(video_path, sr=SAMPLE_RATE, chunk_bytes=PIPE_CHUNK_BYTES):
+    """
+    Stream raw mono f32le PCM from ffmpeg's stdout in fixed-size chunks.
+    Raises RuntimeError once the stream is exhausted if ffmpeg failed.
+    """
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-i", video_path,
+        "-vn",
+        "-ac", "1",
+        "-ar", str(sr),
+        "-f", "f32le",
+        "-acodec", "pcm_f32le",
+        "pipe:1"
+    ]
+
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+
+    completed = False
+    try:
+        while True:
+            block = proc.stdout.read(chunk_bytes)
+            if not block:
+                break
+            yield block
+        completed = True
+    finally:
+        # Closing the pipe early makes ffmpeg exit on SIGPIPE
+        proc.stdout.close()
+        returncode = proc.wait()
+        record_subprocess(cmd, returncode)
+
+    if completed and returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode audio from {video_path}")
+
+
+def iter_audio_blocks(video_path, sr=SAMPLE_RATE, block_samples=STREAM_BLOCK_SAMPLES):
+    """
+    Yield float32 PCM blocks of `block_samples` samples (the last block
+    may be shorter) straight from an ffmpeg pipe.
+    """
+    for block in _iter_pcm_bytes(video_path, sr, block_samples * 4):
+        # Pipe reads only come back short at EOF, so a torn trailing
+        # sample can only ever appear on the final block
+        usable = len(block) - len(block) % 4
+        if usable:
+            yield np.frombuffer(block[:usable], dtype=np.float32)
+
+
+def _iter_array_blocks(audio, block_samples=STREAM_BLOCK_SAMPLES):
+    for i in range(0, len(audio), block_samples):
+        yield np.asarray(audio[i:i + block_samples], dtype=np.float32)
+
+
+def buffer_pcm(blocks, threshold_bytes):
+    """
+    Join raw float32 byte blocks into one read-only array. Up to
+    `threshold_bytes` they are kept in RAM; past that everything is
+    spilled to an anonymous temporary file and mapped with np.memmap.
+    """
+    chunks = []
+    buffered = 0
+    spill = None
+
+    try:
+        for block in blocks:
+            if spill is None and buffered + len(block) > threshold_bytes:
+                spill = tempfile.NamedTemporaryFile(
+                    suffix=".f32", delete=False
+                )
+                spill.writelines(chunks)
+                chunks = []
+
+            if spill is None:
+                chunks.append(block)
+                buffered += len(block)
+            else:
+                spill.write(block)
+    except BaseException:
+        if spill is not None:
+            spill.close()
+            os.remove(spill.name)
+        raise
+
+    if spill is None:
+        data = b"".join(chunks)
+        # Trim a torn trailing sample, if any
+        data = data[:len(data) - len(data) % 4]
+        return np.frombuffer(data, dtype=np.float32)
+
+    spill.close()
+    size = os.path.getsize(spill.name) // 4
+    audio = np.memmap(spill.name, dtype=np.float32, mode="r", shape=(size,))
+
+    # The mapping stays valid after unlinking on POSIX systems
+    try:
+        os.remove(spill.name)
+    except OSError:
+        pass
+
+    return audio
+
+
+@profiled("load_audio")
+def load_audio(video_path, sr=SAMPLE_RATE, mmap_threshold_s=MMAP_THRESHOLD_S):
+    """
+    Decode the audio track of a video exactly once into mono float32 PCM.
+
+    ffmpeg writes raw f32le samples to a pipe that is read straight into
+    a NumPy buffer — no WAV file is written. Inputs longer than
+    `mmap_threshold_s` seconds are spilled to an anonymous temporary file
+    and returned as a read-only np.memmap, so multi-hour inputs do not
+    have to fit in RAM.
+
+    The returned array is what `extract_loudness_peaks(audio=...)` and
+    `transcribe_video(audio=...)` expect (16 kHz by default).
+    """
+    return buffer_pcm(
+        _iter_pcm_bytes(video_path, sr),
+        int(mmap_threshold_s * sr) * 4
+    )
+
+
+# -------------------------------------------------
+# Streaming loudness (constant memory)
+# -------------------------------------------------
+def _frame_view(buf, n_frames, frame_length, hop_length):
+    """The first `n_frames` frames of `buf` as a strided (n, frame_length) view."""
+    frames = np.lib.stride_tricks.sliding_window_view(buf, frame_length)
+    return frames[:(n_frames - 1) * hop_length + 1:hop_length]
+
+
+def _frame_rms(frames):
+    """
+    RMS of each row of a (n, frame_length) frame view.
+
+    Reduced over the transposed view, i.e. laid out exactly like
+    librosa.util.frame (samples on axis 0), so the float32 reduction
+    order — and therefore every value — is identical to
+    librosa.feature.rms on the whole signal.
+    """
+    return np.sqrt(np.mean(np.square(frames.T), axis=0))
+
+
+def iter_frame_blocks(blocks, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH):
+    """
+    Centred framing (librosa's center=True) of a stream of PCM blocks.
+
+    Consumes blocks of any size and yields (first_frame_index, frames)
+    as soon as frames are complete, `frames` being a (n, frame_length)
+    view that is only valid until the next item. Samples that straddle a
+    block boundary are carried over, so frame overlap is handled exactly.
+    """
+    pad = frame_length // 2
+
+    # center=True: frame k is centred on sample k * hop_length
+    carry = np.zeros(pad, dtype=np.float32)
+    frame_index = 0
+
+    def _count(buf):
+        if len(buf) < frame_length:
+            return 0
+        return 1 + (len(buf) - frame_length) // hop_length
+
+    for block in blocks:
+        buf = np.concatenate([carry, block])
+        n = _count(buf)
+        if n:
+            yield frame_index, _frame_view(buf, n, frame_length, hop_length)
+            frame_index += n
+        carry = buf[n * hop_length:]
+
+    # Trailing zero padding closes the last frames
+    buf = np.concatenate([carry, np.zeros(pad, dtype=np.float32)])
+    n = _count(buf)
+    if n:
+        yield frame_index, _frame_view(buf, n, frame_length, hop_length)
+
+
+def iter_rms_frames(blocks, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH):
+    """
+    Incremental equivalent of
+    librosa.feature.rms(y, frame_length, hop_length, center=True).
+
+    Yields (first_frame_index, rms) per block of complete frames
+    (see iter_frame_blocks).
+    """
+    for frame_index, frames in iter_frame_blocks(blocks, frame_length, hop_length):
+        yield frame_index, _frame_rms(frames)
+
+
+# -------------------------------------------------
+# Vectorized peak picking (local maxima + NMS)
+# -------------------------------------------------
+def _window_reduce(x, before, after, reduce, fill):
+    """
+    reduce(x[i - before : i + after + 1]) for every i, in O(n log w).
+
+    Windows are clipped at the array edges by padding with `fill`.
+    Built by doubling: after each pass out[i] covers twice as many
+    samples, and two overlapping power-of-two spans cover any window.
+    """
+    length = before + after + 1
+    out = np.concatenate([
+        np.full(before, fill, dtype=x.dtype),
+        x,
+        np.full(after, fill, dtype=x.dtype)
+    ])
+
+    span = 1
+    while span * 2 <= length:
+        out = reduce(out[:-span], out[span:])
+        span *= 2
+
+    tail = length - span
+    return reduce(out[:len(x)], out[tail:tail + len(x)])
 
-    rms = librosa.feature.rms(y=y)[0]
-    times = librosa.frames_to_time(np.arange(len(rms)), sr=sr)
 
-    top_indices = np.argsort(rms)[::-1]
+def _detect_peaks(curve, lo, hi, radius, prominence, min_frames):
+    """
+    Indices in [lo, hi) of local maxima of `curve` that pass the
+    prominence and minimum-duration thresholds.
 
-    peaks = []
-    for idx in top_indices:
-        t = times[idx]
-        if all(abs(t - p) > min_gap for p in peaks):
-            peaks.append(t)
-        if len(peaks) == top_k:
-            break
+    - prominence: height above the higher of the two minima found
+      within `radius` frames on either side
+    - min_frames: the peak must stay above half its prominence for at
+      least this many consecutive frames (a morphological opening)
+    """
+    v = curve
+    left = np.concatenate([[-np.inf], v[:-1]])
+    right = np.concatenate([v[1:], [-np.inf]])
+
+    # Plateaus resolve to their last frame
+    mask = (v >= left) & (v > right)
+
+    if prominence > 0 or min_frames > 1:
+        base = np.maximum(
+            _window_reduce(v, radius, 0, np.minimum, np.inf),
+            _window_reduce(v, 0, radius, np.minimum, np.inf)
+        )
+        prom = v - base
+        mask &= prom >= prominence
+
+        if min_frames > 1:
+            eroded = _window_reduce(v, 0, min_frames - 1, np.minimum, np.inf)
+            opened = _window_reduce(eroded, min_frames - 1, 0, np.maximum, -np.inf)
+            mask &= opened >= v - 0.5 * prom
+
+    mask[:lo] = False
+    mask[hi:] = False
+    return np.flatnonzero(mask)
+
+
+def _keep_top(values, frames, capacity):
+    """
+    Keep the `capacity` best (value, frame) pairs in O(n) with
+    argpartition. Ties on value prefer the later frame, matching a
+    reversed ascending sort.
+    """
+    if len(values) <= capacity:
+        return values, frames
+
+    kth = len(values) - capacity
+    threshold = values[np.argpartition(values, kth)[kth]]
+
+    above = np.flatnonzero(values > threshold)
+    ties = np.flatnonzero(values == threshold)
+    ties = ties[np.argsort(frames[ties], kind="stable")]
+    keep = np.concatenate([above, ties[len(ties) - (capacity - len(above)):]])
+
+    return values[keep], frames[keep]
+
+
+def _candidate_capacity(top_k, min_gap, sr, hop_length):
+    """
+    Number of loudest candidates the gap suppression can ever visit.
+
+    Every candidate visited before the k-th peak is accepted is either one
+    of the accepted peaks or lies within `min_gap` of one, and each
+    accepted peak covers at most `window` frames — so the top k * window
+    candidates always contain the exact answer.
+    """
+    radius = int(np.floor(min_gap * sr / hop_length)) + 1
+    window = 2 * radius + 1
+    return max(1, top_k) * window
+
+
+def _in_speech(frames, speech, sr, hop_length):
+    """
+    Mask of frame indices whose time falls inside one of the sorted
+    (start_s, end_s) speech intervals.
+    """
+    times = frames * hop_length / float(sr)
+    if not len(speech):
+        return np.zeros(len(times), dtype=bool)
+    bounds = np.asarray(speech, dtype=np.float64)
+    i = np.searchsorted(bounds[:, 0], times, side="right") - 1
+    return (i >= 0) & (times <= bounds[np.maximum(i, 0), 1])
+
+
+def _select_spaced_peaks(values, frames, top_k, min_gap, sr, hop_length):
+    """
+    Non-maximum suppression over `min_gap` seconds: accept candidates
+    from loudest down, skipping any within `min_gap` of an accepted one.
+    Work is bounded by the candidate capacity, not by how many frames
+    end up rejected.
+    """
+    if top_k <= 0:
+        return []
+
+    capacity = _candidate_capacity(top_k, min_gap, sr, hop_length)
+    values, frames = _keep_top(values, frames, capacity)
+
+    order = np.lexsort((frames, values))[::-1]
+    times = frames[order] * hop_length / float(sr)
+
+    accepted = np.empty(top_k)
+    count = 0
+    for t in times:
+        if np.all(np.abs(accepted[:count] - t) > min_gap):
+            accepted[count] = t
+            count += 1
+            if count == top_k:
+                break
+
+    return sorted(accepted[:count].tolist())
+
+
+def _peak_params(min_gap, min_duration, sr, hop_length):
+    """(radius, min_frames) in frames for the given thresholds in seconds."""
+    frames_per_s = sr / float(hop_length)
+    radius = max(1, int(round(min_gap * frames_per_s)))
+    min_frames = max(1, int(round(min_duration * frames_per_s)))
+    return radius, min_frames
+
+
+def pick_peaks(
+    curve,
+    top_k=5,
+    min_gap=5,
+    sr=SAMPLE_RATE,
+    hop_length=HOP_LENGTH,
+    prominence=0.0,
+    min_duration=0.0,
+    speech=None,
+    active=None
+):
+    """
+    Vectorized peak picking on a whole frame curve (e.g. RMS).
+
+    Local maxima → prominence / duration filter → argpartition top
+    candidates → min_gap NMS. Returns sorted peak times in seconds.
+
+    speech, when given, restricts peaks to those (start_s, end_s)
+    intervals (see vad_utils.detect_speech). active, when given, is a
+    per-frame mask of frames allowed to be peaks (e.g. rms > 0, so
+    frames of padding or digital silence never are).
+    """
+    curve = np.asarray(curve, dtype=np.float32)
+    radius, min_frames = _peak_params(min_gap, min_duration, sr, hop_length)
+
+    idx = _detect_peaks(curve, 0, len(curve), radius, prominence, min_frames)
+    if active is not None:
+        idx = idx[np.asarray(active, dtype=bool)[idx]]
+    if speech is not None:
+        idx = idx[_in_speech(idx, speech, sr, hop_length)]
+    return _select_spaced_peaks(
+        curve[idx], idx, top_k, min_gap, sr, hop_length
+    )
+
+
+def _streaming_loudness_peaks(
+    blocks,
+    top_k,
+    min_gap,
+    sr,
+    prominence,
+    min_duration,
+    speech=None
+):
+    """
+    Same result as pick_peaks(rms) without ever holding the whole curve.
+
+    Each RMS block is evaluated together with `context` frames on both
+    sides — enough for every windowed test in _detect_peaks — and only
+    a bounded set of the best candidates is retained.
+    """
+    capacity = _candidate_capacity(top_k, min_gap, sr, HOP_LENGTH)
+    radius, min_frames = _peak_params(min_gap, min_duration, sr, HOP_LENGTH)
+    context = max(1, radius, min_frames - 1)
+
+    values = np.empty(0, dtype=np.float32)
+    frames = np.empty(0, dtype=np.int64)
+
+    buf = np.empty(0, dtype=np.float32)
+    buf_first = 0       # global frame index of buf[0]
+    done = 0            # frames before this are already evaluated
+
+    def _collect(lo, hi):
+        nonlocal values, frames
+        idx = _detect_peaks(buf, lo, hi, radius, prominence, min_frames)
+        # Frames without signal (padding, digital silence) are no peaks
+        idx = idx[buf[idx] > 0]
+        if speech is not None:
+            idx = idx[_in_speech(buf_first + idx, speech, sr, HOP_LENGTH)]
+        values, frames = _keep_top(
+            np.concatenate([values, buf[idx]]),
+            np.concatenate([frames, buf_first + idx]),
+            capacity
+        )
+
+    for _, rms in iter_rms_frames(blocks):
+        buf = np.concatenate([buf, rms])
+        ready = buf_first + len(buf) - context
+
+        if ready > done:
+            _collect(done - buf_first, ready - buf_first)
+            done = ready
+
+            keep_from = max(buf_first, done - context)
+            buf = buf[keep_from - buf_first:]
+            buf_first = keep_from
+
+    # End of stream: the right edge is now the true boundary
+    if done < buf_first + len(buf):
+        _collect(done - buf_first, len(buf))
+
+    return _select_spaced_peaks(values, frames, top_k, min_gap, sr, HOP_LENGTH)
+
+
+@profiled("extract_loudness_peaks")
+def extract_loudness_peaks(
+    video_path,
+    top_k=5,
+    min_gap=5,
+    audio=None,
+    sr=SAMPLE_RATE,
+    streaming=True,
+    prominence=0.0,
+    min_duration=0.0,
+    speech=None
+):
+    """
+    Find the `top_k` loudest moments (seconds), at least `min_gap` apart.
+
+    Pass `audio` (from `load_audio`) to reuse already-decoded PCM instead
+    of decoding the video again.
+
+    Peaks are local maxima of the RMS curve. `prominence` (RMS units)
+    drops bumps that barely rise above their surroundings within
+    `min_gap`; `min_duration` (seconds) drops clicks shorter than that.
+
+    speech, when given, is a list of (start_s, end_s) speech intervals
+    (vad_utils.detect_speech): only frames inside them can be peaks, so
+    applause and music stings never win over what is being said.
+
+    Frames with zero RMS (padding, digital silence) are never peaks, so
+    empty or silent input yields [].
+
+    By default the RMS curve is computed block by block (straight from
+    the ffmpeg pipe when no `audio` is given) and only a bounded set of
+    the loudest candidates is retained, so memory stays flat regardless
+    of input length. `streaming=False` runs librosa on the whole signal;
+    both return the same peaks.
+    """
+    if streaming:
+        if audio is None:
+            blocks = iter_audio_blocks(video_path, sr=sr)
+        else:
+            blocks = _iter_array_blocks(audio)
+        return _streaming_loudness_peaks(
+            blocks, top_k, min_gap, sr, prominence, min_duration, speech
+        )
+
+    if audio is None:
+        audio = load_audio(video_path, sr=sr)
+
+    # Deferred: librosa is only needed for the whole-signal path
+    import librosa
+
+    y = np.asarray(audio, dtype=np.float32)
+    if len(y) == 0:
+        return []
+    rms = librosa.feature.rms(y=y)[0]
 
-    return sorted(peaks)
+    return pick_peaks(
+        rms,
+        top_k=top_k,
+        min_gap=min_gap,
+        sr=sr,
+        prominence=prominence,
+        min_duration=min_duration,
+        speech=speech,
+        active=rms > 0
+    )
@@ -0,0 +1,360 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache_utils import ArtifactCache
+from utils.pipeline_utils import ReelPipeline, DEFAULT_CONFIG
+from utils.profiling_utils import profile_stage
+
+
+# -------------------------------------------------
+# Batch configuration
+# -------------------------------------------------
+BATCH_DIR = "output/batch"
+STATUS_FILE = "batch_status.json"
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".webm", ".m4v", ".avi")
+
+# Batch stages in order. Each gets its own worker pool, so one video can
+# be transcribing while the next is decoding audio, another waits on
+# Gemini and a fourth is encoding.
+BATCH_STAGES = ("analyze", "transcribe", "rank", "render")
+
+DEFAULT_CONCURRENCY = {
+    "analyze": 2,       # ffmpeg audio decode + loudness peaks
+    "transcribe": 1,    # Whisper: one shared model per process
+    "rank": 4,          # Gemini round-trips, mostly waiting on the network
+    "render": 1,        # each video already renders its reels in parallel
+}
+
+# Videos that may wait for a stage on top of the ones it is running.
+# A video only moves on once the next stage has room, so a fast stage
+# stalls instead of piling decoded audio up in front of a slow one.
+DEFAULT_QUEUE_DEPTH = 1
+
+
+class _Skip(Exception):
+    """
+    A video that cannot produce reels (no peaks, no speech, ...).
+    """
+
+
+# -------------------------------------------------
+# Inputs
+# -------------------------------------------------
+def discover_videos(source):
+    """
+    Video paths from a directory (sorted, non-recursive) or a manifest:
+    a .json list of paths, or a text file with one path per line
+    (blank lines and # comments ignored). Relative manifest entries are
+    resolved against the manifest's directory.
+    """
+    if os.path.isdir(source):
+        return [
+            os.path.join(source, name)
+            for name in sorted(os.listdir(source))
+            if name.lower().endswith(VIDEO_EXTENSIONS)
+        ]
+
+    with open(source) as f:
+        if source.endswith(".json"):
+            entries = json.load(f)
+        else:
+            entries = [
+                line.strip() for line in f
+                if line.strip() and not line.lstrip().startswith("#")
+            ]
+
+    base = os.path.dirname(os.path.abspath(source))
+    return [os.path.join(base, path) for path in entries]
+
+
+# -------------------------------------------------
+# Stage bodies (one ReelPipeline per video)
+# -------------------------------------------------
+# Each returns the fields it adds to the video's status record
+def _analyze(pipeline):
+    peaks = pipeline.peaks()
+    if not peaks:
+        raise _Skip("no audio peaks detected")
+    return {"peaks": len(peaks)}
+
+
+def _transcribe(pipeline):
+    segments = pipeline.transcript()
+    # Peaks and transcript are done: later stages never touch the PCM
+    pipeline.release_audio()
+    if not segments:
+        raise _Skip("transcription empty")
+    return {"segments": len(segments)}
+
+
+def _rank(pipeline):
+    if not pipeline.candidates():
+        raise _Skip("no high-value segments found")
+    ranked = pipeline.ranking()
+    if not ranked:
+        raise _Skip("ranking returned no usable segments")
+    return {"ranked": len(ranked)}
+
+
+def _render(pipeline):
+    reels = pipeline.reels()
+
+    failed = [r for r in reels if "error" in r]
+    if reels and len(failed) == len(reels):
+        raise RuntimeError(f"all {len(reels)} reels failed: {failed[0]['error']}")
+    return {"reels": reels}
+
+
+_STAGE_FUNCS = {
+    "analyze": _analyze,
+    "transcribe": _transcribe,
+    "rank": _rank,
+    "render": _render,
+}
+
+
+# -------------------------------------------------
+# Pipelined batch runner
+# -------------------------------------------------
+class BatchRunner:
+    """
+    Run the reel pipeline over many videos with the stages overlapped.
+
+    Every batch stage has its own bounded thread pool (`concurrency`,
+    see DEFAULT_CONCURRENCY). When a video finishes a stage it is queued
+    on the next stage's pool, so stages of different videos run at the
+    same time and each pool works through videos in input order.
+
+    Each stage holds at most its workers plus `queue_depth` videos. A
+    video waits in its current stage until the next one has room, so
+    at most a handful of videos have decoded audio in memory at once,
+    however long the batch.
+
+    Progress goes to <output_root>/batch_status.json after every stage
+    transition. With resume=True, videos already "done" or "skipped"
+    under the same pipeline config are not run again; interrupted or
+    failed videos restart, and the artifact cache makes their finished
+    stages near-free.
+    """
+
+    def __init__(
+        self,
+        videos,
+        output_root=BATCH_DIR,
+        cache=None,
+        concurrency=None,
+        resume=True,
+        queue_depth=DEFAULT_QUEUE_DEPTH,
+        **config
+    ):
+        unknown = set(concurrency or {}) - set(BATCH_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown batch stages: {sorted(unknown)}")
+        if "output_dir" in config:
+            raise ValueError("output_dir is per video in batch mode; use output_root")
+
+        # A path listed twice would run twice into the same directory
+        self.videos = list(dict.fromkeys(os.path.abspath(v) for v in videos))
+        self.output_root = output_root
+        self.cache = cache if cache is not None else ArtifactCache()
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        self.queue_depth = max(0, queue_depth)
+        self.config = config
+        self.config_key = self.cache.stage_key(
+            "batch", {**DEFAULT_CONFIG, **config, "output_dir": output_root}
+        )
+        self.status_path = os.path.join(output_root, STATUS_FILE)
+
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._pending = 0
+        self._records = self._initial_records(resume)
+
+    # ---------------------------------------------
+    # Status file
+    # ---------------------------------------------
+    def _output_dir(self, video_path):
+        # The path hash keeps a/talk.mp4, b/talk.mp4 and talk.mov apart
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+        tag = hashlib.sha1(video_path.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.output_root, f"{stem}-{tag}")
+
+    def _initial_records(self, resume):
+        previous = {}
+        if resume and os.path.exists(self.status_path):
+            with open(self.status_path) as f:
+                previous = json.load(f).get("videos", {})
+
+        records = {}
+        for path in self.videos:
+            old = previous.get(path)
+            if (
+                old is not None
+                and old.get("status") in ("done", "skipped")
+                and old.get("config") == self.config_key
+            ):
+                records[path] = {**old, "resumed": True}
+                continue
+
+            records[path] = {
+                "path": path,
+                "output_dir": self._output_dir(path),
+                "config": self.config_key,
+                "status": "pending",
+                "stage": None,
+                "timings": {},
+            }
+        return records
+
+    def _save(self):
+        # Caller holds self._lock
+        os.makedirs(self.output_root, exist_ok=True)
+        tmp = self.status_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "updated": time.time(),
+                "concurrency": self.concurrency,
+                "videos": self._records,
+            }, f, indent=2, default=str)
+        os.replace(tmp, self.status_path)
+
+    def _update(self, path, **fields):
+        with self._lock:
+            self._records[path].update(fields)
+            self._save()
+
+    # ---------------------------------------------
+    # Scheduling
+    # ---------------------------------------------
+    def _submit(self, stage_index, path, pipeline):
+        # Blocks until the stage has room (see queue_depth)
+        stage = BATCH_STAGES[stage_index]
+        self._slots[stage].acquire()
+        self._pools[stage].submit(self._run_stage, stage_index, path, pipeline)
+
+    def _finish(self):
+        with self._lock:
+            self._pending -= 1
+            if self._pending == 0:
+                self._done.set()
+
+    def _run_stage(self, stage_index, path, pipeline):
+        try:
+            self._run_stage_body(stage_index, path, pipeline)
+        finally:
+            # Only now, once the video is handed to the next stage (or
+            # finished), does this stage admit another one
+            self._slots[BATCH_STAGES[stage_index]].release()
+
+    def _run_stage_body(self, stage_index, path, pipeline):
+        stage = BATCH_STAGES[stage_index]
+        name = os.path.basename(path)
+
+        self._update(path, status="running", stage=stage)
+        start = time.perf_counter()
+
+        try:
+            if pipeline is None:
+                pipeline = ReelPipeline(
+                    path,
+                    cache=self.cache,
+                    output_dir=self._output_dir(path),
+                    **self.config
+                )
+            with profile_stage(f"batch.{stage}", video=name):
+                results = _STAGE_FUNCS[stage](pipeline)
+        except _Skip as e:
+            print(f"⏭️ {name}: {e}")
+            self._record_timing(path, stage, start)
+            self._update(path, status="skipped", reason=str(e))
+            self._finish()
+            return
+        except Exception as e:
+            print(f"❌ {name} failed in {stage}: {e}")
+            self._record_timing(path, stage, start)
+            self._update(path, status="failed", error=f"{type(e).__name__}: {e}")
+            self._finish()
+            return
+
+        self._record_timing(path, stage, start)
+        self._update(path, **results)
+
+        if stage_index + 1 < len(BATCH_STAGES):
+            self._update(path, status="queued")
+            self._submit(stage_index + 1, path, pipeline)
+            return
+
+        print(f"✅ {name}: done")
+        self._update(path, status="done", error=None, reason=None)
+        self._finish()
+
+    def _record_timing(self, path, stage, start):
+        with self._lock:
+            self._records[path]["timings"][stage] = round(
+                time.perf_counter() - start, 3
+            )
+
+    def run(self):
+        """
+        Process every video that still needs it and return the status
+        records (also written to the status file).
+        """
+        todo = [p for p in self.videos if not self._records[p].get("resumed")]
+        resumed = len(self.videos) - len(todo)
+
+        print(
+            f"📦 Batch: {len(todo)} to process, {resumed} already complete "
+            f"(concurrency {self.concurrency})"
+        )
+
+        with self._lock:
+            self._save()
+
+        if not todo:
+            return self._records
+
+        self._pending = len(todo)
+        self._slots = {
+            stage: threading.Semaphore(self.concurrency[stage] + self.queue_depth)
+            for stage in BATCH_STAGES
+        }
+        self._pools = {
+            stage: ThreadPoolExecutor(
+                max_workers=self.concurrency[stage],
+                thread_name_prefix=f"batch-{stage}"
+            )
+            for stage in BATCH_STAGES
+        }
+        try:
+            for path in todo:
+                self._submit(0, path, None)
+            self._done.wait()
+        finally:
+            for pool in self._pools.values():
+                pool.shutdown(wait=True)
+
+        return self._records
+
+
+def format_report(records):
+    """
+    One line per video: status, per-stage seconds and reel count.
+    """
+    lines = []
+    for path, r in records.items():
+        timings = " ".join(
+            f"{stage}={r['timings'][stage]:.1f}s"
+            for stage in BATCH_STAGES
+            if stage in r.get("timings", {})
+        )
+        reels = r.get("reels") or []
+        ok = sum("error" not in x for x in reels)
+        detail = r.get("error") or r.get("reason") or f"{ok}/{len(reels)} reels"
+        lines.append(
+            f"{r['status']:<8} {os.path.basename(path):<32} {timings}  {detail}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import tempfile
+
+import numpy as np
+
+
+# -------------------------------------------------
+# Cache configuration
+# -------------------------------------------------
+CACHE_DIR = "output/cache"
+DEFAULT_MAX_MB = 5 * 1024          # override with IMPBYTE_CACHE_MAX_MB
+HASH_CHUNK_BYTES = 4 << 20
+
+# Pipeline stages, in execution order
+STAGES = ("audio", "speech", "peaks", "transcript", "ranking", "reels")
+
+_hash_memo = {}
+
+
+def hash_file(path):
+    """
+    SHA-256 of a file's content, memoized on (path, size, mtime) so a
+    process only reads each input once.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    digest = _hash_memo.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        _hash_memo[memo_key] = digest
+
+    return digest
+
+
+def remember_hash(path, digest):
+    """
+    Record a digest computed elsewhere (e.g. while streaming an upload
+    to disk) so hash_file() does not read the file again.
+    """
+    stat = os.stat(path)
+    _hash_memo[(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)] = digest
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+# -------------------------------------------------
+# Content-addressed artifact cache
+# -------------------------------------------------
+class ArtifactCache:
+    """
+    On-disk cache of pipeline stage outputs.
+
+    Entries live under <root>/<stage>/<key>/ where the key is a hash of
+    the stage name and its parameters. Callers chain stages by putting
+    the upstream key into the downstream parameters, so changing a
+    late-stage parameter only invalidates that stage and the ones after
+    it. Least recently used entries are evicted past `max_bytes`.
+
+    enabled=False turns every lookup into a miss and stores nothing;
+    stages listed in `refresh` are recomputed and overwritten.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=None, enabled=True, refresh=()):
+        if max_bytes is None:
+            max_mb = float(os.environ.get("IMPBYTE_CACHE_MAX_MB", DEFAULT_MAX_MB))
+            max_bytes = int(max_mb * 1024 * 1024)
+
+        unknown = set(refresh) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown cache stages: {sorted(unknown)}")
+
+        self.root = root
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.refresh = set(refresh)
+
+    # ---------------------------------------------
+    # Keys
+    # ---------------------------------------------
+    def stage_key(self, stage, params):
+        """
+        Deterministic key for a stage run. `params` must be
+        JSON-serialisable (numbers, strings, lists, dicts, upstream keys).
+        """
+        payload = json.dumps(
+            {"stage": stage, "params": params},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, stage, key):
+        return os.path.join(self.root, stage, key)
+
+    # ---------------------------------------------
+    # Lookup / store
+    # ---------------------------------------------
+    def _load(self, stage, key):
+        entry = self._entry_dir(stage, key)
+        meta_path = os.path.join(entry, "meta.json")
+        if not os.path.exists(meta_path):
+            return False, None
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        if meta["kind"] == "array":
+            value = np.load(os.path.join(entry, "value.npy"), mmap_mode="r")
+        elif meta["kind"] == "transcript":
+            # Deferred: keeps the cache importable without the ASR stack
+            from utils.transcript_utils import Transcript
+            value = Transcript.load(os.path.join(entry, "value.npz"))
+        else:
+            with open(os.path.join(entry, "value.pkl"), "rb") as f:
+                value = pickle.load(f)
+
+        if meta["kind"] == "files":
+            value = self._restore_files(entry, value)
+
+        # Touch for LRU ordering
+        os.utime(meta_path)
+        return True, value
+
+    def _over_budget(self, stage, entry, size):
+        # An entry that alone exceeds the budget would only be evicted
+        # straight away (after evicting everything else); drop any older
+        # copy too, so a refreshed stage never reads the stale one
+        if size <= self.max_bytes:
+            return False
+        print(
+            f"⚠️ Not caching {stage}: {size / 2 ** 20:.0f} MB is over "
+            f"the {self.max_bytes / 2 ** 20:.0f} MB cache budget"
+        )
+        shutil.rmtree(entry, ignore_errors=True)
+        return True
+
+    def _store(self, stage, key, value, kind):
+        entry = self._entry_dir(stage, key)
+        # Arrays know their size up front: skip writing one that cannot stay
+        if kind == "array" and self._over_budget(stage, entry, np.asarray(value).nbytes):
+            return
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+        # Build the entry in a scratch dir and swap it in atomically
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=os.path.dirname(entry))
+        try:
+            if kind == "array":
+                np.save(os.path.join(tmp, "value.npy"), np.asarray(value))
+            elif kind == "transcript":
+                value.save(os.path.join(tmp, "value.npz"))
+            else:
+                stored = value
+                if kind == "files":
+                    stored = self._copy_files_in(tmp, value)
+                with open(os.path.join(tmp, "value.pkl"), "wb") as f:
+                    pickle.dump(stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump({"stage": stage, "kind": kind, "created": time.time()}, f)
+
+            if self._over_budget(stage, entry, _dir_size(tmp)):
+                shutil.rmtree(tmp, ignore_errors=True)
+                return
+
+            if os.path.exists(entry):
+                shutil.rmtree(entry)
+            os.replace(tmp, entry)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        self.evict(keep=entry)
+
+    def get_or_compute(self, stage, key, compute, kind="object", store_if=None):
+        """
+        Return the cached value for (stage, key), or run `compute()` and
+        cache its result.
+
+        kind:
+            "object" – any picklable value
+            "array"  – a NumPy array (loaded back memory-mapped)
+            "transcript" – a transcript_utils.Transcript, stored as its
+                       columnar .npz instead of pickled dicts
+            "files"  – a list of {name: path} dicts; the files are copied
+                       into the cache and copied back out on a hit
+
+        store_if, when given, is called with the computed value and can
+        veto caching it (e.g. for degraded fallback results).
+        """
+        if self.enabled and stage not in self.refresh:
+            hit, value = self._load(stage, key)
+            if hit:
+                print(f"⚡ Cache hit: {stage}")
+                return value
+
+        value = compute()
+
+        if self.enabled and (store_if is None or store_if(value)):
+            self._store(stage, key, value, kind)
+
+        return value
+
+    # ---------------------------------------------
+    # File artifacts (rendered reels)
+    # ---------------------------------------------
+    @staticmethod
+    def _copy_files_in(entry, results):
+        # Copies, not hardlinks: ffmpeg -y truncates outputs in place,
+        # which would corrupt a linked cache entry on the next render
+        files_dir = os.path.join(entry, "files")
+        os.makedirs(files_dir, exist_ok=True)
+
+        stored = []
+        for i, outputs in enumerate(results):
+            item = {}
+            for name, path in outputs.items():
+                if not isinstance(path, str) or not os.path.isfile(path):
+                    item[name] = (None, path)
+                    continue
+                cached_name = f"{i}_{name}{os.path.splitext(path)[1]}"
+                shutil.copyfile(path, os.path.join(files_dir, cached_name))
+                item[name] = (cached_name, path)
+            stored.append(item)
+        return stored
+
+    @staticmethod
+    def _restore_files(entry, stored):
+        files_dir = os.path.join(entry, "files")
+
+        results = []
+        for item in stored:
+            outputs = {}
+            for name, (cached_name, path) in item.items():
+                if cached_name is not None:
+                    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                    shutil.copyfile(os.path.join(files_dir, cached_name), path)
+                outputs[name] = path
+            results.append(outputs)
+        return results
+
+    # ---------------------------------------------
+    # Size-bounded eviction
+    # ---------------------------------------------
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the cache fits in
+        `max_bytes`, never the entry directory `keep` (the one just
+        stored).
+        """
+        entries = []
+        for stage in STAGES:
+            stage_dir = os.path.join(self.root, stage)
+            if not os.path.isdir(stage_dir):
+                continue
+            for key in os.listdir(stage_dir):
+                meta_path = os.path.join(stage_dir, key, "meta.json")
+                if not os.path.exists(meta_path):
+                    continue
+                entry = os.path.join(stage_dir, key)
+                entries.append(
+                    (os.path.getmtime(meta_path), _dir_size(entry), entry)
+                )
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
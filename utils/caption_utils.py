@@ -0,0 +1,201 @@
+import os
+
+
+# -------------------------------------------------
+# Caption grouping
+# -------------------------------------------------
+CAPTION_MAX_WORDS = 4       # words on screen at once
+CAPTION_MAX_S = 2.5         # longest a caption stays up
+CAPTION_GAP_S = 0.6         # a pause this long starts a new caption
+
+SENTENCE_END = (".", "?", "!")
+
+# Vertical reel canvas the captions are laid out on
+CAPTION_WIDTH = 1080
+CAPTION_HEIGHT = 1920
+
+
+def reel_words(transcript, start, end):
+    """
+    Words spoken inside [start, end] of a transcript_utils.Transcript,
+    with times relative to `start`. Reads the word columns directly, so
+    no per-segment dicts are built.
+
+    Segments transcribed without word timestamps contribute one
+    pseudo-word spanning the whole segment, so older transcripts still
+    get (segment-level) timed captions.
+    """
+    words = []
+
+    for i in transcript.overlapping(start, end):
+        if transcript.ends[i] <= start:
+            continue
+
+        span = transcript.word_range(i)
+        if len(span):
+            timed = [
+                (
+                    transcript.word_starts[j],
+                    transcript.word_ends[j],
+                    transcript.word_text(j)
+                )
+                for j in span
+            ]
+        else:
+            timed = [(
+                transcript.starts[i],
+                transcript.ends[i],
+                transcript.segment_text(i)
+            )]
+
+        for w_start, w_end, text in timed:
+            text = text.strip()
+            if not text or w_end <= start or w_start >= end:
+                continue
+            words.append({
+                "start": float(max(w_start, start) - start),
+                "end": float(min(w_end, end) - start),
+                "word": text,
+            })
+
+    return words
+
+
+def group_captions(
+    words,
+    max_words=CAPTION_MAX_WORDS,
+    max_s=CAPTION_MAX_S,
+    gap_s=CAPTION_GAP_S
+):
+    """
+    Group consecutive words into caption events of at most `max_words`
+    words / `max_s` seconds, breaking early at pauses and sentence ends.
+
+    Returns [{"start", "end", "words": [...]}].
+    """
+    events = []
+    current = []
+
+    for w in words:
+        if current and (
+            len(current) >= max_words
+            or w["end"] - current[0]["start"] > max_s
+            or w["start"] - current[-1]["end"] > gap_s
+            or current[-1]["word"].endswith(SENTENCE_END)
+        ):
+            events.append(current)
+            current = []
+        current.append(w)
+
+    if current:
+        events.append(current)
+
+    return [
+        {"start": ev[0]["start"], "end": ev[-1]["end"], "words": ev}
+        for ev in events
+    ]
+
+
+# -------------------------------------------------
+# Subtitle files
+# -------------------------------------------------
+def _ass_time(t):
+    cs = int(round(max(0.0, t) * 100))
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def _srt_time(t):
+    ms = int(round(max(0.0, t) * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def _ass_text(text):
+    # Braces open override blocks and backslashes start tags in ASS
+    return text.replace("\\", "/").replace("{", "(").replace("}", ")")
+
+
+def build_ass(events, width=CAPTION_WIDTH, height=CAPTION_HEIGHT):
+    """
+    ASS script with one karaoke event per caption: every word is
+    highlighted (white → yellow) as it is spoken, via \\k timings, so
+    the whole track burns in with a single `subtitles` filter however
+    many words it holds.
+
+    The box style matches the static drawtext caption (white on 65%
+    black, bottom centre).
+    """
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, "
+        "OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, "
+        "ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        # Colours are &HAABBGGRR; alpha 59 ≈ 65% opaque box
+        "Style: Reel,Arial,64,&H0000E5FF,&H00FFFFFF,&H59000000,&H59000000,"
+        "1,0,0,0,100,100,0,0,3,14,0,2,60,60,260,1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, "
+        "Effect, Text",
+    ]
+
+    for ev in events:
+        parts = []
+        cursor = ev["start"]
+        for w in ev["words"]:
+            # Silent gap before the word, then the word itself
+            gap_cs = int(round((w["start"] - cursor) * 100))
+            if gap_cs > 0:
+                parts.append(f"{{\\k{gap_cs}}}")
+            dur_cs = max(1, int(round((w["end"] - max(w["start"], cursor)) * 100)))
+            parts.append(f"{{\\k{dur_cs}}}{_ass_text(w['word'])} ")
+            cursor = max(cursor, w["end"])
+
+        lines.append(
+            f"Dialogue: 0,{_ass_time(ev['start'])},{_ass_time(ev['end'])},"
+            f"Reel,,0,0,0,,{''.join(parts).rstrip()}"
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def build_srt(events):
+    """
+    Plain SRT of the same caption events (no word highlighting), for
+    platforms that take a sidecar subtitle file.
+    """
+    blocks = []
+    for i, ev in enumerate(events, 1):
+        text = " ".join(w["word"] for w in ev["words"])
+        blocks.append(
+            f"{i}\n{_srt_time(ev['start'])} --> {_srt_time(ev['end'])}\n{text}\n"
+        )
+    return "\n".join(blocks)
+
+
+def write_captions(path, events, width=CAPTION_WIDTH, height=CAPTION_HEIGHT):
+    """
+    Write events as .ass or .srt, chosen by the file extension.
+    """
+    if path.endswith(".srt"):
+        content = build_srt(events)
+    else:
+        content = build_ass(events, width=width, height=height)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
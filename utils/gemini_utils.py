@@ -1,63 +1,86 @@
 import os
 import json
-from google import genai
+import time
+import random
+import asyncio
+import threading
+
+from utils.profiling_utils import profiled
 
 
 # =================================================
 # Gemini Configuration
 # =================================================
 
-if "GOOGLE_API_KEY" not in os.environ:
-    raise EnvironmentError(
-        "GOOGLE_API_KEY not found. "
-        "Export it using: export GOOGLE_API_KEY=your_key"
-    )
-
-client = genai.Client(api_key=os.environ["GOOGLE_API_KEY"])
+# The client (and the google-genai import behind it) is only created on
+# first use, so importing this module is free and heuristic-only runs
+# never need GOOGLE_API_KEY.
+_client = None
+_client_lock = threading.Lock()
 
-# VERIFIED AVAILABLE MODEL (from models.list())
-MODEL_NAME = "models/gemini-2.5-flash"
 
+def get_client():
+    """
+    Return the shared Gemini client, creating it on first call.
 
-# =================================================
-# Gemini-based semantic ranking
-# =================================================
-def rank_segments_with_gemini(segments, top_k=5):
+    GEMINI_BASE_URL points the client at a local stub server for testing.
     """
-    Uses Gemini 2.5 Flash to semantically rank transcript segments.
+    global _client
 
-    Input:
-        segments: list of {
-            "start": float,
-            "end": float,
-            "text": str
-        }
+    with _client_lock:
+        if _client is None:
+            if "GOOGLE_API_KEY" not in os.environ:
+                raise EnvironmentError(
+                    "GOOGLE_API_KEY not found. "
+                    "Export it using: export GOOGLE_API_KEY=your_key"
+                )
 
-    Output:
-        list of {
-            "start": float,
-            "end": float,
-            "text": str,
-            "reason": str
-        }
+            from google import genai
 
-    Safety:
-        - Forces JSON-only output
-        - Guards against malformed responses
-        - Falls back to heuristic segments
-    """
+            http_options = None
+            if os.environ.get("GEMINI_BASE_URL"):
+                http_options = {"base_url": os.environ["GEMINI_BASE_URL"]}
 
-    if not segments:
-        return []
+            _client = genai.Client(
+                api_key=os.environ["GOOGLE_API_KEY"],
+                http_options=http_options
+            )
 
-    # Build transcript block
-    transcript = "\n".join(
+    return _client
+
+
+# VERIFIED AVAILABLE MODEL (from models.list())
+MODEL_NAME = "models/gemini-2.5-flash"
+
+# Bump whenever the prompt changes so cached rankings are invalidated
+PROMPT_VERSION = 2
+
+# Windowed (map-reduce) ranking
+WINDOW_TOKENS = 6000            # transcript tokens per map request
+MAX_CONCURRENCY = 4             # map requests in flight at once
+REQUESTS_PER_MINUTE = 60
+MAX_RETRIES = 3
+BACKOFF_BASE_S = 1.0
+
+
+# =================================================
+# Prompt building / response parsing
+# =================================================
+def _format_transcript(segments):
+    return "\n".join(
         f"[{s['start']:.2f} - {s['end']:.2f}] {s['text']}"
         for s in segments
     )
 
+
+def _estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting windows
+    return len(text) // 4 + 1
+
+
+def _build_prompt(transcript, top_k):
     # STRONG JSON-ONLY PROMPT
-    prompt = f"""
+    return f"""
 You are a JSON API.
 
 Your task is to select the TOP {top_k} transcript segments
@@ -84,49 +107,361 @@ Transcript:
 {transcript}
 """
 
+
+def _build_window_prompt(transcript, top_k):
+    # Map step: scores must be comparable across windows
+    return f"""
+You are a JSON API.
+
+Your task is to select up to {top_k} transcript segments from this
+excerpt that are best suited for a 40–100 second social media reel,
+and score each from 0 to 100 on an absolute scale (100 = a standalone,
+high-impact moment; 0 = filler).
+
+STRICT RULES:
+- Respond with RAW JSON ONLY
+- Do NOT include markdown
+- Do NOT include explanations
+- Do NOT include backticks
+- Do NOT include extra text
+- Output must be valid JSON
+
+JSON FORMAT (must match exactly):
+[
+  {{
+    "start": <float>,
+    "end": <float>,
+    "score": <float>,
+    "reason": "<string>"
+  }}
+]
+
+Transcript excerpt:
+{transcript}
+"""
+
+
+def _parse_ranked(raw):
+    """
+    Parse a Gemini response into a list, with hard guards against
+    anything that is not a bare JSON array.
+    """
+    raw = (raw or "").strip()
+
+    if not raw:
+        raise ValueError("Empty Gemini response")
+
+    if not raw.startswith("["):
+        raise ValueError("Non-JSON Gemini response")
+
+    ranked = json.loads(raw)
+
+    if not isinstance(ranked, list):
+        raise ValueError("Gemini JSON is not a list")
+
+    return ranked
+
+
+def _map_back(ranked, segments):
+    """
+    Map Gemini output back to the original segments (start within 0.5 s).
+    """
+    final_segments = []
+
+    for r in ranked:
+        if "start" not in r or "end" not in r:
+            continue
+
+        for s in segments:
+            if abs(s["start"] - float(r["start"])) < 0.5:
+                mapped = {
+                    "start": s["start"],
+                    "end": s["end"],
+                    "text": s["text"],
+                    "reason": r.get("reason", "")
+                }
+                if "score" in r:
+                    mapped["score"] = float(r["score"])
+                final_segments.append(mapped)
+                break
+
+    return final_segments
+
+
+# =================================================
+# Gemini-based semantic ranking
+# =================================================
+@profiled("rank_segments_with_gemini")
+def rank_segments_with_gemini(
+    segments,
+    top_k=5,
+    mode="auto",
+    window_tokens=WINDOW_TOKENS,
+    concurrency=MAX_CONCURRENCY,
+    requests_per_minute=REQUESTS_PER_MINUTE,
+    max_retries=MAX_RETRIES,
+    merge="score",
+    client=None
+):
+    """
+    Uses Gemini 2.5 Flash to semantically rank transcript segments.
+
+    Input:
+        segments: list of {
+            "start": float,
+            "end": float,
+            "text": str
+        }
+
+    Output:
+        list of {
+            "start": float,
+            "end": float,
+            "text": str,
+            "reason": str
+        }
+
+    Modes:
+        "single"   – one prompt with every candidate (original behaviour)
+        "windowed" – map-reduce: token-budgeted windows scored
+                     concurrently, then merged (see rank_segments_windowed)
+        "auto"     – windowed only when the transcript exceeds
+                     `window_tokens`
+
+    `client` may be any object exposing the google-genai
+    `models.generate_content` / `aio.models.generate_content` API, e.g.
+    a fake for tests.
+
+    Safety:
+        - Forces JSON-only output
+        - Guards against malformed responses
+        - Falls back to heuristic segments
+    """
+
+    if not segments:
+        return []
+
+    if mode not in ("auto", "single", "windowed"):
+        raise ValueError(f"Unknown ranking mode: {mode}")
+
+    # Build transcript block
+    transcript = _format_transcript(segments)
+
+    if mode == "windowed" or (
+        mode == "auto" and _estimate_tokens(transcript) > window_tokens
+    ):
+        return asyncio.run(rank_segments_windowed(
+            segments,
+            top_k=top_k,
+            window_tokens=window_tokens,
+            concurrency=concurrency,
+            requests_per_minute=requests_per_minute,
+            max_retries=max_retries,
+            merge=merge,
+            client=client
+        ))
+
+    prompt = _build_prompt(transcript, top_k)
+
     try:
-        response = client.models.generate_content(
+        gemini = client or get_client()
+        response = gemini.models.generate_content(
             model=MODEL_NAME,
             contents=prompt
         )
 
-        raw = response.text.strip()
+        ranked = _parse_ranked(response.text)
+
+        # Final clamp
+        return _map_back(ranked, segments)[:top_k]
 
-        # -------------------------------
-        # Hard guards against bad output
-        # -------------------------------
-        if not raw:
-            raise ValueError("Empty Gemini response")
+    except Exception as e:
+        print("⚠️ Gemini failed, falling back to heuristic segments.")
+        print("   Reason:", e)
+        return rank_segments_heuristic(segments, top_k)
 
-        if not raw.startswith("["):
-            raise ValueError("Non-JSON Gemini response")
 
-        ranked = json.loads(raw)
+def rank_segments_heuristic(segments, top_k=5):
+    """
+    Gemini-free ranking: keep the audio/text fusion order (the same
+    segments Gemini falls back to). Never touches the Gemini client.
+    """
+    return list(segments[:top_k])
 
-        if not isinstance(ranked, list):
-            raise ValueError("Gemini JSON is not a list")
 
-        # Map Gemini output back to original segments
-        final_segments = []
+# =================================================
+# Windowed (map-reduce) ranking
+# =================================================
+def _pack_windows(segments, window_tokens):
+    """
+    Greedily pack consecutive segments into windows of at most
+    `window_tokens` estimated tokens (a single oversized segment still
+    gets a window of its own).
+    """
+    windows = []
+    current = []
+    used = 0
 
-        for r in ranked:
-            if "start" not in r or "end" not in r:
-                continue
+    for seg in segments:
+        cost = _estimate_tokens(seg["text"]) + 8    # timestamp overhead
+        if current and used + cost > window_tokens:
+            windows.append(current)
+            current = []
+            used = 0
+        current.append(seg)
+        used += cost
 
-            for s in segments:
-                if abs(s["start"] - float(r["start"])) < 0.5:
-                    final_segments.append({
-                        "start": s["start"],
-                        "end": s["end"],
-                        "text": s["text"],
-                        "reason": r.get("reason", "")
-                    })
-                    break
+    if current:
+        windows.append(current)
 
-        # Final clamp
-        return final_segments[:top_k]
+    return windows
 
-    except Exception as e:
+
+class _RateLimiter:
+    """
+    Spaces request starts at least 60 / requests_per_minute apart.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _generate_json(gemini, prompt, semaphore, limiter, max_retries):
+    """
+    One Gemini call with concurrency limit, rate limit and exponential
+    backoff (with jitter). Malformed JSON counts as a failed attempt.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            async with semaphore:
+                await limiter.wait()
+                response = await gemini.aio.models.generate_content(
+                    model=MODEL_NAME,
+                    contents=prompt
+                )
+            return _parse_ranked(response.text)
+
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = BACKOFF_BASE_S * (2 ** attempt) * (1 + random.random())
+            print(f"⚠️ Gemini request failed ({e}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+def _score_merge(picks, top_k):
+    """
+    Deterministic merge: highest score first, ties broken by start time,
+    one entry per segment.
+    """
+    seen = set()
+    merged = []
+
+    for p in sorted(picks, key=lambda p: (-p.get("score", 0.0), p["start"])):
+        if p["start"] in seen:
+            continue
+        seen.add(p["start"])
+        merged.append(p)
+
+    return merged[:top_k]
+
+
+async def rank_segments_windowed(
+    segments,
+    top_k=5,
+    window_tokens=WINDOW_TOKENS,
+    concurrency=MAX_CONCURRENCY,
+    requests_per_minute=REQUESTS_PER_MINUTE,
+    max_retries=MAX_RETRIES,
+    merge="score",
+    client=None
+):
+    """
+    Map-reduce ranking for transcripts too long for one prompt.
+
+    Map:    split candidates into token-budgeted windows and ask Gemini
+            for up to `top_k` scored picks per window, at most
+            `concurrency` requests in flight and `requests_per_minute`
+            request starts per minute, each retried with backoff.
+    Reduce: merge="score"  – deterministic merge on the 0–100 scores
+            merge="reduce" – one small final Gemini call over the best
+                             3 × top_k picks (score merge if it fails)
+
+    Windows that fail after all retries are skipped; if every window
+    fails the heuristic fallback (first top_k segments) is returned.
+    """
+    if not segments:
+        return []
+
+    if merge not in ("score", "reduce"):
+        raise ValueError(f"Unknown merge strategy: {merge}")
+
+    try:
+        gemini = client or get_client()
+    except EnvironmentError as e:
+        print("⚠️ Gemini failed, falling back to heuristic segments.")
+        print("   Reason:", e)
+        return rank_segments_heuristic(segments, top_k)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = _RateLimiter(requests_per_minute)
+
+    windows = _pack_windows(segments, window_tokens)
+    print(f"🪟 Ranking {len(segments)} segments in {len(windows)} windows...")
+
+    async def _map(window):
+        prompt = _build_window_prompt(_format_transcript(window), top_k)
+        ranked = await _generate_json(
+            gemini, prompt, semaphore, limiter, max_retries
+        )
+        return _map_back(ranked, window)
+
+    results = await asyncio.gather(
+        *(_map(w) for w in windows),
+        return_exceptions=True
+    )
+
+    picks = []
+    for window, result in zip(windows, results):
+        if isinstance(result, Exception):
+            print(
+                f"⚠️ Window {window[0]['start']:.2f}s–{window[-1]['end']:.2f}s "
+                f"failed: {result}"
+            )
+            continue
+        picks.extend(result)
+
+    if not picks:
         print("⚠️ Gemini failed, falling back to heuristic segments.")
+        return rank_segments_heuristic(segments, top_k)
+
+    merged = _score_merge(picks, len(picks))
+
+    if merge == "score" or len(merged) <= top_k:
+        return merged[:top_k]
+
+    shortlist = sorted(merged[:3 * top_k], key=lambda p: p["start"])
+    prompt = _build_prompt(_format_transcript(shortlist), top_k)
+
+    try:
+        ranked = await _generate_json(
+            gemini, prompt, semaphore, limiter, max_retries
+        )
+        reduced = _map_back(ranked, shortlist)[:top_k]
+        if reduced:
+            return reduced
+    except Exception as e:
+        print("⚠️ Gemini reduce step failed, using score merge.")
         print("   Reason:", e)
-        return segments[:top_k]
+
+    return merged[:top_k]
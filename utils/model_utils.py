@@ -0,0 +1,193 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from utils.asr_utils import resolve_device, resolve_dtype, load_asr_model
+
+
+# -------------------------------------------------
+# Registry configuration
+# -------------------------------------------------
+# Total weight memory the registry may keep resident before it evicts
+# the least recently used model. Override with WHISPER_MODEL_BUDGET_MB.
+DEFAULT_MEMORY_BUDGET_MB = 4096
+
+
+# -------------------------------------------------
+# Process-wide model registry
+# -------------------------------------------------
+class _Entry:
+    def __init__(self, model, nbytes):
+        self.model = model
+        self.nbytes = nbytes
+        self.pins = 0
+        # Whisper installs kv-cache hooks on the model while decoding,
+        # so a single model instance must not transcribe concurrently
+        self.lock = threading.Lock()
+
+
+# Keys are (backend, model_size, device, dtype); see asr_utils
+_models = OrderedDict()         # key -> _Entry, least recently used first
+_key_locks = {}                 # key -> Lock held while that key loads
+_registry_lock = threading.Lock()
+_budget_bytes = int(
+    float(os.environ.get("WHISPER_MODEL_BUDGET_MB", DEFAULT_MEMORY_BUDGET_MB))
+    * 1024 * 1024
+)
+
+
+def _resolve_key(model_size, device=None, dtype=None, backend="whisper"):
+    device = resolve_device(backend, device)
+    return (backend, model_size, device, resolve_dtype(backend, device, dtype))
+
+
+def _evict(keep):
+    """
+    Drop least recently used, unpinned models until the registry fits
+    the budget. The model that was just requested is never evicted.
+    """
+    total = sum(e.nbytes for e in _models.values())
+
+    for key in list(_models):
+        if total <= _budget_bytes:
+            break
+        entry = _models[key]
+        if key == keep or entry.pins:
+            continue
+
+        print(f"♻️ Evicting {key[0]} model {key[1]} ({key[2]}, {key[3]})")
+        del _models[key]
+        total -= entry.nbytes
+
+        if key[0] == "whisper" and key[2].startswith("cuda"):
+            import torch
+            torch.cuda.empty_cache()
+
+
+def _get_entry(key, threads=0):
+    with _registry_lock:
+        entry = _models.get(key)
+        if entry is not None:
+            _models.move_to_end(key)
+            return entry
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    # Only one thread loads a given key; other keys load in parallel
+    with key_lock:
+        with _registry_lock:
+            entry = _models.get(key)
+            if entry is not None:
+                _models.move_to_end(key)
+                return entry
+
+        backend, model_size, device, dtype = key
+        print(f"🧠 Loading {backend} model ({model_size}, {device}, {dtype})...")
+        model, nbytes = load_asr_model(
+            backend, model_size, device, dtype, threads=threads
+        )
+
+        entry = _Entry(model, nbytes)
+
+        with _registry_lock:
+            _models[key] = entry
+            _evict(keep=key)
+
+    return entry
+
+
+def get_whisper_model(
+    model_size="base",
+    device=None,
+    dtype=None,
+    backend="whisper",
+    threads=0
+):
+    """
+    Return a shared Whisper model, loading it only on first use.
+
+    Models are keyed by (backend, model_size, device, dtype) and kept
+    for the lifetime of the process, subject to the memory budget.
+    `backend` picks the engine (see asr_utils.ASR_BACKENDS); `threads`
+    only applies to the load and caps CTranslate2's CPU threads.
+    """
+    key = _resolve_key(model_size, device, dtype, backend)
+    return _get_entry(key, threads).model
+
+
+@contextmanager
+def use_whisper_model(model_size="base", device=None, dtype=None, backend="whisper"):
+    """
+    Borrow a shared Whisper model for one transcription.
+
+    The model is pinned (never evicted) and held exclusively for the
+    duration of the block, so threads can safely share the registry.
+    """
+    key = _resolve_key(model_size, device, dtype, backend)
+
+    while True:
+        entry = _get_entry(key)
+        with _registry_lock:
+            # Another thread may have evicted it between load and pin
+            if _models.get(key) is entry:
+                entry.pins += 1
+                break
+
+    try:
+        with entry.lock:
+            yield entry.model
+    finally:
+        with _registry_lock:
+            entry.pins -= 1
+
+
+def warmup(
+    model_sizes=("base",),
+    device=None,
+    dtype=None,
+    background=False,
+    backend="whisper"
+):
+    """
+    Load models ahead of the first transcription.
+
+    With background=True the loads run in a daemon thread and this
+    returns immediately.
+    """
+    def _load():
+        for size in model_sizes:
+            get_whisper_model(size, device=device, dtype=dtype, backend=backend)
+
+    if not background:
+        _load()
+        return None
+
+    thread = threading.Thread(target=_load, name="whisper-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def set_memory_budget(megabytes):
+    """
+    Change the registry memory budget and evict down to it right away.
+    """
+    global _budget_bytes
+
+    with _registry_lock:
+        _budget_bytes = int(megabytes * 1024 * 1024)
+        _evict(keep=None)
+
+
+def loaded_models():
+    """
+    (backend, model_size, device, dtype) keys currently resident, LRU
+    first.
+    """
+    with _registry_lock:
+        return list(_models)
+
+
+def clear_models():
+    with _registry_lock:
+        for key in [k for k, e in _models.items() if not e.pins]:
+            del _models[key]
@@ -0,0 +1,358 @@
+import os
+
+from utils.audio_utils import load_audio, extract_loudness_peaks, SAMPLE_RATE
+from utils.asr_utils import ASR_BACKENDS
+from utils.vad_utils import detect_speech, speech_ratio, VAD_VERSION
+from utils.saliency_utils import extract_salient_peaks, resolve_weights, SALIENCY_VERSION
+from utils.cache_utils import ArtifactCache, hash_file
+from utils.profiling_utils import profile_stage
+from utils.transcript_utils import (
+    transcribe_video,
+    get_relevant_segments,
+    build_transcript_index,
+    plan_transcript_regions
+)
+from utils.gemini_utils import (
+    rank_segments_with_gemini,
+    rank_segments_heuristic,
+    MODEL_NAME,
+    PROMPT_VERSION
+)
+from utils.video_utils import (
+    generate_reels,
+    promote_reels,
+    write_plan,
+    plan_key,
+    REEL_OUTPUTS,
+    PLAN_FILE
+)
+
+
+# -------------------------------------------------
+# Default pipeline parameters
+# -------------------------------------------------
+DEFAULT_CONFIG = {
+    "top_k_peaks": 5,
+    "min_gap": 5,               # seconds between loudness peaks
+    "peak_signal": "saliency",  # or "rms": loudness alone
+    "saliency_weights": None,   # overrides of saliency_utils.SALIENCY_WEIGHTS
+    "peak_window": 15,          # seconds around a peak to look for speech
+    "min_words": 6,
+    "vad": True,                # peaks and Whisper only consider speech
+    "model_size": "base",
+    "asr_backend": "whisper",   # or "faster-whisper": int8 CTranslate2 on CPU
+    "asr_dtype": None,          # None: the backend's default for the device
+    "transcribe_workers": 1,
+    "transcript_mode": "selective",  # or "full": transcribe the whole video
+    "word_timestamps": True,    # needed for timed word-level captions
+    "top_k_reels": 5,
+    "ranker": "gemini",         # or "heuristic": never touches Gemini
+    "output_dir": "output/clips",
+    "outputs": REEL_OUTPUTS,
+    "render_mode": "fused",     # or "batched": nearby reels share one decode
+    "render_workers": None,     # None: cpu_count // 4 reels at once
+    "smart_cut": False,         # opt-in: stream-copy whole GOPs of horizontal cuts
+    "captions": "words",        # or "static": segment text for the whole reel
+    "render_tier": "final",     # or "preview" / "poster", then promote()
+}
+
+
+# -------------------------------------------------
+# Cached, lazily evaluated pipeline
+# -------------------------------------------------
+class ReelPipeline:
+    """
+    The ByteSize pipeline for one video, one stage per method.
+
+    Every stage is computed on first access, memoized on the instance and
+    stored in the artifact cache under a key that chains the keys of the
+    stages it depends on. Re-running with only a late-stage parameter
+    changed therefore loads everything upstream from the cache — the
+    audio is not even decoded if peaks and transcript are both hits.
+    """
+
+    def __init__(self, video_path, cache=None, **config):
+        unknown = set(config) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown pipeline options: {sorted(unknown)}")
+        if config.get("ranker", "gemini") not in ("gemini", "heuristic"):
+            raise ValueError(f"Unknown ranker: {config['ranker']}")
+        if config.get("transcript_mode", "selective") not in ("selective", "full"):
+            raise ValueError(f"Unknown transcript mode: {config['transcript_mode']}")
+        if config.get("asr_backend", "whisper") not in ASR_BACKENDS:
+            raise ValueError(f"Unknown ASR backend: {config['asr_backend']}")
+        if config.get("peak_signal", "saliency") not in ("saliency", "rms"):
+            raise ValueError(f"Unknown peak signal: {config['peak_signal']}")
+        resolve_weights(config.get("saliency_weights"))
+
+        self.video_path = video_path
+        self.cache = cache if cache is not None else ArtifactCache(enabled=False)
+        self.config = {**DEFAULT_CONFIG, **config}
+        self._values = {}
+        self._keys = {}
+
+    # ---------------------------------------------
+    # Keys
+    # ---------------------------------------------
+    def _video_id(self):
+        if "video" not in self._keys:
+            # Hashing is only worth it when the cache is in use
+            if self.cache.enabled:
+                self._keys["video"] = hash_file(self.video_path)
+            else:
+                self._keys["video"] = self.video_path
+        return self._keys["video"]
+
+    def key(self, stage):
+        if stage in self._keys:
+            return self._keys[stage]
+
+        c = self.config
+
+        if stage == "audio":
+            params = {"video": self._video_id(), "sr": SAMPLE_RATE}
+        elif stage == "speech":
+            params = {"audio": self.key("audio"), "version": VAD_VERSION}
+        elif stage == "peaks":
+            params = {
+                "audio": self.key("audio"),
+                "speech": self.key("speech") if c["vad"] else None,
+                "top_k": c["top_k_peaks"],
+                "min_gap": c["min_gap"],
+                "signal": c["peak_signal"],
+            }
+            if c["peak_signal"] == "saliency":
+                params["weights"] = resolve_weights(c["saliency_weights"])
+                params["version"] = SALIENCY_VERSION
+        elif stage == "transcript":
+            params = {
+                "audio": self.key("audio"),
+                "model_size": c["model_size"],
+                "backend": c["asr_backend"],
+                "dtype": c["asr_dtype"],
+                "workers": c["transcribe_workers"],
+                "word_timestamps": c["word_timestamps"],
+                "mode": c["transcript_mode"],
+                "speech": self.key("speech") if c["vad"] else None,
+            }
+            if c["transcript_mode"] == "selective":
+                # Only the regions around the peaks are transcribed
+                params["peaks"] = self.key("peaks")
+                params["window"] = c["peak_window"]
+        elif stage == "ranking":
+            params = {
+                "peaks": self.key("peaks"),
+                "transcript": self.key("transcript"),
+                "window": c["peak_window"],
+                "min_words": c["min_words"],
+                "top_k": c["top_k_reels"],
+                "ranker": c["ranker"],
+            }
+            if c["ranker"] == "gemini":
+                params["model"] = MODEL_NAME
+                params["prompt_version"] = PROMPT_VERSION
+        elif stage == "plan":
+            # Cut points and captions only: the same plan serves every
+            # tier, so a preview's plan can be promoted to final
+            params = {
+                "ranking": self.key("ranking"),
+                "transcript": self.key("transcript"),
+                "output_dir": c["output_dir"],
+                "captions": c["captions"],
+            }
+        elif stage == "reels":
+            params = {
+                "plan": self.key("plan"),
+                "outputs": list(c["outputs"]),
+                "render_mode": c["render_mode"],
+                "smart_cut": c["smart_cut"],
+                "tier": c["render_tier"],
+            }
+        else:
+            raise ValueError(f"Unknown stage: {stage}")
+
+        self._keys[stage] = self.cache.stage_key(stage, params)
+        return self._keys[stage]
+
+    def _stage(self, stage, compute, kind="object", store_if=None):
+        if stage not in self._values:
+            with profile_stage(f"pipeline.{stage}"):
+                self._values[stage] = self.cache.get_or_compute(
+                    stage, self.key(stage), compute, kind=kind, store_if=store_if
+                )
+        return self._values[stage]
+
+    # ---------------------------------------------
+    # Stages
+    # ---------------------------------------------
+    def audio(self):
+        return self._stage(
+            "audio",
+            lambda: load_audio(self.video_path, sr=SAMPLE_RATE),
+            kind="array"
+        )
+
+    def release_audio(self):
+        """
+        Drop the decoded PCM once speech, peaks and transcript are done;
+        nothing after them reads it. A memory-mapped spill goes with its
+        last reference, and a later audio() call decodes (or loads from
+        the cache) again.
+        """
+        self._values.pop("audio", None)
+
+    def speech(self):
+        """
+        Speech intervals [(start_s, end_s), ...], or None with vad off.
+        """
+        if not self.config["vad"]:
+            return None
+        return self._stage("speech", self._detect_speech)
+
+    def _detect_speech(self):
+        audio = self.audio()
+        intervals = detect_speech(audio, sr=SAMPLE_RATE)
+        ratio = speech_ratio(intervals, len(audio) / SAMPLE_RATE)
+        print(f"🗣️ Speech: {len(intervals)} intervals, {ratio:.0%} of the audio")
+        return intervals
+
+    def peaks(self):
+        return self._stage("peaks", self._extract_peaks)
+
+    def _extract_peaks(self):
+        c = self.config
+        if c["peak_signal"] == "rms":
+            return extract_loudness_peaks(
+                self.video_path,
+                top_k=c["top_k_peaks"],
+                min_gap=c["min_gap"],
+                audio=self.audio(),
+                speech=self.speech()
+            )
+        return extract_salient_peaks(
+            self.video_path,
+            top_k=c["top_k_peaks"],
+            min_gap=c["min_gap"],
+            audio=self.audio(),
+            weights=c["saliency_weights"],
+            speech=self.speech()
+        )
+
+    def transcript_regions(self):
+        """
+        Source ranges Whisper runs on: None (everything) in "full" mode,
+        otherwise the padded, merged windows around the loudness peaks.
+        """
+        if self.config["transcript_mode"] == "full":
+            return None
+        return plan_transcript_regions(
+            self.peaks(),
+            duration=len(self.audio()) / SAMPLE_RATE,
+            window=self.config["peak_window"]
+        )
+
+    def transcript(self):
+        c = self.config
+        return self._stage("transcript", lambda: transcribe_video(
+            self.video_path,
+            model_size=c["model_size"],
+            audio=self.audio(),
+            dtype=c["asr_dtype"],
+            workers=c["transcribe_workers"],
+            word_timestamps=c["word_timestamps"],
+            regions=self.transcript_regions(),
+            backend=c["asr_backend"],
+            speech=self.speech()
+        ), kind="transcript")
+
+    def transcript_index(self):
+        if "transcript_index" not in self._values:
+            self._values["transcript_index"] = build_transcript_index(
+                self.transcript()
+            )
+        return self._values["transcript_index"]
+
+    def candidates(self):
+        # Cheap to recompute; only its inputs are cached
+        if "candidates" not in self._values:
+            c = self.config
+            self._values["candidates"] = get_relevant_segments(
+                segments=self.transcript_index(),
+                peaks=self.peaks(),
+                window=c["peak_window"],
+                min_words=c["min_words"]
+            )
+        return self._values["candidates"]
+
+    def ranking(self):
+        if self.config["ranker"] == "heuristic":
+            return self._stage("ranking", lambda: rank_segments_heuristic(
+                self.candidates(),
+                top_k=self.config["top_k_reels"]
+            ))
+
+        return self._stage(
+            "ranking",
+            lambda: rank_segments_with_gemini(
+                self.candidates(),
+                top_k=self.config["top_k_reels"]
+            ),
+            # Empty answers and heuristic fallbacks (no "reason") are not
+            # worth keeping
+            store_if=lambda ranked: bool(ranked) and all("reason" in s for s in ranked)
+        )
+
+    def reels(self):
+        c = self.config
+        fresh = "reels" not in self._values
+        reels = self._stage("reels", lambda: generate_reels(
+            video_path=self.video_path,
+            segments=self.ranking(),
+            transcript_segments=self.transcript_index(),
+            output_dir=c["output_dir"],
+            outputs=c["outputs"],
+            render_mode=c["render_mode"],
+            workers=c["render_workers"],
+            smart=c["smart_cut"],
+            captions=c["captions"],
+            tier=c["render_tier"],
+            plan_key=self.key("plan")
+        ), kind="files", store_if=lambda reels: not any(
+            "error" in r for r in reels
+        ))
+
+        if fresh:
+            self._sync_plan()
+        return reels
+
+    def _sync_plan(self):
+        # A cache hit restores the reel files but never runs
+        # generate_reels, so the plan on disk may be another run's;
+        # re-plan (cheap, from cached stages) so promote() finds ours
+        c = self.config
+        if plan_key(os.path.join(c["output_dir"], PLAN_FILE)) != self.key("plan"):
+            write_plan(
+                self.video_path,
+                self.ranking(),
+                self.transcript_index(),
+                output_dir=c["output_dir"],
+                captions=c["captions"],
+                key=self.key("plan")
+            )
+
+    def promote(self, indices=None):
+        """
+        Render approved reels (1-based indices, None for all) at final
+        quality from the plan saved by an earlier reels() run with the
+        same video and config; any other plan is refused.
+        """
+        c = self.config
+        return promote_reels(
+            os.path.join(c["output_dir"], PLAN_FILE),
+            indices=indices,
+            outputs=c["outputs"],
+            render_mode=c["render_mode"],
+            workers=c["render_workers"],
+            smart=c["smart_cut"],
+            key=self.key("plan")
+        )
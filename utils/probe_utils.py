@@ -0,0 +1,214 @@
+import os
+import json
+import threading
+import subprocess
+
+from utils.profiling_utils import run_subprocess
+
+
+# -------------------------------------------------
+# Memoized media metadata (one ffprobe per input)
+# -------------------------------------------------
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def _file_token(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def _fraction(value):
+    """'30000/1001' -> 29.97; None for missing or 0/0 rates."""
+    num, _, den = str(value or "").partition("/")
+    try:
+        num, den = float(num), float(den or 1)
+    except ValueError:
+        return None
+    return num / den if num and den else None
+
+
+def _rotation(stream):
+    # Newer ffprobe reports a display matrix, older ones a rotate tag
+    for side in stream.get("side_data_list") or []:
+        if "rotation" in side:
+            return int(round(float(side["rotation"]))) % 360
+    return int(stream.get("tags", {}).get("rotate", 0)) % 360
+
+
+class MediaInfo:
+    """
+    What the pipeline needs to know about one input, from a single
+    `ffprobe -show_streams -show_format` call.
+
+        path            str
+        duration        float, seconds (container, else video stream)
+        start_time      float, seconds; timestamps of the first packet.
+                        ffmpeg's -ss counts from here, so every time
+                        this class reports is relative to it
+        width, height   int, coded frame size (0 without video)
+        rotation        int, degrees clockwise the player applies
+        display_size    (width, height) after rotation — what ffmpeg's
+                        filters see, since it autorotates on decode
+        fps             float or None
+        video_codec     str or None
+        audio_codec     str or None
+        video, audio    the raw ffprobe stream dicts (first of each), or
+                        None; smart cut reads pix_fmt, time_base,
+                        sample_rate and channels from them
+
+    keyframes() lists keyframe timestamps (packet flags); idr_frames()
+    lists only H.264 IDR frames, the ones nothing after them references
+    across. Each runs one more probe the first time it is called and is
+    cached after that.
+    """
+
+    def __init__(self, path, probe):
+        streams = probe.get("streams", [])
+        fmt = probe.get("format", {})
+
+        self.path = path
+        self.video = next((s for s in streams if s.get("codec_type") == "video"), None)
+        self.audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+        video = self.video or {}
+        self.width = int(video.get("width") or 0)
+        self.height = int(video.get("height") or 0)
+        self.rotation = _rotation(video)
+        self.fps = _fraction(video.get("avg_frame_rate")) or _fraction(
+            video.get("r_frame_rate")
+        )
+        self.video_codec = video.get("codec_name")
+        self.audio_codec = (self.audio or {}).get("codec_name")
+
+        duration = fmt.get("duration") or video.get("duration")
+        self.duration = float(duration) if duration not in (None, "N/A") else 0.0
+        start_time = fmt.get("start_time") or video.get("start_time")
+        self.start_time = float(start_time) if start_time not in (None, "N/A") else 0.0
+
+        self._lazy = {}
+        self._lazy_lock = threading.Lock()
+
+    @property
+    def display_size(self):
+        if self.rotation in (90, 270):
+            return (self.height, self.width)
+        return (self.width, self.height)
+
+    @property
+    def has_audio(self):
+        return self.audio is not None
+
+    def _once(self, name, probe):
+        with self._lazy_lock:
+            if name not in self._lazy:
+                self._lazy[name] = [t - self.start_time for t in probe(self.path)]
+            return self._lazy[name]
+
+    def keyframes(self):
+        """
+        Sorted keyframe timestamps (seconds from start_time) of the first
+        video stream.
+
+        Reads packet flags only (no decoding), once per input, so every
+        reel cut from the same source shares one probe. Open-GOP streams
+        flag recovery-point I-frames too; use idr_frames() for cut points.
+        """
+        return self._once("keyframes", _probe_keyframes)
+
+    def idr_frames(self):
+        """
+        Sorted timestamps (seconds from start_time) of the IDR frames of
+        an H.264 first video stream; [] for other codecs.
+
+        Packets are filtered down to IDR slices with a bitstream filter
+        (no decoding), once per input.
+        """
+        if self.video_codec != "h264":
+            return []
+        return self._once("idr_frames", _probe_idr_frames)
+
+    def __repr__(self):
+        w, h = self.display_size
+        return (
+            f"MediaInfo({os.path.basename(self.path)!r}, {self.duration:.2f}s, "
+            f"{w}x{h}, fps={self.fps}, video={self.video_codec}, "
+            f"audio={self.audio_codec})"
+        )
+
+
+def _probe_keyframes(path):
+    probe_cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        path
+    ]
+
+    keyframes = []
+    out = run_subprocess(probe_cmd, stdout=subprocess.PIPE, check=True).stdout
+    for line in out.decode().splitlines():
+        pts, _, flags = line.partition(",")
+        if "K" in flags and pts not in ("", "N/A"):
+            keyframes.append(float(pts))
+
+    keyframes.sort()
+    return keyframes
+
+
+def _probe_idr_frames(path):
+    # filter_units drops every packet without an IDR slice (NAL type 5);
+    # framecrc then lists the survivors with their source timestamps
+    probe_cmd = [
+        "ffmpeg",
+        "-v", "error",
+        "-i", path,
+        "-map", "0:v:0",
+        "-c", "copy",
+        "-copyts",
+        "-bsf:v", "filter_units=pass_types=5",
+        "-f", "framecrc",
+        "-"
+    ]
+
+    out = run_subprocess(probe_cmd, stdout=subprocess.PIPE, check=True).stdout
+    time_base = None
+    idr = []
+    for line in out.decode().splitlines():
+        if line.startswith("#tb 0:"):
+            time_base = _fraction(line.split(":", 1)[1].strip())
+        elif line and not line.startswith("#"):
+            # stream, dts, pts, duration, size, crc
+            idr.append(int(line.split(",")[2]) * time_base)
+
+    idr.sort()
+    return idr
+
+
+def probe_media(path):
+    """
+    MediaInfo for `path`, memoized on (path, size, mtime) for the life of
+    the process: every stage and every reel shares one ffprobe call.
+    """
+    token = _file_token(path)
+    with _memo_lock:
+        info = _memo.get(token)
+    if info is not None:
+        return info
+
+    probe_cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-show_streams",
+        "-show_format",
+        "-of", "json",
+        path
+    ]
+    out = run_subprocess(probe_cmd, stdout=subprocess.PIPE, check=True).stdout
+    info = MediaInfo(path, json.loads(out))
+
+    # A concurrent first probe of the same file keeps whichever won
+    with _memo_lock:
+        return _memo.setdefault(token, info)
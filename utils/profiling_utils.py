@@ -0,0 +1,351 @@
+import os
+import json
+import time
+import functools
+import threading
+import subprocess
+import contextvars
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows: no getrusage, so no child CPU, block I/O or peak RSS
+    resource = None
+
+
+# -------------------------------------------------
+# Profiler state
+# -------------------------------------------------
+# Off by default: every hook below is a single flag check until
+# enable() is called (main.py --profile).
+PROFILE_DIR = "output/profile"
+
+_enabled = False
+_lock = threading.Lock()
+_spans = []
+_origin = time.perf_counter()
+
+# Open spans of the current task, innermost last. A tuple in a context
+# variable, so pool workers started with copy_context() see (and charge
+# subprocesses to) the spans that were open when they were submitted.
+_open = contextvars.ContextVar("impbyte_open_spans", default=())
+
+
+def enable():
+    global _enabled, _origin
+
+    with _lock:
+        _spans.clear()
+        _origin = time.perf_counter()
+        _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+# -------------------------------------------------
+# Resource counters
+# -------------------------------------------------
+def _proc_io():
+    """
+    Bytes this process read/wrote through syscalls (files and pipes),
+    from /proc/self/io. Zeros where procfs is unavailable.
+    """
+    counters = {}
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                counters[name] = int(value)
+    except OSError:
+        pass
+    return counters.get("rchar", 0), counters.get("wchar", 0)
+
+
+def _current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _snapshot():
+    read_bytes, write_bytes = _proc_io()
+
+    if resource is None:
+        return {
+            "wall": time.perf_counter(),
+            "cpu": time.process_time(),
+            "child_cpu": 0.0,
+            "read": read_bytes,
+            "write": write_bytes,
+            "child_read": 0,
+            "child_write": 0,
+            "peak_rss": 0,
+            "child_peak_rss": 0,
+        }
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return {
+        "wall": time.perf_counter(),
+        "cpu": own.ru_utime + own.ru_stime,
+        "child_cpu": children.ru_utime + children.ru_stime,
+        "read": read_bytes,
+        "write": write_bytes,
+        # Block counts are in 512-byte units on Linux
+        "child_read": children.ru_inblock * 512,
+        "child_write": children.ru_oublock * 512,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss": own.ru_maxrss * 1024,
+        "child_peak_rss": children.ru_maxrss * 1024,
+    }
+
+
+# -------------------------------------------------
+# Spans
+# -------------------------------------------------
+@contextmanager
+def profile_stage(name, **args):
+    """
+    Record one span: wall time, CPU time (this process plus reaped
+    child processes), RSS, bytes read/written and the subprocesses
+    launched inside it.
+
+    Counters are process-wide, so spans that overlap in time (reels
+    rendering concurrently) share them; wall time and subprocess counts
+    are always exact per span.
+    """
+    if not _enabled:
+        yield None
+        return
+
+    span = {
+        "name": name,
+        "args": args,
+        "thread": threading.current_thread().name,
+        "tid": threading.get_ident(),
+        "subprocesses": [],
+        "before": _snapshot(),
+    }
+    token = _open.set(_open.get() + (span,))
+
+    try:
+        yield span
+    except BaseException as e:
+        span["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _open.reset(token)
+        _finish(span)
+
+
+def profiled(name):
+    """
+    Decorator form of profile_stage.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profile_stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _finish(span):
+    before = span.pop("before")
+    after = _snapshot()
+
+    exit_codes = {}
+    for _, code in span["subprocesses"]:
+        exit_codes[str(code)] = exit_codes.get(str(code), 0) + 1
+
+    record = {
+        "name": span["name"],
+        "args": span["args"],
+        "thread": span["thread"],
+        "tid": span["tid"],
+        "start_s": before["wall"] - _origin,
+        "wall_s": after["wall"] - before["wall"],
+        "cpu_s": after["cpu"] - before["cpu"],
+        "child_cpu_s": after["child_cpu"] - before["child_cpu"],
+        "rss_mb": _current_rss() / 2 ** 20,
+        "peak_rss_mb": after["peak_rss"] / 2 ** 20,
+        "child_peak_rss_mb": after["child_peak_rss"] / 2 ** 20,
+        "read_bytes": after["read"] - before["read"],
+        "write_bytes": after["write"] - before["write"],
+        "child_read_bytes": after["child_read"] - before["child_read"],
+        "child_write_bytes": after["child_write"] - before["child_write"],
+        "subprocesses": len(span["subprocesses"]),
+        "exit_codes": exit_codes,
+    }
+    if "error" in span:
+        record["error"] = span["error"]
+
+    with _lock:
+        _spans.append(record)
+
+
+# -------------------------------------------------
+# Subprocess accounting
+# -------------------------------------------------
+def record_subprocess(cmd, returncode):
+    """
+    Charge a finished subprocess to every open span of the current task.
+    """
+    if not _enabled:
+        return
+
+    program = os.path.basename(str(cmd[0]))
+    with _lock:
+        for span in _open.get():
+            span["subprocesses"].append((program, returncode))
+
+
+def run_subprocess(cmd, **kwargs):
+    """
+    subprocess.run that is visible to the profiler (count + exit code).
+    """
+    try:
+        result = subprocess.run(cmd, **kwargs)
+    except subprocess.CalledProcessError as e:
+        record_subprocess(cmd, e.returncode)
+        raise
+
+    record_subprocess(cmd, result.returncode)
+    return result
+
+
+# -------------------------------------------------
+# Reports
+# -------------------------------------------------
+def spans():
+    with _lock:
+        return sorted(_spans, key=lambda s: s["start_s"])
+
+
+def summary():
+    """
+    Per-stage totals plus every recorded span, JSON-serialisable.
+    """
+    recorded = spans()
+
+    stages = {}
+    for s in recorded:
+        agg = stages.setdefault(s["name"], {
+            "count": 0,
+            "wall_s": 0.0,
+            "cpu_s": 0.0,
+            "child_cpu_s": 0.0,
+            "peak_rss_mb": 0.0,
+            "read_bytes": 0,
+            "write_bytes": 0,
+            "subprocesses": 0,
+            "failed_subprocesses": 0,
+            "errors": 0,
+        })
+        agg["count"] += 1
+        agg["wall_s"] += s["wall_s"]
+        agg["cpu_s"] += s["cpu_s"]
+        agg["child_cpu_s"] += s["child_cpu_s"]
+        agg["peak_rss_mb"] = max(agg["peak_rss_mb"], s["peak_rss_mb"])
+        agg["read_bytes"] += s["read_bytes"]
+        agg["write_bytes"] += s["write_bytes"]
+        agg["subprocesses"] += s["subprocesses"]
+        agg["failed_subprocesses"] += sum(
+            n for code, n in s["exit_codes"].items() if code != "0"
+        )
+        agg["errors"] += "error" in s
+
+    return {
+        "pid": os.getpid(),
+        "total_wall_s": max(
+            (s["start_s"] + s["wall_s"] for s in recorded), default=0.0
+        ),
+        "stages": stages,
+        "spans": recorded,
+    }
+
+
+def chrome_trace():
+    """
+    Spans as Chrome trace events (chrome://tracing, Perfetto).
+    """
+    pid = os.getpid()
+    events = []
+    threads = {}
+
+    for s in spans():
+        threads[s["tid"]] = s["thread"]
+        args = {
+            k: v for k, v in s.items()
+            if k not in ("name", "args", "thread", "tid", "start_s", "wall_s")
+        }
+        args.update(s["args"])
+        events.append({
+            "name": s["name"],
+            "cat": "pipeline",
+            "ph": "X",
+            "ts": s["start_s"] * 1e6,
+            "dur": s["wall_s"] * 1e6,
+            "pid": pid,
+            "tid": s["tid"],
+            "args": args,
+        })
+
+    for tid, name in threads.items():
+        events.append({
+            "name": "thread_name",
+            "ph": "M",
+            "pid": pid,
+            "tid": tid,
+            "args": {"name": name},
+        })
+
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_report(output_dir=PROFILE_DIR):
+    """
+    Write summary.json and trace.json; returns their paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    summary_path = os.path.join(output_dir, "summary.json")
+    trace_path = os.path.join(output_dir, "trace.json")
+
+    with open(summary_path, "w") as f:
+        json.dump(summary(), f, indent=2)
+    with open(trace_path, "w") as f:
+        json.dump(chrome_trace(), f)
+
+    return summary_path, trace_path
+
+
+def format_summary(report=None):
+    """
+    Human-readable per-stage table for the console.
+    """
+    report = report or summary()
+    lines = [
+        f"{'stage':<26}{'n':>4}{'wall s':>9}{'cpu s':>9}{'child s':>9}"
+        f"{'peak MB':>9}{'procs':>7}"
+    ]
+    for name, agg in report["stages"].items():
+        failed = f" ({agg['failed_subprocesses']} failed)" if agg["failed_subprocesses"] else ""
+        lines.append(
+            f"{name:<26}{agg['count']:>4}{agg['wall_s']:>9.2f}{agg['cpu_s']:>9.2f}"
+            f"{agg['child_cpu_s']:>9.2f}{agg['peak_rss_mb']:>9.0f}"
+            f"{agg['subprocesses']:>7}{failed}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,270 @@
+import numpy as np
+
+from utils.audio_utils import (
+    SAMPLE_RATE,
+    FRAME_LENGTH,
+    HOP_LENGTH,
+    iter_audio_blocks,
+    iter_frame_blocks,
+    pick_peaks,
+    _iter_array_blocks,
+    _frame_rms
+)
+from utils.profiling_utils import profiled
+
+
+# -------------------------------------------------
+# Saliency settings (16 kHz shared PCM, RMS frame grid)
+# -------------------------------------------------
+# Bump when a feature or the way they are combined changes, so cached
+# peaks (and everything built on them) are recomputed
+SALIENCY_VERSION = 1
+
+# Relative weight of each robust-normalized feature in the saliency
+# curve; callers override single entries (0 drops a feature)
+SALIENCY_WEIGHTS = {
+    "rms": 1.0,         # loudness
+    "flux": 0.5,        # spectral change: onsets, emphasis
+    "pitch": 0.5,       # intonation: pitch movement around the frame
+    "rate": 0.5,        # speech rate: syllable onsets per second
+}
+SALIENCY_FEATURES = tuple(SALIENCY_WEIGHTS)
+
+SPECTRUM_MAX_HZ = 4000          # flux and pitch only look below this
+PITCH_RANGE_HZ = (70, 400)      # f0 search range of the voice
+PITCH_HARMONICS = 3             # harmonic product spectrum depth
+PITCH_WINDOW_S = 1.5            # pitch spread is measured over this span
+RATE_BAND_HZ = (300, 3400)      # where syllable energy lives
+RATE_WINDOW_S = 2.0             # syllable onsets are counted over this span
+ONSET_RISE_DB = 3.0             # rise over the last ~130 ms that marks a syllable
+ONSET_LOOKBACK = 4              # frames
+VOICED_MARGIN_DB = 10           # voiced frames sit this far above the floor
+NORM_CLIP = 5.0                 # robust z-scores are clipped to ±this
+EPS = 1e-10
+
+
+# -------------------------------------------------
+# Per-frame features from one STFT
+# -------------------------------------------------
+def _moving_sum(x, width):
+    """
+    Centred moving sum over `width` frames (edges see fewer frames).
+
+    Same alignment as np.convolve(..., mode="same"), but always returns
+    len(x) values, also for inputs shorter than the window.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    width = max(1, int(width))
+    if width == 1 or len(x) == 0:
+        return x
+
+    csum = np.concatenate([[0.0], np.cumsum(x)])
+    i = np.arange(len(x))
+    lo = np.clip(i - width // 2, 0, len(x))
+    hi = np.clip(i + (width - 1) // 2 + 1, 0, len(x))
+    return csum[hi] - csum[lo]
+
+
+def _rfft():
+    # Deferred: scipy (installed with librosa) ships a SIMD pocketfft that
+    # batches frames several times faster than numpy's
+    try:
+        from scipy.fft import rfft
+    except ImportError:
+        rfft = np.fft.rfft
+    return rfft
+
+
+def frame_features(blocks, sr=SAMPLE_RATE):
+    """
+    Raw per-frame features of a PCM block stream, on the RMS frame grid
+    (FRAME_LENGTH / HOP_LENGTH, centred), from a single windowed FFT
+    per frame:
+
+        rms         identical to iter_rms_frames / librosa.feature.rms
+        flux        mean positive change of log magnitude vs the frame before
+        f0          harmonic-product-spectrum pitch estimate (Hz)
+        band_db     speech-band energy (dB), drives the speech-rate proxy
+
+    Frames are transformed block by block, so only the per-frame values
+    (a few floats per 32 ms) are ever held for the whole input.
+    """
+    rfft = _rfft()
+    freqs = np.fft.rfftfreq(FRAME_LENGTH, 1.0 / sr)
+    freqs = freqs[freqs <= SPECTRUM_MAX_HZ]
+    window = np.hanning(FRAME_LENGTH).astype(np.float32)
+    in_band = (freqs >= RATE_BAND_HZ[0]) & (freqs <= RATE_BAND_HZ[1])
+
+    # HPS bins: every candidate f0 bin and its first harmonics
+    f0_bins = np.flatnonzero((freqs >= PITCH_RANGE_HZ[0]) & (freqs <= PITCH_RANGE_HZ[1]))
+    harmonics = [f0_bins * h for h in range(1, PITCH_HARMONICS + 1)]
+
+    parts = {"rms": [], "flux": [], "f0": [], "band_db": []}
+    prev = None
+
+    for _, frames in iter_frame_blocks(blocks):
+        parts["rms"].append(_frame_rms(frames))
+
+        mag = np.abs(rfft(frames * window, axis=1)[:, :len(freqs)])
+        log_mag = np.log1p(mag)
+
+        # Flux needs the previous frame, carried across blocks (the very
+        # first frame is compared with itself)
+        prev = log_mag[:1] if prev is None else prev
+        rise = np.maximum(np.diff(log_mag, axis=0, prepend=prev), 0)
+        parts["flux"].append(rise.mean(axis=1))
+        prev = log_mag[-1:]
+
+        hps = sum(log_mag[:, bins] for bins in harmonics)
+        parts["f0"].append(freqs[f0_bins[np.argmax(hps, axis=1)]])
+
+        band_power = np.square(mag[:, in_band]).sum(axis=1)
+        parts["band_db"].append(10 * np.log10(band_power + EPS))
+
+    return {
+        name: np.concatenate(values).astype(np.float32) if values
+        else np.empty(0, dtype=np.float32)
+        for name, values in parts.items()
+    }
+
+
+def _pitch_spread(f0, voiced, frames_per_s):
+    """
+    Standard deviation of pitch (semitones) over voiced frames within
+    PITCH_WINDOW_S of each frame; 0 where fewer than a quarter of the
+    window is voiced.
+    """
+    width = PITCH_WINDOW_S * frames_per_s
+    semis = 12 * np.log2(np.maximum(f0, 1.0) / PITCH_RANGE_HZ[0])
+    mask = voiced.astype(np.float64)
+
+    count = _moving_sum(mask, width)
+    total = _moving_sum(semis * mask, width)
+    total_sq = _moving_sum(np.square(semis) * mask, width)
+
+    enough = count >= 0.25 * width
+    mean = total / np.maximum(count, 1)
+    var = np.maximum(total_sq / np.maximum(count, 1) - np.square(mean), 0)
+    return np.where(enough, np.sqrt(var), 0.0)
+
+
+def _speech_rate(band_db, voiced, frames_per_s):
+    """
+    Syllable onsets per second around each frame: local maxima of the
+    speech-band envelope that rose ONSET_RISE_DB over the last few
+    frames, counted over RATE_WINDOW_S.
+    """
+    if len(band_db) < 3:
+        return np.zeros(len(band_db))
+
+    env = np.convolve(band_db, np.ones(3) / 3, mode="same")
+    left = np.concatenate([[-np.inf], env[:-1]])
+    right = np.concatenate([env[1:], [-np.inf]])
+
+    padded = np.concatenate([np.full(ONSET_LOOKBACK, np.inf), env])
+    trough = np.lib.stride_tricks.sliding_window_view(padded, ONSET_LOOKBACK)[:len(env)].min(axis=1)
+
+    onsets = (env >= left) & (env > right) & (env - trough >= ONSET_RISE_DB) & voiced
+    return _moving_sum(onsets, RATE_WINDOW_S * frames_per_s) / RATE_WINDOW_S
+
+
+def _robust_normalize(x):
+    """(x - median) / (1.4826 * MAD), clipped to ±NORM_CLIP."""
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) == 0:
+        return x
+    median = np.median(x)
+    mad = 1.4826 * np.median(np.abs(x - median))
+    if mad < EPS:
+        # Flat for most of the input: fall back to the spread of the rest
+        mad = np.std(x)
+    if mad < EPS:
+        return np.zeros(len(x))
+    return np.clip((x - median) / mad, -NORM_CLIP, NORM_CLIP)
+
+
+def saliency_features(features, sr=SAMPLE_RATE):
+    """
+    The four saliency features ("rms", "flux", "pitch", "rate") from the
+    raw frame_features(), each robust-normalized to comparable units.
+    """
+    frames_per_s = sr / float(HOP_LENGTH)
+    band_db = features["band_db"]
+    floor = np.percentile(band_db, 10) if len(band_db) else 0.0
+    voiced = band_db > floor + VOICED_MARGIN_DB
+
+    raw = {
+        "rms": features["rms"],
+        "flux": features["flux"],
+        "pitch": _pitch_spread(features["f0"], voiced, frames_per_s),
+        "rate": _speech_rate(band_db, voiced, frames_per_s),
+    }
+    return {name: _robust_normalize(values) for name, values in raw.items()}
+
+
+def resolve_weights(weights=None):
+    """SALIENCY_WEIGHTS overridden by `weights`; rejects unknown features."""
+    weights = dict(weights or {})
+    unknown = set(weights) - set(SALIENCY_FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown saliency features: {sorted(unknown)}")
+    return {**SALIENCY_WEIGHTS, **weights}
+
+
+def saliency_curve(normalized, weights=None):
+    """Weighted sum of normalized features: one value per frame."""
+    weights = resolve_weights(weights)
+    n = len(normalized["rms"])
+    curve = np.zeros(n, dtype=np.float64)
+    for name, weight in weights.items():
+        if weight:
+            curve += weight * normalized[name]
+    return curve.astype(np.float32)
+
+
+# -------------------------------------------------
+# Saliency peaks
+# -------------------------------------------------
+@profiled("extract_salient_peaks")
+def extract_salient_peaks(
+    video_path,
+    top_k=5,
+    min_gap=5,
+    audio=None,
+    sr=SAMPLE_RATE,
+    weights=None,
+    prominence=0.0,
+    min_duration=0.0,
+    speech=None
+):
+    """
+    Find the `top_k` most salient moments (seconds), at least `min_gap`
+    apart.
+
+    Drop-in replacement for extract_loudness_peaks: the curve handed to
+    pick_peaks is a weighted sum (`weights`, default SALIENCY_WEIGHTS) of
+    loudness, spectral flux, pitch movement and speech rate, all derived
+    from one STFT pass. `prominence` is in the curve's units (weighted
+    robust z-scores). `speech` restricts peaks to speech intervals.
+    Frames without signal are never peaks, so silent input yields [].
+    """
+    weights = resolve_weights(weights)
+
+    if audio is None:
+        blocks = iter_audio_blocks(video_path, sr=sr)
+    else:
+        blocks = _iter_array_blocks(audio)
+
+    features = frame_features(blocks, sr=sr)
+    curve = saliency_curve(saliency_features(features, sr=sr), weights)
+
+    return pick_peaks(
+        curve,
+        top_k=top_k,
+        min_gap=min_gap,
+        sr=sr,
+        prominence=prominence,
+        min_duration=min_duration,
+        speech=speech,
+        active=features["rms"] > 0
+    )
@@ -1,74 +1,730 @@
-import whisper
-import subprocess
-import tempfile
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
+
+from utils.audio_utils import load_audio, SAMPLE_RATE
+from utils.model_utils import get_whisper_model, use_whisper_model
+from utils.profiling_utils import profiled, profile_stage
+from utils.vad_utils import intersect_intervals, compact_speech
+
+
+# -------------------------------------------------
+# Parallel transcription settings
+# -------------------------------------------------
+CHUNK_OVERLAP_S = 2.0       # audio shared by neighbouring chunks
+MIN_CHUNK_S = 60.0          # never split finer than this
+MAX_CHUNK_S = 600.0         # cap chunk length on very long inputs
+SILENCE_SEARCH_S = 5.0      # look this far around a cut for a quiet spot
+SILENCE_FRAME_S = 0.02
 
 # -------------------------------------------------
-# Audio extraction for Whisper
+# Selective (peak-guided) transcription settings
 # -------------------------------------------------
-def _extract_audio(video_path):
+REEL_LOOKAHEAD_S = 100.0    # longest reel find_dynamic_end may pick
+SELECTIVE_PAD_S = 3.0       # context so region edges do not clip words
+
+
+def _whisper_options(dtype, word_timestamps=False):
+    options = {}
+    if dtype is not None:
+        options["fp16"] = dtype == "float16"
+    if word_timestamps:
+        options["word_timestamps"] = True
+    return options
+
+
+def _to_segments(result, offset_s=0.0):
+    segments = []
+    for seg in result["segments"]:
+        segment = {
+            "start": float(seg["start"]) + offset_s,
+            "end": float(seg["end"]) + offset_s,
+            "text": seg["text"].strip()
+        }
+        if "words" in seg:
+            segment["words"] = [
+                {
+                    "start": float(w["start"]) + offset_s,
+                    "end": float(w["end"]) + offset_s,
+                    "word": w["word"].strip()
+                }
+                for w in seg["words"]
+            ]
+        segments.append(segment)
+    return segments
+
+
+# -------------------------------------------------
+# Chunk planning (cuts at silence)
+# -------------------------------------------------
+def _quietest_sample(audio, target, search, frame):
     """
-    Extract mono 16kHz WAV audio from a video using ffmpeg.
-    Works even if the video has no explicit audio stream.
+    Sample index of the quietest `frame`-long spot within `search`
+    samples of `target`.
     """
-    tmp_wav = tempfile.mktemp(suffix=".wav")
+    lo = max(0, target - search)
+    hi = min(len(audio), target + search)
+    n = (hi - lo) // frame
+    if n < 2:
+        return target
 
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-i", video_path,
-        "-vn",
-        "-ac", "1",
-        "-ar", "16000",
-        "-acodec", "pcm_s16le",
-        tmp_wav
-    ]
+    window = np.asarray(audio[lo:lo + n * frame], dtype=np.float32)
+    energy = np.square(window.reshape(n, frame)).mean(axis=1)
+    return lo + int(np.argmin(energy)) * frame + frame // 2
 
-    subprocess.run(
-        cmd,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
+
+def plan_chunks(audio, sr=SAMPLE_RATE, workers=1):
+    """
+    Split audio into roughly equal chunks for `workers` processes, with
+    each cut moved to the quietest nearby spot so words are not split.
+
+    Returns a list of (start_sample, end_sample) covering the audio.
+    """
+    total = len(audio)
+    duration = total / float(sr)
+
+    n_chunks = workers * int(np.ceil(duration / (workers * MAX_CHUNK_S)))
+    n_chunks = max(1, min(n_chunks, int(duration // MIN_CHUNK_S)))
+
+    search = int(SILENCE_SEARCH_S * sr)
+    frame = int(SILENCE_FRAME_S * sr)
+
+    cuts = [0]
+    for i in range(1, n_chunks):
+        cut = _quietest_sample(audio, i * total // n_chunks, search, frame)
+        if cut > cuts[-1]:
+            cuts.append(cut)
+    cuts.append(total)
+
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+# -------------------------------------------------
+# Chunk transcription (serial or process pool)
+# -------------------------------------------------
+_worker_model = None
+
+
+def _init_worker(threads, model_size, device, dtype, backend="whisper"):
+    """
+    Process-pool initializer: cap intra-op threads so that
+    workers × threads never exceeds the machine, then load the model
+    once for every chunk this worker will see.
+    """
+    global _worker_model
+
+    if backend == "whisper":
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+
+    _worker_model = get_whisper_model(
+        model_size, device=device, dtype=dtype, backend=backend, threads=threads
     )
 
-    return tmp_wav
+
+def _transcribe_chunk(chunk_audio, offset_s, options):
+    result = _worker_model.transcribe(chunk_audio, **options)
+    return _to_segments(result, offset_s)
+
+
+def _stitch(chunk_results):
+    """
+    Merge per-chunk segments into one timeline.
+
+    Each chunk owns the span [keep_start, keep_end); a segment is kept
+    only by the chunk that owns its midpoint, so text inside an overlap
+    is emitted once. Identical back-to-back lines that still straddle a
+    cut are collapsed.
+    """
+    merged = []
+
+    for segments, keep_start, keep_end in chunk_results:
+        for seg in segments:
+            mid = (seg["start"] + seg["end"]) / 2.0
+            if keep_start <= mid < keep_end:
+                merged.append(seg)
+
+    merged.sort(key=lambda s: s["start"])
+
+    stitched = []
+    for seg in merged:
+        if stitched:
+            prev = stitched[-1]
+            same_text = prev["text"].lower() == seg["text"].lower()
+            if same_text and seg["start"] < prev["end"]:
+                prev["end"] = max(prev["end"], seg["end"])
+                continue
+        stitched.append(seg)
+
+    return stitched
+
+
+def transcribe_chunks(
+    audio,
+    chunks,
+    sr=SAMPLE_RATE,
+    model_size="base",
+    device=None,
+    dtype=None,
+    workers=1,
+    overlap_s=CHUNK_OVERLAP_S,
+    word_timestamps=False,
+    backend="whisper"
+):
+    """
+    Transcribe the given (start_sample, end_sample) chunks and return
+    segments on the source timeline.
+
+    Every chunk is decoded with `overlap_s` of extra audio on each side
+    and stitched back with timestamps shifted by the chunk offset.
+    With workers > 1 the chunks run in a process pool.
+    """
+    overlap = int(overlap_s * sr)
+    options = _whisper_options(dtype, word_timestamps)
+
+    jobs = []
+    for i, (lo, hi) in enumerate(chunks):
+        pad_lo = max(0, lo - overlap)
+        pad_hi = min(len(audio), hi + overlap)
+
+        # The outermost chunks own everything beyond their edges
+        keep_start = lo / float(sr) if i > 0 else float("-inf")
+        keep_end = hi / float(sr) if i < len(chunks) - 1 else float("inf")
+
+        jobs.append((pad_lo, pad_hi, keep_start, keep_end))
+
+    if workers <= 1 or len(jobs) == 1:
+        results = []
+        with use_whisper_model(
+            model_size, device=device, dtype=dtype, backend=backend
+        ) as model:
+            for i, (pad_lo, pad_hi, keep_start, keep_end) in enumerate(jobs):
+                chunk = np.ascontiguousarray(audio[pad_lo:pad_hi], dtype=np.float32)
+                with profile_stage("whisper_chunk", index=i):
+                    result = model.transcribe(chunk, **options)
+                results.append((
+                    _to_segments(result, pad_lo / float(sr)),
+                    keep_start,
+                    keep_end
+                ))
+        return _stitch(results)
+
+    workers = min(workers, len(jobs))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    # Fresh interpreters: forking a process that already holds torch
+    # thread pools is unsafe
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(threads, model_size, device, dtype, backend)
+    ) as pool:
+        futures = [
+            pool.submit(
+                _transcribe_chunk,
+                np.ascontiguousarray(audio[pad_lo:pad_hi], dtype=np.float32),
+                pad_lo / float(sr),
+                options
+            )
+            for pad_lo, pad_hi, _, _ in jobs
+        ]
+
+        results = [
+            (future.result(), keep_start, keep_end)
+            for future, (_, _, keep_start, keep_end) in zip(futures, jobs)
+        ]
+
+    return _stitch(results)
+
+
+# -------------------------------------------------
+# Peak-guided regions
+# -------------------------------------------------
+def plan_transcript_regions(
+    peaks,
+    duration,
+    window=15,
+    lookahead=REEL_LOOKAHEAD_S,
+    pad=SELECTIVE_PAD_S
+):
+    """
+    Time ranges the rest of the pipeline can ever read from a transcript:
+
+        [peak - window - pad, peak + window + lookahead + pad]
+
+    covers every candidate get_relevant_segments can pick near a peak
+    plus the longest reel find_dynamic_end can grow from it. Ranges are
+    clipped to the video and overlapping ones merged.
+
+    Returns a sorted list of (start_s, end_s).
+    """
+    regions = []
+    for peak in sorted(peaks):
+        lo = max(0.0, peak - window - pad)
+        hi = min(duration, peak + window + lookahead + pad)
+        if regions and lo <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], hi))
+        else:
+            regions.append((lo, hi))
+    return regions
 
 
 # -------------------------------------------------
 # Whisper transcription
 # -------------------------------------------------
-def transcribe_video(video_path, model_size="base"):
+@profiled("transcribe_video")
+def transcribe_video(
+    video_path,
+    model_size="base",
+    audio=None,
+    device=None,
+    dtype=None,
+    workers=1,
+    word_timestamps=False,
+    regions=None,
+    backend="whisper",
+    speech=None
+):
     """
     Transcribe a video file using OpenAI Whisper.
-    Returns sentence-level segments with timestamps.
+    Returns sentence-level segments with timestamps, as a columnar
+    Transcript (iterating it yields the usual segment dicts).
+
+    regions, when given, restricts Whisper to those (start_s, end_s)
+    ranges (see plan_transcript_regions); segments keep source-timeline
+    timestamps and nothing outside the ranges is transcribed.
+
+    speech, when given, is a list of (start_s, end_s) speech intervals
+    (vad_utils.detect_speech). Only those parts (within `regions`, if
+    any) are cut out and decoded back to back, so silence, music and
+    applause cost no ASR time; timestamps are mapped back to the source.
+
+    word_timestamps=True also attaches each segment's words as
+    "words": [{"start", "end", "word"}] (used for timed captions).
+
+    Pass `audio` (16 kHz mono float32 from `load_audio`) to reuse PCM
+    that was already decoded for loudness analysis.
+
+    backend picks the ASR engine (asr_utils.ASR_BACKENDS): "whisper"
+    (PyTorch) or "faster-whisper" (CTranslate2, int8 on CPU). Both
+    return the same segment format.
+
+    The model comes from the process-wide registry in model_utils, so
+    only the first call for a (backend, model_size, device, dtype) pays
+    the load.
+
+    With workers > 1 the audio is split at silences into overlapping
+    chunks that are transcribed in parallel processes, each capped at
+    cpu_count // workers threads, and stitched back together.
     """
-    print("🧠 Loading Whisper model...")
-    model = whisper.load_model(model_size)
+    if audio is None:
+        print("🎧 Extracting audio for Whisper...")
+        audio = load_audio(video_path, sr=SAMPLE_RATE)
 
-    print("🎧 Extracting audio for Whisper...")
-    audio_path = _extract_audio(video_path)
+    options = dict(
+        model_size=model_size,
+        device=device,
+        dtype=dtype,
+        workers=workers,
+        word_timestamps=word_timestamps,
+        backend=backend
+    )
 
-    print("🎙️ Transcribing audio...")
-    result = model.transcribe(audio_path)
+    if speech is None:
+        segments = _transcribe_audio(audio, regions=regions, **options)
+        return Transcript.from_segments(segments)
 
-    segments = []
-    for seg in result["segments"]:
-        segments.append({
-            "start": float(seg["start"]),
-            "end": float(seg["end"]),
-            "text": seg["text"].strip()
-        })
+    duration = len(audio) / SAMPLE_RATE
+    keep = intersect_intervals(
+        speech, regions if regions is not None else [(0.0, duration)]
+    )
+    if not keep:
+        return Transcript.from_segments([])
 
-    # Cleanup temporary audio file
-    if os.path.exists(audio_path):
-        os.remove(audio_path)
+    compact, speech_map = compact_speech(audio, keep, sr=SAMPLE_RATE)
+    print(
+        f"🗣️ Keeping {len(compact) / SAMPLE_RATE:.0f}s of speech "
+        f"out of {duration:.0f}s for Whisper"
+    )
 
-    return segments
+    if regions is not None:
+        # The same regions, now on the compacted timeline
+        regions = [
+            (speech_map.to_compact(lo), speech_map.to_compact(hi))
+            for lo, hi in regions
+        ]
+
+    segments = _transcribe_audio(compact, regions=regions, **options)
+    return Transcript.from_segments(speech_map.remap_segments(segments))
+
+
+def _transcribe_audio(
+    audio,
+    model_size="base",
+    device=None,
+    dtype=None,
+    workers=1,
+    word_timestamps=False,
+    regions=None,
+    backend="whisper"
+):
+    """
+    transcribe_video() on already-decoded (possibly speech-compacted)
+    PCM; timestamps are relative to `audio`.
+    """
+    if regions is not None:
+        chunks = [
+            (int(lo * SAMPLE_RATE), min(len(audio), int(hi * SAMPLE_RATE)))
+            for lo, hi in regions
+        ]
+        chunks = [(lo, hi) for lo, hi in chunks if hi > lo]
+        if not chunks:
+            return []
+
+        covered = sum(hi - lo for lo, hi in chunks) / SAMPLE_RATE
+        print(
+            f"🎙️ Transcribing {len(chunks)} peak regions "
+            f"({covered:.0f}s of {len(audio) / SAMPLE_RATE:.0f}s)..."
+        )
+        # Regions already carry their own padding: no extra overlap
+        return transcribe_chunks(
+            audio,
+            chunks,
+            model_size=model_size,
+            device=device,
+            dtype=dtype,
+            workers=workers,
+            overlap_s=0.0,
+            word_timestamps=word_timestamps,
+            backend=backend
+        )
+
+    if workers > 1:
+        chunks = plan_chunks(audio, sr=SAMPLE_RATE, workers=workers)
+        print(
+            f"🎙️ Transcribing audio in {len(chunks)} chunks "
+            f"across {min(workers, len(chunks))} workers..."
+        )
+        return transcribe_chunks(
+            audio,
+            chunks,
+            model_size=model_size,
+            device=device,
+            dtype=dtype,
+            workers=workers,
+            word_timestamps=word_timestamps,
+            backend=backend
+        )
+
+    # Load (or fetch) first so the profile separates load from decode
+    with profile_stage("whisper_load", model_size=model_size, backend=backend):
+        get_whisper_model(model_size, device=device, dtype=dtype, backend=backend)
+
+    with use_whisper_model(
+        model_size, device=device, dtype=dtype, backend=backend
+    ) as model:
+        print("🎙️ Transcribing audio...")
+        with profile_stage("whisper_decode", seconds=len(audio) / SAMPLE_RATE):
+            result = model.transcribe(
+                audio, **_whisper_options(dtype, word_timestamps)
+            )
+
+    return _to_segments(result)
+
+
+# -------------------------------------------------
+# Transcript (columnar, built once, queried per peak / reel)
+# -------------------------------------------------
+def _lowercase(text):
+    lower = text.lower()
+    if len(lower) != len(text):
+        # A few characters lowercase to two ("İ"); keep the first so
+        # every offset into the buffer still lines up
+        lower = "".join(c.lower()[0] for c in text)
+    return lower
+
+
+class Transcript:
+    """
+    Columnar transcript: segments and their words as NumPy arrays over
+    one shared text buffer, instead of a dict per segment and per word.
+
+    Segment columns (sorted by start; stable, so Whisper's already
+    time-ordered output is untouched):
+        starts, ends    float64 [n]
+        text_offsets    int64 [n + 1]   segment i is text[o[i]:o[i + 1]]
+        word_offsets    int64 [n + 1]   its words are word_*[o[i]:o[i + 1]]
+        word_counts     int32 [n]       whitespace-split words of the text
+
+    Word columns:
+        word_starts, word_ends      float64 [w]
+        word_text_offsets           int64 [w + 1]
+        word_segments               int32 [w]   owning segment id
+
+    Offsets are absolute, so slicing (transcript[a:b], between(t0, t1))
+    returns a Transcript whose segment columns are views and whose word
+    columns and text are shared: no copies. `lower_text` is the text
+    buffer lowercased once (same offsets) for case-insensitive matching.
+    Range queries are O(log n + k) searchsorted calls, and `transcript[i]` / iteration
+    give the usual {"start", "end", "text"[, "words"]} dicts, built on
+    demand, for call sites that want plain segments.
+    """
+
+    _COLUMNS = (
+        "starts",
+        "ends",
+        "text_offsets",
+        "word_offsets",
+        "word_counts",
+        "word_starts",
+        "word_ends",
+        "word_text_offsets",
+        "word_segments",
+    )
+
+    def __init__(self, text, has_words=False, segment_base=0, lower_text=None, **columns):
+        self.text = text
+        self._lower_text = lower_text
+        self.has_words = has_words
+        # Global id of this view's first segment (word_segments are global)
+        self.segment_base = segment_base
+        for name in self._COLUMNS:
+            setattr(self, name, columns[name])
+        self._max_ends = None
+
+    @classmethod
+    def from_segments(cls, segments):
+        """
+        Build from Whisper-style segment dicts (as _to_segments returns).
+        """
+        segments = sorted(segments, key=lambda s: s["start"])
+        has_words = any("words" in s for s in segments)
+
+        seg_texts = [s["text"] for s in segments]
+        words = [s.get("words") or [] for s in segments]
+        word_texts = [w["word"] for ws in words for w in ws]
+
+        def _offsets(lengths, base=0):
+            offsets = np.empty(len(lengths) + 1, dtype=np.int64)
+            offsets[0] = base
+            np.cumsum(lengths, out=offsets[1:])
+            offsets[1:] += base
+            return offsets
+
+        text_offsets = _offsets([len(t) for t in seg_texts])
+        words_per_seg = [len(ws) for ws in words]
+
+        text = "".join(seg_texts) + "".join(word_texts)
+        return cls(
+            text,
+            has_words=has_words,
+            lower_text=_lowercase(text),
+            starts=np.array([s["start"] for s in segments], dtype=np.float64),
+            ends=np.array([s["end"] for s in segments], dtype=np.float64),
+            text_offsets=text_offsets,
+            word_offsets=_offsets(words_per_seg),
+            word_counts=np.array(
+                [len(t.split()) for t in seg_texts], dtype=np.int32
+            ),
+            word_starts=np.array(
+                [w["start"] for ws in words for w in ws], dtype=np.float64
+            ),
+            word_ends=np.array(
+                [w["end"] for ws in words for w in ws], dtype=np.float64
+            ),
+            word_text_offsets=_offsets(
+                [len(t) for t in word_texts], base=text_offsets[-1]
+            ),
+            word_segments=np.repeat(
+                np.arange(len(segments), dtype=np.int32), words_per_seg
+            ),
+        )
+
+    # ---------------------------------------------
+    # Dict-compatible view
+    # ---------------------------------------------
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.segment(i)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            lo, hi, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("Transcript slices must be contiguous")
+            return self._view(lo, max(lo, hi))
+        if i < 0:
+            i += len(self)
+        return self.segment(i)
+
+    def segment_text(self, i):
+        return self.text[self.text_offsets[i]:self.text_offsets[i + 1]]
+
+    @property
+    def lower_text(self):
+        # Shared by every view of the same transcript
+        if self._lower_text is None:
+            self._lower_text = _lowercase(self.text)
+        return self._lower_text
+
+    def segment_text_lower(self, i):
+        return self.lower_text[self.text_offsets[i]:self.text_offsets[i + 1]]
+
+    def word_text(self, j):
+        return self.text[self.word_text_offsets[j]:self.word_text_offsets[j + 1]]
+
+    def word_range(self, i):
+        """
+        Indices into the word columns of segment i's words.
+        """
+        return range(self.word_offsets[i], self.word_offsets[i + 1])
+
+    def segment(self, i):
+        """
+        Segment i as a fresh {"start", "end", "text"[, "words"]} dict.
+        """
+        seg = {
+            "start": float(self.starts[i]),
+            "end": float(self.ends[i]),
+            "text": self.segment_text(i),
+        }
+        if self.has_words:
+            seg["words"] = [
+                {
+                    "start": float(self.word_starts[j]),
+                    "end": float(self.word_ends[j]),
+                    "word": self.word_text(j),
+                }
+                for j in self.word_range(i)
+            ]
+        return seg
+
+    def to_segments(self):
+        return list(self)
+
+    # ---------------------------------------------
+    # Range queries
+    # ---------------------------------------------
+    @property
+    def max_ends(self):
+        # Running max of ends is monotone even if a segment ends before
+        # its predecessor, so it can be searched safely
+        if self._max_ends is None:
+            self._max_ends = np.maximum.accumulate(self.ends)
+        return self._max_ends
+
+    def starting_between(self, t0, t1):
+        """
+        Indices of segments with t0 <= start <= t1.
+        """
+        return range(
+            int(np.searchsorted(self.starts, t0, side="left")),
+            int(np.searchsorted(self.starts, t1, side="right"))
+        )
+
+    def first_ending_from(self, t):
+        """
+        Index of the first segment with end >= t (len(self) if none).
+        """
+        return int(np.searchsorted(self.max_ends, t, side="left"))
+
+    def overlapping(self, t0, t1):
+        """
+        Indices of the contiguous run of segments that can overlap
+        [t0, t1): from the first ending at/after t0 to the last starting
+        before t1.
+        """
+        lo = self.first_ending_from(t0)
+        hi = int(np.searchsorted(self.starts, t1, side="left"))
+        return range(lo, max(lo, hi))
+
+    def between(self, t0, t1):
+        """
+        Zero-copy Transcript of the segments overlapping [t0, t1).
+        """
+        r = self.overlapping(t0, t1)
+        return self._view(r.start, r.stop)
+
+    def _view(self, lo, hi):
+        columns = {
+            "starts": self.starts[lo:hi],
+            "ends": self.ends[lo:hi],
+            "text_offsets": self.text_offsets[lo:hi + 1],
+            "word_offsets": self.word_offsets[lo:hi + 1],
+            "word_counts": self.word_counts[lo:hi],
+        }
+        # Word columns and text are shared whole; offsets stay absolute
+        for name in self._COLUMNS[5:]:
+            columns[name] = getattr(self, name)
+        return Transcript(
+            self.text,
+            has_words=self.has_words,
+            segment_base=self.segment_base + lo,
+            lower_text=self.lower_text,
+            **columns
+        )
+
+    # ---------------------------------------------
+    # On-disk format (.npz)
+    # ---------------------------------------------
+    def save(self, path):
+        """
+        Write the transcript (only this view's segments and words, with
+        offsets rebased) as a compressed .npz: the columns plus the text
+        as UTF-8 bytes.
+        """
+        w0, w1 = self.word_offsets[0], self.word_offsets[-1]
+        t0, t1 = self.text_offsets[0], self.text_offsets[-1]
+        wt0, wt1 = self.word_text_offsets[w0], self.word_text_offsets[w1]
+        text = self.text[t0:t1] + self.text[wt0:wt1]
+
+        np.savez_compressed(
+            path,
+            text=np.frombuffer(text.encode("utf-8"), dtype=np.uint8),
+            has_words=np.array(self.has_words),
+            starts=self.starts,
+            ends=self.ends,
+            text_offsets=self.text_offsets - t0,
+            word_offsets=self.word_offsets - w0,
+            word_counts=self.word_counts,
+            word_starts=self.word_starts[w0:w1],
+            word_ends=self.word_ends[w0:w1],
+            word_text_offsets=self.word_text_offsets[w0:w1 + 1] - wt0 + (t1 - t0),
+            word_segments=self.word_segments[w0:w1] - self.segment_base,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            columns = {name: data[name] for name in cls._COLUMNS}
+            text = data["text"].tobytes().decode("utf-8")
+            has_words = bool(data["has_words"])
+        return cls(text, has_words=has_words, lower_text=_lowercase(text), **columns)
+
+
+def build_transcript_index(segments):
+    """
+    Build the columnar Transcript (and its lowercased text) once after
+    transcription; passing an existing Transcript through is free.
+    """
+    if isinstance(segments, Transcript):
+        return segments
+    return Transcript.from_segments(segments)
 
 
 # -------------------------------------------------
 # Audio + transcript fusion (candidate selection)
 # -------------------------------------------------
+@profiled("get_relevant_segments")
 def get_relevant_segments(
     segments,
     peaks,
@@ -78,15 +734,18 @@ def get_relevant_segments(
     """
     Select transcript segments close to loudness peaks.
     This is a heuristic multimodal filter (audio + text).
+
+    `segments` may be a list or a Transcript; each peak is an
+    O(log n + k) range query on segment starts.
     """
 
+    index = build_transcript_index(segments)
     relevant = []
 
     for peak in peaks:
-        for seg in segments:
-            if abs(seg["start"] - peak) <= window:
-                if len(seg["text"].split()) >= min_words:
-                    relevant.append(seg)
+        for i in index.starting_between(peak - window, peak + window):
+            if index.word_counts[i] >= min_words:
+                relevant.append(index.segment(i))
 
     # Remove duplicates
     unique = {
@@ -125,25 +784,33 @@ def find_dynamic_end(
     - Never end before min_len
     - Prefer sentence boundaries or conclusion cues
     - Hard stop at max_len
+
+    `segments` may be a list or a Transcript; the scan starts at the
+    first segment that can satisfy min_len instead of at 0.
     """
 
-    for seg in segments:
+    index = build_transcript_index(segments)
+    first = index.first_ending_from(start_time + min_len)
+
+    for i in range(first, len(index)):
+        end = float(index.ends[i])
+
         # Must exceed minimum duration
-        if seg["end"] < start_time + min_len:
+        if end < start_time + min_len:
             continue
 
-        duration = seg["end"] - start_time
-        text = seg["text"].lower().strip()
+        duration = end - start_time
+        text = index.segment_text_lower(i).strip()
 
         # Rule 1: semantic conclusion phrases
         if any(k in text for k in END_KEYWORDS):
             if duration <= max_len:
-                return seg["end"]
+                return end
 
         # Rule 2: sentence completion
         if text.endswith((".", "?", "!")):
             if duration <= max_len:
-                return seg["end"]
+                return end
 
         # Rule 3: hard stop
         if duration >= max_len:
@@ -0,0 +1,274 @@
+import numpy as np
+
+from utils.audio_utils import (
+    SAMPLE_RATE,
+    MMAP_THRESHOLD_S,
+    STREAM_BLOCK_SAMPLES,
+    buffer_pcm
+)
+from utils.profiling_utils import profiled
+
+
+# -------------------------------------------------
+# VAD settings (16 kHz shared PCM)
+# -------------------------------------------------
+# Bump when the detector or its thresholds change, so cached speech
+# intervals (and the peaks / transcripts built on them) are recomputed
+VAD_VERSION = 1
+
+VAD_FRAME = 512                 # 32 ms analysis frames
+VAD_HOP = 320                   # 20 ms between frames
+VAD_BLOCK_FRAMES = 8192         # frames per FFT batch (~2.7 min of audio)
+
+SPEECH_BAND_HZ = (300, 3400)    # where speech energy lives
+NOISE_PERCENTILE = 10           # quietest frames estimate the noise floor
+ENERGY_MARGIN_DB = 10           # speech sits this far above the floor
+MIN_ENERGY_DB = -55             # never call anything quieter speech
+MIN_BAND_RATIO = 0.4            # share of energy inside SPEECH_BAND_HZ
+MAX_FLATNESS = 0.35             # noise / applause spectra are flatter
+
+# Syllable-rate modulation: speech keeps dipping between syllables,
+# sustained music does not. LSTER is the share of frames in a window
+# whose energy falls below half the window's mean.
+LSTER_WINDOW_S = 1.0
+MIN_LSTER = 0.08
+SMOOTH_S = 0.3                  # majority vote over frame decisions
+
+MIN_SPEECH_S = 0.5              # shorter runs are clicks and onsets
+MIN_SILENCE_S = 0.5             # shorter pauses stay inside one interval
+SPEECH_PAD_S = 0.2              # keep onsets / trailing consonants
+JOIN_SILENCE_S = 0.5            # between speech pieces handed to Whisper
+
+
+# -------------------------------------------------
+# Frame features
+# -------------------------------------------------
+def _frame_features(audio, sr):
+    """
+    Per-frame (energy dB, speech-band ratio, spectral flatness), computed
+    in FFT batches so memory-mapped inputs are never fully loaded.
+    """
+    n_frames = max(0, 1 + (len(audio) - VAD_FRAME) // VAD_HOP)
+    energy = np.empty(n_frames, dtype=np.float32)
+    band = np.empty(n_frames, dtype=np.float32)
+    flatness = np.empty(n_frames, dtype=np.float32)
+
+    freqs = np.fft.rfftfreq(VAD_FRAME, 1.0 / sr)
+    in_band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+    window = np.hanning(VAD_FRAME).astype(np.float32)
+    eps = 1e-10
+
+    for f0 in range(0, n_frames, VAD_BLOCK_FRAMES):
+        f1 = min(n_frames, f0 + VAD_BLOCK_FRAMES)
+        lo = f0 * VAD_HOP
+        hi = (f1 - 1) * VAD_HOP + VAD_FRAME
+        block = np.asarray(audio[lo:hi], dtype=np.float32)
+
+        frames = np.lib.stride_tricks.sliding_window_view(block, VAD_FRAME)[::VAD_HOP]
+        energy[f0:f1] = 10 * np.log10(np.mean(np.square(frames), axis=1) + eps)
+
+        power = np.square(np.abs(np.fft.rfft(frames * window, axis=1))) + eps
+        total = power[:, 1:].sum(axis=1)
+        speech_power = power[:, in_band]
+        band[f0:f1] = speech_power.sum(axis=1) / total
+        flatness[f0:f1] = (
+            np.exp(np.mean(np.log(speech_power), axis=1))
+            / np.mean(speech_power, axis=1)
+        )
+
+    return energy, band, flatness
+
+
+def _moving_mean(x, width):
+    width = max(1, int(width))
+    if width == 1 or len(x) == 0:
+        return x.astype(np.float32)
+    kernel = np.ones(width, dtype=np.float32) / width
+    return np.convolve(x.astype(np.float32), kernel, mode="same")
+
+
+def _runs(mask):
+    """(start, end) frame indices of every run of True in `mask`."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+# -------------------------------------------------
+# Speech intervals
+# -------------------------------------------------
+@profiled("detect_speech")
+def detect_speech(audio, sr=SAMPLE_RATE):
+    """
+    Speech intervals [(start_s, end_s), ...] of 16 kHz mono PCM.
+
+    A frame counts as speech when it is well above the recording's noise
+    floor, keeps most of its energy in the 300–3400 Hz band, is not
+    noise-flat (applause, hiss) and sits in a window with syllable-rate
+    energy dips (which sustained music lacks). Decisions are smoothed,
+    then short pauses are bridged, clicks dropped and edges padded.
+    """
+    energy, band, flatness = _frame_features(audio, sr)
+    if len(energy) == 0:
+        return []
+
+    frames_per_s = sr / float(VAD_HOP)
+    floor = np.percentile(energy, NOISE_PERCENTILE)
+    active = energy > max(floor + ENERGY_MARGIN_DB, MIN_ENERGY_DB)
+
+    linear = np.power(10.0, energy / 10.0)
+    local_mean = _moving_mean(linear, LSTER_WINDOW_S * frames_per_s)
+    lster = _moving_mean(linear < 0.5 * local_mean, LSTER_WINDOW_S * frames_per_s)
+
+    voiced = active & (band >= MIN_BAND_RATIO) & (flatness <= MAX_FLATNESS)
+    speech = (_moving_mean(voiced, SMOOTH_S * frames_per_s) >= 0.5) & (lster >= MIN_LSTER)
+
+    starts, ends = _runs(speech)
+    if len(starts) == 0:
+        return []
+
+    # Frame index -> seconds at the frame's centre
+    starts = (starts * VAD_HOP + VAD_FRAME / 2.0) / sr
+    ends = (ends * VAD_HOP + VAD_FRAME / 2.0) / sr
+    duration = len(audio) / float(sr)
+
+    intervals = []
+    for s, e in zip(starts, ends):
+        if intervals and s - intervals[-1][1] < MIN_SILENCE_S:
+            intervals[-1][1] = e
+        else:
+            intervals.append([s, e])
+
+    padded = []
+    for s, e in intervals:
+        if e - s < MIN_SPEECH_S:
+            continue
+        s, e = max(0.0, s - SPEECH_PAD_S), min(duration, e + SPEECH_PAD_S)
+        if padded and s <= padded[-1][1]:
+            padded[-1][1] = e
+        else:
+            padded.append([s, e])
+
+    return [(round(float(s), 3), round(float(e), 3)) for s, e in padded]
+
+
+def speech_ratio(intervals, duration):
+    """Share of `duration` seconds covered by speech intervals."""
+    if duration <= 0:
+        return 0.0
+    return sum(e - s for s, e in intervals) / duration
+
+
+def intersect_intervals(a, b):
+    """Overlap of two sorted, non-overlapping interval lists."""
+    out = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        lo = max(a[i][0], b[j][0])
+        hi = min(a[i][1], b[j][1])
+        if hi > lo:
+            out.append((lo, hi))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return out
+
+
+# -------------------------------------------------
+# Speech-only audio for ASR
+# -------------------------------------------------
+class SpeechMap:
+    """
+    Maps times in speech-only (compacted) audio back to the source.
+
+    Built by compact_speech(); the i-th kept interval is `lengths[i]`
+    seconds long and begins at `source_starts[i]` in the source and at
+    `compact_starts[i]` in the compacted buffer.
+    """
+
+    def __init__(self, source_starts, compact_starts, lengths):
+        self.source_starts = np.asarray(source_starts, dtype=np.float64)
+        self.compact_starts = np.asarray(compact_starts, dtype=np.float64)
+        self.lengths = np.asarray(lengths, dtype=np.float64)
+
+    def to_source(self, t, end=False):
+        # An end time on a join belongs to the interval before it
+        side = "left" if end else "right"
+        i = max(0, int(np.searchsorted(self.compact_starts, t, side=side)) - 1)
+        offset = max(0.0, t - self.compact_starts[i])
+
+        # Inside the silence between two pieces: starts move to the next
+        # piece, ends stay on the one before
+        if offset > self.lengths[i]:
+            if not end and i + 1 < len(self.source_starts):
+                return float(self.source_starts[i + 1])
+            offset = self.lengths[i]
+        return float(self.source_starts[i] + offset)
+
+    def to_compact(self, t):
+        i = max(0, int(np.searchsorted(self.source_starts, t, side="right")) - 1)
+        # Times in a removed gap snap to the end of the piece before
+        offset = min(max(0.0, t - self.source_starts[i]), self.lengths[i])
+        return float(self.compact_starts[i] + offset)
+
+    def remap_segments(self, segments):
+        """
+        Shift Whisper segments (and their words) from compacted time back
+        onto the source timeline, in place. Returns `segments`.
+        """
+        for seg in segments:
+            seg["start"] = self.to_source(seg["start"])
+            seg["end"] = max(seg["start"], self.to_source(seg["end"], end=True))
+            for w in seg.get("words") or []:
+                w["start"] = self.to_source(w["start"])
+                w["end"] = max(w["start"], self.to_source(w["end"], end=True))
+        return segments
+
+
+def compact_speech(
+    audio,
+    intervals,
+    sr=SAMPLE_RATE,
+    join_s=JOIN_SILENCE_S,
+    mmap_threshold_s=MMAP_THRESHOLD_S
+):
+    """
+    Concatenate the speech intervals of `audio` into one contiguous
+    float32 buffer, `join_s` of silence apart so Whisper tends to end a
+    segment at each join. Returns (compact_audio, SpeechMap).
+
+    The buffer is assembled block by block like load_audio's: past
+    `mmap_threshold_s` seconds it is spilled to a memory-mapped file, so
+    a long, mostly spoken memmapped input is never copied into RAM whole.
+    """
+    source_starts = []
+    compact_starts = []
+    lengths = []
+    spans = []
+    cursor = 0
+    join_samples = int(join_s * sr)
+
+    for s, e in intervals:
+        lo = int(round(s * sr))
+        hi = min(len(audio), int(round(e * sr)))
+        if hi <= lo:
+            continue
+        if spans:
+            cursor += join_samples
+        spans.append((lo, hi))
+        source_starts.append(lo / float(sr))
+        compact_starts.append(cursor / float(sr))
+        lengths.append((hi - lo) / float(sr))
+        cursor += hi - lo
+
+    def blocks():
+        join = np.zeros(join_samples, dtype=np.float32).tobytes()
+        for n, (lo, hi) in enumerate(spans):
+            if n:
+                yield join
+            for i in range(lo, hi, STREAM_BLOCK_SAMPLES):
+                block = audio[i:min(hi, i + STREAM_BLOCK_SAMPLES)]
+                yield np.asarray(block, dtype=np.float32).tobytes()
+
+    compact = buffer_pcm(blocks(), int(mmap_threshold_s * sr) * 4)
+    return compact, SpeechMap(source_starts, compact_starts, lengths)
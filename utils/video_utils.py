@@ -1,146 +1,829 @@
 import os
-import subprocess
-from moviepy import VideoFileClip
+import json
+import tempfile
+import contextvars
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
 
-from utils.transcript_utils import find_dynamic_end
+from utils.transcript_utils import find_dynamic_end, build_transcript_index
+from utils.profiling_utils import profiled, profile_stage, run_subprocess
+from utils.caption_utils import reel_words, group_captions, write_captions
+from utils.probe_utils import probe_media
+
+
+# -------------------------------------------------
+# Encoding settings shared by every render path
+# -------------------------------------------------
+REEL_OUTPUTS = ("horizontal", "vertical", "captioned")
+
+# "words": timed word-level captions from the transcript (one subtitle
+# track); "static": the segment text for the whole reel (drawtext)
+CAPTION_STYLES = ("words", "static")
+
+# Fixed name of the caption track inside the render's scratch dir; the
+# subtitles filter gets a bare file name, so no path escaping is needed
+SUBTITLE_FILE = "captions.ass"
+
+VIDEO_ENCODE_ARGS = [
+    "-c:v", "libx264",
+    "-preset", "fast",
+    "-crf", "18",
+]
+
+# Output tiers. "final" is the publishable render; "preview" is a
+# low-resolution proxy for reviewing picks in seconds; "poster" renders
+# one still frame per reel and no video at all.
+REEL_CANVAS = (1080, 1920)
+RENDER_TIERS = {
+    "final": {
+        "canvas": REEL_CANVAS,
+        "horizontal_height": None,          # source resolution
+        "video_args": VIDEO_ENCODE_ARGS,
+        "audio_args": ["-c:a", "aac"],
+        "suffix": "",
+    },
+    "preview": {
+        "canvas": (360, 640),
+        "horizontal_height": 360,
+        "video_args": ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "30"],
+        "audio_args": ["-c:a", "aac", "-b:a", "48k", "-ac", "1"],
+        "suffix": "_preview",
+    },
+}
+TIERS = ("final", "preview", "poster")
+
+POSTER_WIDTH = 480
+PLAN_FILE = "reel_plan.json"
+
+# render_mode="batched": reels whose ranges overlap or sit this close
+# are cut from one decode of the source. Farther apart, a fresh seek is
+# cheaper than decoding the gap, so they render as separate jobs.
+RENDER_MODES = ("fused", "legacy", "batched")
+GROUP_MAX_GAP_S = 10.0
+GROUP_MAX_REELS = 4         # keeps the encoders per process bounded
+GROUP_MAX_SPAN_S = 300.0
+
+
+def _vertical_filter(width, height, canvas=REEL_CANVAS):
+    """
+    Filter chain that fits a frame of the given size into the vertical
+    canvas (1080x1920 unless rendering a preview).
+    """
+    cw, ch = canvas
+
+    if height >= width:
+        # Already vertical (phone video)
+        return f"scale={cw}:{ch}:force_original_aspect_ratio=decrease"
+
+    # Horizontal video → fit + pad
+    return (
+        f"scale={cw}:-1,"
+        f"pad={cw}:{ch}:(ow-iw)/2:(oh-ih)/2:color=black"
+    )
+
+
+def _caption_drawtext(caption_text, scale=1.0):
+    """
+    High-contrast, reel-safe drawtext filter for a static caption.
+    `scale` shrinks it along with a preview canvas.
+    """
+    safe_text = (
+        caption_text.replace(":", "")
+        .replace("'", "")
+        .replace('"', "")
+        .replace("\n", " ")
+    )
+
+    return (
+        "drawtext="
+        f"text='{safe_text}':"
+        "fontcolor=white:"
+        f"fontsize={round(52 * scale)}:"
+        "box=1:"
+        "boxcolor=black@0.65:"
+        f"boxborderw={round(14 * scale)}:"
+        "x=(w-text_w)/2:"
+        f"y=h-{round(300 * scale)}"
+    )
+
+
+def _caption_subtitles(subtitle_file):
+    """
+    Burn a whole ASS caption track with one filter, however many
+    caption events it holds.
+    """
+    return f"subtitles={subtitle_file}"
 
 
 # -------------------------------------------------
 # Vertical reel conversion (Guaranteed 9:16)
 # -------------------------------------------------
-def convert_to_vertical_ffmpeg(input_path: str, output_path: str):
+def convert_to_vertical_ffmpeg(
+    input_path: str,
+    output_path: str,
+    threads: int = 0,
+    size=None
+):
     """
     Convert video into 9:16 reel format intelligently:
 
     - If video is already vertical (phone-recorded), keep as-is
     - If video is horizontal, fit inside 9:16 with padding
     - Never crop original content
+
+    `size` is the input's (width, height) when the caller already knows
+    it (every reel shares the source geometry); otherwise it is probed.
     """
 
     # Step 1: Probe resolution
-    probe_cmd = [
-        "ffprobe",
-        "-v", "error",
-        "-select_streams", "v:0",
-        "-show_entries", "stream=width,height",
-        "-of", "csv=p=0",
-        input_path
-    ]
-
-    result = subprocess.check_output(probe_cmd).decode().strip()
-    width, height = map(int, result.split(","))
+    width, height = size or probe_media(input_path).display_size
 
     # Step 2: Decide behavior
     if height >= width:
-        # Already vertical (phone video)
         print("📱 Input is vertical — keeping original framing")
-
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", input_path,
-            "-vf", "scale=1080:1920:force_original_aspect_ratio=decrease",
-            "-c:v", "libx264",
-            "-preset", "fast",
-            "-crf", "18",
-            "-c:a", "aac",
-            output_path
-        ]
-
     else:
-        # Horizontal video → fit + pad
         print("💻 Input is horizontal — fitting into 9:16 with padding")
 
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", input_path,
-            "-vf",
-            (
-                "scale=1080:-1,"
-                "pad=1080:1920:(ow-iw)/2:(oh-ih)/2:color=black"
-            ),
-            "-c:v", "libx264",
-            "-preset", "fast",
-            "-crf", "18",
-            "-c:a", "aac",
-            output_path
-        ]
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", input_path,
+        "-vf", _vertical_filter(width, height),
+        *VIDEO_ENCODE_ARGS,
+        "-threads", str(threads),
+        "-c:a", "aac",
+        output_path
+    ]
 
-    subprocess.run(cmd, check=True)
+    run_subprocess(cmd, check=True)
 
 
 
 # -------------------------------------------------
 # Caption burn-in (Reliable, FFmpeg-based)
 # -------------------------------------------------
-def burn_caption_ffmpeg(input_path: str, output_path: str, caption_text: str):
+def burn_caption_ffmpeg(
+    input_path: str,
+    output_path: str,
+    caption_text: str,
+    threads: int = 0
+):
     """
     Burn a high-contrast, reel-safe caption onto the video.
     """
 
-    safe_text = (
-        caption_text.replace(":", "")
-        .replace("'", "")
-        .replace('"', "")
-        .replace("\n", " ")
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", input_path,
+        "-vf", _caption_drawtext(caption_text),
+        *VIDEO_ENCODE_ARGS,
+        "-threads", str(threads),
+        "-c:a", "copy",
+        output_path
+    ]
+
+    run_subprocess(cmd, check=True)
+
+
+# -------------------------------------------------
+# Fused single-pass rendering (one decode, one encode)
+# -------------------------------------------------
+def _split_labels(graph, source, names, prefix="", split="split"):
+    """
+    Fan a filter label out to one label per name, adding a split
+    (or asplit) filter to the graph only when more than one branch is
+    needed.
+    """
+    if len(names) == 1:
+        return {names[0]: source}
+
+    outs = {name: f"{prefix}{name}_src" for name in names}
+    graph.append(
+        f"[{source}]{split}={len(names)}"
+        + "".join(f"[{label}]" for label in outs.values())
     )
+    return outs
 
-    drawtext = (
-        "drawtext="
-        f"text='{safe_text}':"
-        "fontcolor=white:"
-        "fontsize=52:"
-        "box=1:"
-        "boxcolor=black@0.65:"
-        "boxborderw=14:"
-        "x=(w-text_w)/2:"
-        "y=h-300"
+
+def _map_label(label):
+    # Raw input streams are mapped by specifier, filter outputs by [label]
+    return label if label == "0:v:0" else f"[{label}]"
+
+
+def build_reel_filtergraph(
+    width,
+    height,
+    caption_text,
+    outputs,
+    subtitle_file=None,
+    tier="final",
+    source="0:v:0",
+    prefix=""
+):
+    """
+    Build one filtergraph that produces every requested reel output:
+
+        [0:v] ─┬─────────────────────────────► horizontal
+               └─ scale/pad ─┬───────────────► vertical
+                             └─ drawtext ────► captioned
+                                (subtitles)
+
+    Branches that are not requested are never built. With
+    `subtitle_file` the captioned branch burns that ASS track instead of
+    the static `caption_text`. A "preview" tier shrinks every branch
+    (see RENDER_TIERS).
+
+    `source` is the video label the branches start from and `prefix`
+    namespaces every label, so several reels can share one graph (see
+    build_group_filtergraph).
+
+    Returns (filter_complex, {output_name: label}).
+    """
+    settings = RENDER_TIERS[tier]
+    canvas = settings["canvas"]
+    graph = []
+    labels = {}
+
+    vertical_taps = [n for n in ("vertical", "captioned") if n in outputs]
+    branches = [n for n in ("horizontal",) if n in outputs]
+    if vertical_taps:
+        branches.append("fit")
+
+    sources = _split_labels(graph, source, branches, prefix)
+
+    if "horizontal" in outputs:
+        labels["horizontal"] = sources["horizontal"]
+        if settings["horizontal_height"]:
+            graph.append(
+                f"[{sources['horizontal']}]"
+                f"scale=-2:{settings['horizontal_height']}[{prefix}horizontal]"
+            )
+            labels["horizontal"] = f"{prefix}horizontal"
+
+    if vertical_taps:
+        graph.append(
+            f"[{sources['fit']}]{_vertical_filter(width, height, canvas)}"
+            f"[{prefix}fit]"
+        )
+        taps = _split_labels(graph, f"{prefix}fit", vertical_taps, prefix)
+
+        if "vertical" in outputs:
+            labels["vertical"] = taps["vertical"]
+
+        if "captioned" in outputs:
+            if subtitle_file:
+                caption_filter = _caption_subtitles(subtitle_file)
+            else:
+                caption_filter = _caption_drawtext(
+                    caption_text, scale=canvas[0] / REEL_CANVAS[0]
+                )
+            graph.append(
+                f"[{taps['captioned']}]{caption_filter}[{prefix}captioned]"
+            )
+            labels["captioned"] = f"{prefix}captioned"
+
+    return ";".join(graph), labels
+
+
+def render_reel_ffmpeg(
+    video_path,
+    start_time,
+    end_time,
+    caption_text,
+    output_paths,
+    source_size,
+    threads=0,
+    captions=None,
+    tier="final"
+):
+    """
+    Cut, reframe and caption one reel in a single ffmpeg process.
+
+    output_paths maps any subset of REEL_OUTPUTS to a file path; only
+    those outputs are rendered. The source span is decoded once and
+    every output is encoded once, straight from the source.
+
+    captions, when given, are timed caption events (reel-relative, see
+    caption_utils.group_captions) burned as one subtitle track;
+    otherwise `caption_text` is drawn statically.
+
+    tier="preview" renders small, fast-encoded proxies instead of the
+    final-quality outputs (see RENDER_TIERS).
+
+    threads > 0 caps the whole process at roughly that many threads
+    (split across the encoders); 0 lets ffmpeg pick.
+    """
+    if not output_paths:
+        raise ValueError("No reel outputs requested")
+
+    if captions and "captioned" in output_paths:
+        # ffmpeg runs inside a scratch dir holding the caption track
+        with tempfile.TemporaryDirectory(prefix=".captions-") as tmp:
+            write_captions(os.path.join(tmp, SUBTITLE_FILE), captions)
+            _render_fused(
+                os.path.abspath(video_path),
+                start_time,
+                end_time,
+                caption_text,
+                {n: os.path.abspath(p) for n, p in output_paths.items()},
+                source_size,
+                threads,
+                tier,
+                subtitle_file=SUBTITLE_FILE,
+                cwd=tmp
+            )
+        return
+
+    _render_fused(
+        video_path,
+        start_time,
+        end_time,
+        caption_text,
+        output_paths,
+        source_size,
+        threads,
+        tier
+    )
+
+
+def _render_fused(
+    video_path,
+    start_time,
+    end_time,
+    caption_text,
+    output_paths,
+    source_size,
+    threads,
+    tier="final",
+    subtitle_file=None,
+    cwd=None
+):
+    settings = RENDER_TIERS[tier]
+
+    # Geometry only matters for the vertical branches
+    width, height = source_size or (0, 0)
+    graph, labels = build_reel_filtergraph(
+        width, height, caption_text, output_paths, subtitle_file, tier
     )
 
+    encoder_threads = 0
+    if threads:
+        encoder_threads = max(1, threads // len(output_paths))
+
     cmd = [
         "ffmpeg", "-y",
-        "-i", input_path,
-        "-vf", drawtext,
-        "-c:v", "libx264",
-        "-preset", "fast",
-        "-crf", "18",
-        "-c:a", "copy",
-        output_path
+        "-threads", str(threads),
+        "-ss", f"{start_time:.3f}",
+        "-t", f"{end_time - start_time:.3f}",
+        "-i", video_path,
     ]
 
-    subprocess.run(cmd, check=True)
+    if graph:
+        cmd += [
+            "-filter_complex_threads", str(threads or 1),
+            "-filter_complex", graph
+        ]
+
+    for name in REEL_OUTPUTS:
+        if name not in output_paths:
+            continue
+
+        cmd += [
+            "-map", _map_label(labels[name]),
+            "-map", "0:a:0?",
+            *settings["video_args"],
+            "-threads", str(encoder_threads),
+            *settings["audio_args"],
+            output_paths[name]
+        ]
+
+    run_subprocess(cmd, check=True, cwd=cwd)
 
 
 # -------------------------------------------------
-# Main reel generation pipeline (Dynamic 40–100s)
+# Single-decode groups (several reels, one source pass)
 # -------------------------------------------------
-def generate_reels(
+def plan_decode_groups(
+    plan,
+    max_gap=GROUP_MAX_GAP_S,
+    max_reels=GROUP_MAX_REELS,
+    max_span=GROUP_MAX_SPAN_S
+):
+    """
+    Sort reels by start and group those whose ranges overlap or lie
+    within `max_gap` seconds of the group so far, up to `max_reels`
+    reels and `max_span` seconds of source per group.
+
+    Returns a list of groups (lists of plan entries sorted by start);
+    a reel far from every other one is a group of its own.
+    """
+    groups = []
+    group_end = None
+
+    for reel in sorted(plan, key=lambda r: (r["start"], r["end"])):
+        if (
+            groups
+            and len(groups[-1]) < max_reels
+            and reel["start"] - group_end <= max_gap
+            and max(group_end, reel["end"]) - groups[-1][0]["start"] <= max_span
+        ):
+            groups[-1].append(reel)
+            group_end = max(group_end, reel["end"])
+        else:
+            groups.append([reel])
+            group_end = reel["end"]
+
+    return groups
+
+
+def build_group_filtergraph(
+    width,
+    height,
+    reels,
+    output_names,
+    group_start,
+    subtitle_files=None,
+    tier="final",
+    has_audio=True
+):
+    """
+    One filtergraph that cuts every reel of a group from a single decode
+    of the source, seeked to `group_start`:
+
+        [0:v] ─ split ─┬─ trim (reel 1) ─ reel branches ─► reel 1 outputs
+                       └─ trim (reel 2) ─ reel branches ─► reel 2 outputs
+        [0:a] ─ asplit ┬─ atrim (reel 1) ─ asplit ───────► reel 1 outputs
+                       └─ atrim (reel 2) ─ asplit ───────► reel 2 outputs
+
+    Overlapping reels share the decoded frames. `output_names` maps each
+    reel index to the REEL_OUTPUTS it needs; `subtitle_files` maps a reel
+    index to its ASS track for the captioned branch.
+
+    Returns (filter_complex, {index: {name: (video_label, audio_label)}});
+    audio labels are None when the source has no audio.
+    """
+    subtitle_files = subtitle_files or {}
+    graph = []
+    labels = {}
+
+    tags = [f"r{reel['index']}" for reel in reels]
+    video_in = _split_labels(graph, "0:v:0", tags, "v_")
+    audio_in = _split_labels(graph, "0:a:0", tags, "a_", "asplit") if has_audio else {}
+
+    for reel, tag in zip(reels, tags):
+        names = [n for n in REEL_OUTPUTS if n in output_names[reel["index"]]]
+        lo = reel["start"] - group_start
+        hi = reel["end"] - group_start
+
+        graph.append(
+            f"[{video_in[tag]}]trim=start={lo:.3f}:end={hi:.3f},"
+            f"setpts=PTS-STARTPTS[{tag}_v]"
+        )
+        branches, video_labels = build_reel_filtergraph(
+            width,
+            height,
+            reel["text"],
+            names,
+            subtitle_files.get(reel["index"]),
+            tier,
+            source=f"{tag}_v",
+            prefix=f"{tag}_"
+        )
+        if branches:
+            graph.append(branches)
+
+        audio_labels = {}
+        if has_audio:
+            graph.append(
+                f"[{audio_in[tag]}]atrim=start={lo:.3f}:end={hi:.3f},"
+                f"asetpts=PTS-STARTPTS[{tag}_a]"
+            )
+            audio_labels = _split_labels(
+                graph, f"{tag}_a", names, f"{tag}_a_", "asplit"
+            )
+
+        labels[reel["index"]] = {
+            name: (video_labels[name], audio_labels.get(name))
+            for name in names
+        }
+
+    return ";".join(graph), labels
+
+
+def render_group_ffmpeg(
     video_path,
+    reels,
+    output_paths,
+    source_size,
+    threads=0,
+    tier="final"
+):
+    """
+    Render several planned reels from one demux + decode of the source.
+
+    output_paths maps each reel index to {output_name: path}. The input
+    is seeked once to the earliest start and read to the latest end;
+    every reel's outputs are trimmed from that single stream and
+    encoded in the same ffmpeg process. Timed captions are burned from
+    one ASS track per reel.
+    """
+    group_start = min(r["start"] for r in reels)
+    group_end = max(r["end"] for r in reels)
+    settings = RENDER_TIERS[tier]
+
+    width, height = source_size or (0, 0)
+    n_outputs = sum(len(paths) for paths in output_paths.values())
+    encoder_threads = max(1, threads // n_outputs) if threads else 0
+
+    # ffmpeg runs inside a scratch dir holding the caption tracks
+    with tempfile.TemporaryDirectory(prefix=".captions-") as tmp:
+        subtitle_files = {}
+        for reel in reels:
+            if reel.get("captions") and "captioned" in output_paths[reel["index"]]:
+                name = f"captions_{reel['index']}.ass"
+                write_captions(os.path.join(tmp, name), reel["captions"])
+                subtitle_files[reel["index"]] = name
+
+        graph, labels = build_group_filtergraph(
+            width,
+            height,
+            reels,
+            output_paths,
+            group_start,
+            subtitle_files=subtitle_files,
+            tier=tier,
+            has_audio=probe_media(video_path).has_audio
+        )
+
+        cmd = [
+            "ffmpeg", "-y",
+            "-threads", str(threads),
+            "-ss", f"{group_start:.3f}",
+            "-t", f"{group_end - group_start:.3f}",
+            "-i", os.path.abspath(video_path),
+            "-filter_complex_threads", str(threads or 1),
+            "-filter_complex", graph,
+        ]
+
+        for reel in reels:
+            for name, (video_label, audio_label) in labels[reel["index"]].items():
+                cmd += ["-map", f"[{video_label}]"]
+                if audio_label:
+                    cmd += ["-map", f"[{audio_label}]"]
+                cmd += [
+                    *settings["video_args"],
+                    "-threads", str(encoder_threads),
+                    *settings["audio_args"],
+                    os.path.abspath(output_paths[reel["index"]][name])
+                ]
+
+        run_subprocess(cmd, check=True, cwd=tmp)
+
+
+# -------------------------------------------------
+# Keyframe-aware smart cutting (stream copy)
+# -------------------------------------------------
+# ffprobe profile names -> libx264 -profile:v; sources outside this set
+# cannot get matching edges and are re-encoded whole
+X264_PROFILES = {
+    "Constrained Baseline": "baseline",
+    "Baseline": "baseline",
+    "Main": "main",
+    "High": "high",
+    "High 10": "high10",
+    "High 4:2:2": "high422",
+    "High 4:4:4 Predictive": "high444",
+}
+
+
+# SPS fields the re-encoded edges must share with the copied GOPs; a
+# player that keeps the first parameter sets it saw (the mp4 avcC) only
+# decodes the joined stream correctly when these agree
+PARAMETER_SET_FIELDS = ("profile", "level", "refs", "pix_fmt", "width", "height")
+
+
+def _edge_params(video):
+    """
+    libx264 arguments that keep an edge piece inside the source's
+    profile, level and frame layout, or None when they cannot be matched.
+    """
+    profile = X264_PROFILES.get(video.get("profile"))
+    level = video.get("level")
+    time_base = video.get("time_base", "")
+    if (
+        profile is None
+        or not isinstance(level, int) or level <= 0
+        or not video.get("pix_fmt")
+        or video.get("field_order", "progressive") not in ("progressive", "unknown")
+        or "/" not in time_base
+    ):
+        return None
+
+    args = [
+        "-profile:v", profile,
+        "-level:v", f"{level / 10:.1f}",
+        "-pix_fmt", video["pix_fmt"],
+        "-video_track_timescale", time_base.split("/")[1],
+        # No B-frames in the edges: x264 raises the SPS reference count
+        # for B-frame reordering and pyramids, past the source's
+        "-bf", "0",
+    ]
+    if video.get("refs"):
+        args += ["-refs", str(video["refs"])]
+    if profile == "baseline":
+        # Baseline has no CABAC; x264 only honours that through the
+        # profile when nothing else overrides it
+        args += ["-coder", "0"]
+    return args
+
+
+def _parameter_set_mismatch(source, edge):
+    """PARAMETER_SET_FIELDS that differ between two ffprobe video streams."""
+    return [
+        name for name in PARAMETER_SET_FIELDS
+        if source.get(name) != (edge or {}).get(name)
+    ]
+
+
+def _encode_edge(video_path, start, end, output_path, edge_args, threads):
+    """
+    Re-encode a partial GOP (video only) with the source's profile,
+    level, pixel format and timescale.
+    """
+    run_subprocess([
+        "ffmpeg", "-y",
+        "-ss", f"{start:.6f}",
+        "-t", f"{end - start:.6f}",
+        "-i", video_path,
+        "-map", "0:v:0",
+        *VIDEO_ENCODE_ARGS,
+        *edge_args,
+        # Exactly the source frames in the span: no CFR padding, which
+        # would push every later piece off the audio
+        "-fps_mode", "passthrough",
+        "-threads", str(threads),
+        output_path
+    ], check=True)
+
+
+def smart_cut(video_path, start_time, end_time, output_path, threads=0):
+    """
+    Frame-accurate cut that re-encodes only what it has to:
+
+        start ── k1 ═══════════════ k2 ── end
+        encode    stream copy (GOPs)    encode
+
+    k1 is the first IDR frame at/after start and k2 the last IDR frame
+    at/before end (plain keyframes of open-GOP streams are not clean
+    cut points). The edge pieces are encoded with the source's profile,
+    level, pixel format and timescale.
+
+    The concat demuxer runs each piece through h264_mp4toannexb, which
+    puts that piece's own SPS/PPS in-band ahead of its IDR frame, so the
+    joined stream never decodes the copied GOPs with the edge encoder's
+    parameter sets (or the edges with the source's). Audio is encoded once
+    for the whole span rather than per piece, so there is no AAC
+    priming at the joins.
+
+    Falls back to a plain re-encode when the source is not H.264, its
+    profile or level cannot be matched, no whole GOP lies inside the
+    span, or an encoded edge does not come out with the source's
+    profile, level, reference count, pixel format and size.
+
+    Experimental and off by default: it has only been checked against
+    the synthetic sources of benchmarks/check_smart_cut.py. Run that
+    check before enabling it for a new kind of source.
+    """
+    media = probe_media(video_path)
+    video = media.video or {}
+
+    def reencode():
+        render_reel_ffmpeg(
+            video_path,
+            start_time,
+            end_time,
+            "",
+            {"horizontal": output_path},
+            source_size=media.display_size,
+            threads=threads
+        )
+        return output_path
+
+    edge_args = _edge_params(video) if media.video_codec == "h264" else None
+    idr = media.idr_frames() if edge_args is not None else []
+    i1 = bisect_left(idr, start_time)
+    i2 = bisect_right(idr, end_time) - 1
+
+    copyable = (
+        edge_args is not None
+        and i1 < len(idr)
+        and i2 >= 0
+        and idr[i2] > idr[i1]
+    )
+
+    if not copyable:
+        return reencode()
+
+    k1, k2 = idr[i1], idr[i2]
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+
+    with tempfile.TemporaryDirectory(prefix=".smartcut-", dir=out_dir) as tmp:
+        parts = []
+
+        # Head: partial GOP before the first IDR frame
+        if k1 - start_time > 1e-3:
+            head = os.path.join(tmp, "head.mp4")
+            _encode_edge(video_path, start_time, k1, head, edge_args, threads)
+            parts.append(head)
+
+        # Middle: whole GOPs, copied bit for bit. `-t` would cut on
+        # decode timestamps and, with B-frames, keep packets of the next
+        # GOP; the segment muxer splits right before the k2 IDR packet
+        # instead, and only the first segment is used
+        frame_s = 1.0 / media.fps if media.fps else 0.02
+        run_subprocess([
+            "ffmpeg", "-y",
+            "-ss", f"{k1:.6f}",
+            "-t", f"{k2 - k1 + 1.0:.6f}",
+            "-i", video_path,
+            "-map", "0:v:0",
+            "-c", "copy",
+            "-f", "segment",
+            "-segment_times", f"{k2 - k1 - frame_s / 2:.6f}",
+            "-segment_format", "mp4",
+            "-reset_timestamps", "1",
+            os.path.join(tmp, "middle_%d.mp4")
+        ], check=True)
+        middle = os.path.join(tmp, "middle_0.mp4")
+        parts.append(middle)
+
+        # Tail: partial GOP after the last IDR frame
+        if end_time - k2 > 1e-3:
+            tail = os.path.join(tmp, "tail.mp4")
+            _encode_edge(video_path, k2, end_time, tail, edge_args, threads)
+            parts.append(tail)
+
+        for edge in (p for p in parts if p != middle):
+            mismatch = _parameter_set_mismatch(video, probe_media(edge).video)
+            if mismatch:
+                print(
+                    f"⚠️ Smart cut: edge {', '.join(mismatch)} differ from "
+                    "the source; re-encoding the whole reel"
+                )
+                return reencode()
+
+        list_path = os.path.join(tmp, "parts.txt")
+        with open(list_path, "w") as f:
+            for part in parts:
+                f.write(f"file '{part}'\n")
+
+        run_subprocess([
+            "ffmpeg", "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-auto_convert", "1",
+            "-i", list_path,
+            "-ss", f"{start_time:.6f}",
+            "-t", f"{end_time - start_time:.6f}",
+            "-i", video_path,
+            "-map", "0:v:0",
+            "-map", "1:a:0?",
+            "-c:v", "copy",
+            "-c:a", "aac",
+            "-movflags", "+faststart",
+            output_path
+        ], check=True)
+
+    return output_path
+
+
+# -------------------------------------------------
+# Reel planning (cut points + output paths)
+# -------------------------------------------------
+def plan_reels(
     segments,
     transcript_segments,
-    output_dir="output/clips"
+    duration,
+    output_dir,
+    captions="words"
 ):
     """
-    FINAL Reel Pipeline:
+    Decide every reel's [start, end] and output paths up front.
+
     - Semantic start (from Gemini-ranked segments)
     - Dynamic semantic end (40–100s)
-    - FFmpeg vertical conversion
-    - FFmpeg caption burn-in
+    - Timed caption events from the transcript's word timestamps
+      (captions="words")
     """
+    # One index for every reel's end search
+    transcript = build_transcript_index(transcript_segments)
 
-    os.makedirs(output_dir, exist_ok=True)
-
-    video = VideoFileClip(video_path)
-    results = []
-
+    plan = []
     for idx, seg in enumerate(segments, 1):
-        # -------------------------------------------------
-        # Dynamic semantic start & end
-        # -------------------------------------------------
         start_time = seg["start"]
 
         end_time = find_dynamic_end(
             start_time=start_time,
-            segments=transcript_segments,
+            segments=transcript,
             min_len=40,
             max_len=100
         )
@@ -150,7 +833,7 @@ def generate_reels(
             end_time = start_time + 60
 
         # Clamp to video duration
-        end_time = min(end_time, video.duration)
+        end_time = min(end_time, duration)
 
         # Debug (IMPORTANT)
         print(
@@ -160,52 +843,526 @@ def generate_reels(
             f"dur={end_time - start_time:.2f}s"
         )
 
-        # -------------------------------------------------
-        # Output paths
-        # -------------------------------------------------
-        horizontal_path = os.path.join(
-            output_dir, f"reel_{idx}.mp4"
-        )
-        vertical_path = os.path.join(
-            output_dir, f"reel_{idx}_vertical.mp4"
-        )
-        captioned_path = os.path.join(
-            output_dir, f"reel_{idx}_vertical_captioned.mp4"
+        reel_captions = None
+        if captions == "words":
+            reel_captions = group_captions(
+                reel_words(transcript, start_time, end_time)
+            )
+
+        plan.append({
+            "index": idx,
+            "start": start_time,
+            "end": end_time,
+            "text": seg["text"],
+            "captions": reel_captions,
+            "paths": {
+                "horizontal": os.path.join(
+                    output_dir, f"reel_{idx}.mp4"
+                ),
+                "vertical": os.path.join(
+                    output_dir, f"reel_{idx}_vertical.mp4"
+                ),
+                "captioned": os.path.join(
+                    output_dir, f"reel_{idx}_vertical_captioned.mp4"
+                ),
+            },
+        })
+
+    return plan
+
+
+# -------------------------------------------------
+# Saved plans (cut points for deferred final renders)
+# -------------------------------------------------
+def save_plan(path, video_path, plan, source_size, duration, key=None):
+    """
+    Store planned cut points, captions and final output paths so
+    promote_reels can render chosen reels later without re-planning.
+
+    `key` identifies the video and config the plan was made from (see
+    ReelPipeline.key("plan")); promote_reels can insist on it.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({
+            "video_path": os.path.abspath(video_path),
+            "key": key,
+            "source_size": list(source_size),
+            "duration": duration,
+            "reels": plan,
+        }, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def load_plan(path):
+    with open(path) as f:
+        saved = json.load(f)
+    saved["source_size"] = tuple(saved["source_size"])
+    return saved
+
+
+def plan_key(path):
+    """Key a saved plan was made under; None if missing or unreadable."""
+    try:
+        return load_plan(path).get("key")
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def write_plan(
+    video_path,
+    segments,
+    transcript_segments,
+    output_dir="output/clips",
+    captions="words",
+    key=None
+):
+    """
+    Plan the reels (plan_reels) and save the plan to
+    <output_dir>/reel_plan.json. Returns (plan, source_size).
+    """
+    with profile_stage("probe_video"):
+        media = probe_media(video_path)
+    source_size = media.display_size
+
+    with profile_stage("plan_reels"):
+        plan = plan_reels(
+            segments,
+            transcript_segments,
+            media.duration,
+            output_dir,
+            captions=captions
         )
 
-        # -------------------------------------------------
-        # Horizontal clip extraction
-        # -------------------------------------------------
-        clip = video.subclipped(start_time, end_time)
+    save_plan(
+        os.path.join(output_dir, PLAN_FILE),
+        video_path,
+        plan,
+        source_size,
+        media.duration,
+        key=key
+    )
+    return plan, source_size
+
+
+def _tier_path(path, tier):
+    base, ext = os.path.splitext(path)
+    return f"{base}{RENDER_TIERS[tier]['suffix']}{ext}"
+
+
+def render_poster(video_path, time_s, output_path, width=POSTER_WIDTH):
+    """
+    Grab one small JPEG frame at `time_s` (input seek: near-instant).
+    """
+    run_subprocess([
+        "ffmpeg", "-y",
+        "-ss", f"{time_s:.3f}",
+        "-i", video_path,
+        "-frames:v", "1",
+        "-vf", f"scale={width}:-2",
+        "-q:v", "3",
+        output_path
+    ], check=True)
+    return output_path
+
+
+# -------------------------------------------------
+# Per-reel render jobs
+# -------------------------------------------------
+def _render_legacy(video_path, reel, threads, source_size=None):
+    # Deferred: MoviePy is only used by the legacy render path
+    from moviepy import VideoFileClip
+
+    paths = reel["paths"]
+
+    # -------------------------------------------------
+    # Horizontal clip extraction
+    # -------------------------------------------------
+    # Each job opens its own reader: VideoFileClip is not thread-safe
+    video = VideoFileClip(video_path)
+    try:
+        clip = video.subclipped(reel["start"], reel["end"])
         clip.write_videofile(
-            horizontal_path,
+            paths["horizontal"],
             codec="libx264",
-            audio_codec="aac"
+            audio_codec="aac",
+            threads=threads or None
         )
         clip.close()
+    finally:
+        video.close()
+
+    # -------------------------------------------------
+    # Vertical reel
+    # -------------------------------------------------
+    convert_to_vertical_ffmpeg(
+        paths["horizontal"],
+        paths["vertical"],
+        threads=threads,
+        size=source_size
+    )
+
+    # -------------------------------------------------
+    # Caption burn-in
+    # -------------------------------------------------
+    burn_caption_ffmpeg(
+        paths["vertical"],
+        paths["captioned"],
+        reel["text"],
+        threads=threads
+    )
+
+    return paths
+
+
+def _render_job(
+    video_path,
+    reel,
+    outputs,
+    render_mode,
+    source_size,
+    threads,
+    smart=False,
+    tier="final"
+):
+    if tier == "poster":
+        # A frame just after the cut point: what the reel opens on
+        poster = os.path.splitext(reel["paths"]["horizontal"])[0] + "_poster.jpg"
+        t = reel["start"] + min(1.0, (reel["end"] - reel["start"]) / 2)
+        with profile_stage("render_poster", index=reel["index"]):
+            return {"poster": render_poster(video_path, t, poster)}
+
+    if render_mode == "legacy":
+        with profile_stage("render_legacy", index=reel["index"]):
+            return _render_legacy(video_path, reel, threads, source_size)
+
+    requested = {
+        name: _tier_path(path, tier) for name, path in reel["paths"].items()
+        if name in outputs
+    }
+
+    # The horizontal cut changes no pixels: stream-copy whole GOPs
+    fused = dict(requested)
+    if smart and tier == "final" and "horizontal" in fused:
+        with profile_stage("smart_cut", index=reel["index"]):
+            smart_cut(
+                video_path,
+                reel["start"],
+                reel["end"],
+                fused.pop("horizontal"),
+                threads=threads
+            )
+
+    if fused:
+        with profile_stage("render_fused", index=reel["index"], outputs=list(fused)):
+            render_reel_ffmpeg(
+                video_path,
+                reel["start"],
+                reel["end"],
+                reel["text"],
+                fused,
+                source_size=source_size,
+                threads=threads,
+                captions=reel.get("captions"),
+                tier=tier
+            )
+    return requested
 
-        # -------------------------------------------------
-        # Vertical reel
-        # -------------------------------------------------
-        convert_to_vertical_ffmpeg(
-            horizontal_path,
-            vertical_path
-        )
 
-        # -------------------------------------------------
-        # Caption burn-in
-        # -------------------------------------------------
-        burn_caption_ffmpeg(
-            vertical_path,
-            captioned_path,
-            seg["text"]
+def _render_group_job(video_path, group, outputs, source_size, threads, smart=False, tier="final"):
+    requested = {
+        reel["index"]: {
+            name: _tier_path(path, tier) for name, path in reel["paths"].items()
+            if name in outputs
+        }
+        for reel in group
+    }
+
+    fused = {index: dict(paths) for index, paths in requested.items()}
+    if smart and tier == "final" and "horizontal" in outputs:
+        for reel in group:
+            with profile_stage("smart_cut", index=reel["index"]):
+                smart_cut(
+                    video_path,
+                    reel["start"],
+                    reel["end"],
+                    fused[reel["index"]].pop("horizontal"),
+                    threads=threads
+                )
+
+    if any(fused.values()):
+        with profile_stage(
+            "render_group",
+            indices=[reel["index"] for reel in group],
+            seconds=max(r["end"] for r in group) - min(r["start"] for r in group)
+        ):
+            render_group_ffmpeg(
+                video_path,
+                group,
+                fused,
+                source_size,
+                threads=threads,
+                tier=tier
+            )
+    return requested
+
+
+def _default_workers(n_jobs):
+    # x264 scales well up to ~4 threads per encode; use the rest for
+    # more reels in flight
+    return max(1, min(n_jobs, (os.cpu_count() or 1) // 4))
+
+
+def render_reels(
+    video_path,
+    plan,
+    outputs=REEL_OUTPUTS,
+    render_mode="fused",
+    source_size=None,
+    workers=None,
+    smart=False,
+    tier="final"
+):
+    """
+    Render planned reels on a bounded worker pool.
+
+    - `workers` reels render concurrently (default: cpu_count // 4)
+    - each job gets cpu_count // workers ffmpeg threads, so the pool
+      as a whole never oversubscribes the CPU
+    - a failing reel yields {"index", "start", "end", "error"} instead
+      of aborting the others
+    - results come back in plan (ranked) order
+
+    smart=True cuts the horizontal output with smart_cut (stream copy
+    plus re-encoded edges) instead of a full re-encode.
+
+    render_mode="batched" groups nearby reels (plan_decode_groups) and
+    renders each group from one decode of the source; a group that
+    fails is retried reel by reel.
+
+    tier picks the output quality (see TIERS / RENDER_TIERS); previews
+    and posters are written next to the final paths with a suffix.
+    """
+    if not plan:
+        return []
+
+    if render_mode == "batched" and tier != "poster":
+        groups = plan_decode_groups(plan)
+    else:
+        groups = [[reel] for reel in plan]
+
+    workers = workers or _default_workers(len(groups))
+    workers = max(1, min(workers, len(groups)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    def _run(reel):
+        base = {
+            "index": reel["index"],
+            "start": reel["start"],
+            "end": reel["end"],
+        }
+        try:
+            with profile_stage(
+                "render_reel",
+                index=reel["index"],
+                seconds=reel["end"] - reel["start"]
+            ):
+                paths = _render_job(
+                    video_path,
+                    reel,
+                    outputs,
+                    render_mode,
+                    source_size,
+                    threads,
+                    smart=smart,
+                    tier=tier
+                )
+        except Exception as e:
+            print(f"❌ Reel {reel['index']} failed: {e}")
+            return {**base, "error": str(e)}
+        return {**base, **paths}
+
+    def _run_group(group):
+        if len(group) == 1:
+            return [_run(group[0])]
+
+        indices = [reel["index"] for reel in group]
+        try:
+            paths = _render_group_job(
+                video_path,
+                group,
+                outputs,
+                source_size,
+                threads,
+                smart=smart,
+                tier=tier
+            )
+        except Exception as e:
+            print(f"⚠️ Single-decode render of reels {indices} failed ({e}); rendering them one by one")
+            return [_run(reel) for reel in group]
+
+        return [
+            {
+                "index": reel["index"],
+                "start": reel["start"],
+                "end": reel["end"],
+                **paths[reel["index"]],
+            }
+            for reel in group
+        ]
+
+    if len(groups) < len(plan):
+        print(f"🎞️ {len(plan)} reels share {len(groups)} source decode(s)")
+
+    if workers == 1:
+        results = [r for group in groups for r in _run_group(group)]
+    else:
+        print(f"⚙️ Rendering {len(groups)} jobs on {workers} workers ({threads} threads each)...")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Each job runs in a copy of the caller's context so profiler
+            # spans opened around render_reels see the work done in the pool
+            futures = [
+                pool.submit(contextvars.copy_context().run, _run_group, group)
+                for group in groups
+            ]
+            results = [r for f in futures for r in f.result()]
+
+    # Groups are sorted by start time; hand results back in plan order
+    order = {reel["index"]: i for i, reel in enumerate(plan)}
+    return sorted(results, key=lambda r: order[r["index"]])
+
+
+# -------------------------------------------------
+# Main reel generation pipeline (Dynamic 40–100s)
+# -------------------------------------------------
+@profiled("generate_reels")
+def generate_reels(
+    video_path,
+    segments,
+    transcript_segments,
+    output_dir="output/clips",
+    outputs=REEL_OUTPUTS,
+    render_mode="fused",
+    workers=None,
+    smart=False,
+    captions="words",
+    tier="final",
+    plan_key=None
+):
+    """
+    FINAL Reel Pipeline:
+    - Semantic start (from Gemini-ranked segments)
+    - Dynamic semantic end (40–100s)
+    - FFmpeg vertical conversion
+    - FFmpeg caption burn-in
+
+    render_mode:
+        "fused"  – one ffmpeg pass per reel that writes only the
+                   requested `outputs` (any of REEL_OUTPUTS)
+        "legacy" – MoviePy cut + two ffmpeg re-encodes; always
+                   writes all three outputs
+        "batched" – like "fused", but reels close together on the
+                   source timeline are cut from one shared decode
+                   (one ffmpeg process per group)
+
+    Reels render concurrently on `workers` threads (see render_reels).
+    smart=True stream-copies the horizontal cut (see smart_cut).
+    captions="words" burns timed word-level captions (one subtitle
+    track per reel); "static" draws the segment text for the whole reel.
+
+    tier:
+        "final"   – full-quality outputs (default)
+        "preview" – 360-wide proxies, ultrafast encode, mono 48k audio
+        "poster"  – one JPEG per reel, no video
+    The plan is always saved to <output_dir>/reel_plan.json (under
+    `plan_key`, see write_plan), so promote_reels can render approved
+    reels at full quality later.
+    Each result holds the reel's index, start, end and output paths, or
+    an "error" entry if that reel failed.
+    """
+
+    if render_mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render_mode: {render_mode}")
+
+    if captions not in CAPTION_STYLES:
+        raise ValueError(f"Unknown caption style: {captions}")
+
+    if tier not in TIERS:
+        raise ValueError(f"Unknown render tier: {tier}")
+
+    if tier != "final" and render_mode == "legacy":
+        raise ValueError("Preview tiers need render_mode='fused' or 'batched'")
+
+    unknown = set(outputs) - set(REEL_OUTPUTS)
+    if unknown:
+        raise ValueError(f"Unknown reel outputs: {sorted(unknown)}")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    plan, source_size = write_plan(
+        video_path,
+        segments,
+        transcript_segments,
+        output_dir,
+        captions=captions,
+        key=plan_key
+    )
+
+    return render_reels(
+        video_path,
+        plan,
+        outputs=outputs,
+        render_mode=render_mode,
+        source_size=source_size,
+        workers=workers,
+        smart=smart,
+        tier=tier
+    )
+
+
+def promote_reels(
+    plan_path,
+    indices=None,
+    outputs=REEL_OUTPUTS,
+    render_mode="fused",
+    workers=None,
+    smart=False,
+    key=None
+):
+    """
+    Render approved reels at final quality from a saved plan.
+
+    Reuses the saved cut points and captions (nothing is re-planned or
+    re-ranked); `indices` are the 1-based reel numbers to render, or
+    None for all of them. With `key`, a plan saved under any other key
+    (another video, ranking or config) is refused.
+    """
+    saved = load_plan(plan_path)
+    if key is not None and saved.get("key") != key:
+        raise ValueError(
+            f"{plan_path} was planned from another video or config; "
+            "re-run the preview with the same options first"
         )
+    reels = saved["reels"]
 
-        results.append({
-            "horizontal": horizontal_path,
-            "vertical": vertical_path,
-            "captioned": captioned_path
-        })
+    if indices is not None:
+        wanted = set(indices)
+        unknown = wanted - {r["index"] for r in reels}
+        if unknown:
+            raise ValueError(f"Reels not in plan: {sorted(unknown)}")
+        reels = [r for r in reels if r["index"] in wanted]
 
-    video.close()
-    return results
+    print(f"⬆️ Promoting {len(reels)} reel(s) to final quality...")
+
+    return render_reels(
+        saved["video_path"],
+        reels,
+        outputs=outputs,
+        render_mode=render_mode,
+        source_size=saved["source_size"],
+        workers=workers,
+        smart=smart,
+        tier="final"
+    )